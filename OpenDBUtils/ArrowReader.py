@@ -0,0 +1,55 @@
+import importlib.util
+import polars as pl
+
+
+class ArrowReader:
+    """
+    把查询结果直接读成polars DataFrame（Arrow内存），不经过pandas
+    优先使用ADBC驱动，其次connectorx，都未安装时从DB-API游标按列构建
+    """
+
+    @staticmethod
+    def engine(adbc_driver: str = None) -> str | None:
+        """
+        检测可用的Arrow原生读取引擎
+        :param adbc_driver: 对应数据库的ADBC驱动模块名，例如 "adbc_driver_postgresql"，None表示该数据库没有ADBC驱动
+        :return: "adbc"、"connectorx"，都不可用时返回None
+        """
+        if adbc_driver and importlib.util.find_spec(adbc_driver) and importlib.util.find_spec("adbc_driver_manager"):
+            return "adbc"
+        if importlib.util.find_spec("connectorx"):
+            return "connectorx"
+        return None
+
+    @staticmethod
+    def read_uri(query: str, uri: str, engine: str) -> pl.DataFrame:
+        """
+        通过ADBC或connectorx执行查询，结果直接写入Arrow缓冲区
+        :param query: SQL语句
+        :param uri: 数据库连接URI
+        :param engine: "adbc" 或 "connectorx"
+        """
+        return pl.read_database_uri(query, uri, engine=engine)
+
+    @staticmethod
+    def from_cursor(cursor) -> pl.DataFrame:
+        """
+        从已执行查询的DB-API游标读取全部结果，按列构建polars DataFrame
+        memoryview/bytearray（psycopg2的bytea、mysql-connector的BLOB）统一转为bytes
+        """
+        names = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return pl.DataFrame([ArrowReader._series(name, values) for name, values in zip(names, columns)])
+
+    @staticmethod
+    def _series(name: str, values: tuple) -> pl.Series:
+        """构建一列；整数与浮点混合的列转为Float64，其他类型不一致的列（SQLite允许）退回polars的Object类型"""
+        if any(isinstance(value, (memoryview, bytearray)) for value in values):
+            values = [None if value is None else bytes(value) for value in values]
+        try:
+            return pl.Series(name, values)
+        except Exception:
+            if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+                return pl.Series(name, values, dtype=pl.Float64)
+            return pl.Series(name, values, dtype=pl.Object)
@@ -0,0 +1,245 @@
+import asyncio
+import concurrent.futures
+import functools
+import importlib.util
+from typing import AsyncIterator, List
+import pandas as pd
+import polars as pl
+from .DBUtils import DBUtils
+
+
+class AsyncDBUtils:
+    """
+    DBUtils的asyncio版本
+    PostgreSQL/MySQL安装了asyncpg/aiomysql时，execute_sql、count和query_iter直接使用原生异步驱动；
+    store_df、query_df以及SQLite的全部操作放到有界线程池中执行，与同步版本共享同一个连接池。
+    同时进行的数据库操作数由信号量限制，协程再多也不会创建更多线程或连接
+    """
+    def __init__(
+            self,
+            db_name,
+            user=None,
+            password=None,
+            host=None,
+            port=None,
+            db_instance="postgresql",
+            max_concurrency: int = 8,
+            native: bool = True,
+            **options
+    ):
+        """
+        初始化异步数据库工具
+        :param max_concurrency: 同时进行的数据库操作数上限，也是调用线程池的线程数和原生异步连接池的大小
+        :param native: 是否在安装了asyncpg/aiomysql时使用原生异步驱动
+        :param options: 传给DBUtils的其他参数（连接池、SQLite PRAGMA配置等）
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency必须大于0")
+        self.sync = DBUtils(db_name, user, password, host, port, db_instance, **options)
+        self.db_instance = db_instance
+        self.max_concurrency = max_concurrency
+        # 调用线程池执行整个store_df/query_df；其内部的分块任务使用另一个按连接池大小设置的共享线程池，
+        # 两者分开可以避免外层任务占满线程后等待内层任务造成死锁
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="opendbutils-call")
+        # DBUtils已有的共享线程池先关闭再替换，避免其中的线程泄漏
+        if self.sync.executor is not None:
+            self.sync.executor.shutdown(wait=True)
+        self.sync.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.sync.db.pool.max_size, thread_name_prefix="opendbutils-chunk"
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.driver = self._native_driver(db_instance) if native else None
+        self._native_pool = None
+        self._native_pool_lock = asyncio.Lock()
+
+    @staticmethod
+    def _native_driver(db_instance: str) -> str | None:
+        """检测可用的原生异步驱动：PostgreSQL为asyncpg，MySQL为aiomysql，SQLite没有（sqlite3只能在线程中执行）"""
+        if db_instance == "postgresql" and importlib.util.find_spec("asyncpg"):
+            return "asyncpg"
+        if db_instance == "mysql" and importlib.util.find_spec("aiomysql"):
+            return "aiomysql"
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """关闭原生异步连接池、线程池和同步连接池"""
+        if self._native_pool is not None:
+            if self.driver == "asyncpg":
+                await self._native_pool.close()
+            else:
+                self._native_pool.close()
+                await self._native_pool.wait_closed()
+            self._native_pool = None
+        await self._offload(self.sync.close)
+        self._executor.shutdown(wait=True)
+        self.sync.executor.shutdown(wait=True)
+
+    async def _offload(self, func, *args, **kwargs):
+        """在有界线程池中执行阻塞调用，受信号量限制"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _pool(self):
+        """取得原生异步连接池，第一次使用时建立"""
+        async with self._native_pool_lock:
+            if self._native_pool is None:
+                db = self.sync.db
+                if self.driver == "asyncpg":
+                    import asyncpg
+                    self._native_pool = await asyncpg.create_pool(
+                        database=db.dbname, user=db.user, password=db.password, host=db.host, port=int(db.port),
+                        min_size=1, max_size=self.max_concurrency
+                    )
+                else:
+                    import aiomysql
+                    self._native_pool = await aiomysql.create_pool(
+                        db=db.dbname, user=db.user, password=db.password, host=db.host, port=int(db.port),
+                        minsize=1, maxsize=self.max_concurrency
+                    )
+        return self._native_pool
+
+    async def _fetch(self, sql: str) -> list:
+        """使用原生异步驱动执行SQL并返回全部结果行（元组）"""
+        pool = await self._pool()
+        async with self._semaphore:
+            if self.driver == "asyncpg":
+                async with pool.acquire() as conn:
+                    return [tuple(row) for row in await conn.fetch(sql)]
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql)
+                    rows = await cursor.fetchall()
+                await conn.commit()
+                return list(rows)
+
+    async def store_df(self, data: pl.DataFrame | pd.DataFrame, table_name: str, **kwargs) -> None:
+        """
+        异步写入DataFrame，参数同DBUtils.store_df
+        编码与分块写入在线程池中进行，分块使用共享的分块线程池
+        """
+        return await self._offload(self.sync.store_df, data, table_name, **kwargs)
+
+    async def query_df(self, table_name: str, **kwargs) -> pd.DataFrame | pl.DataFrame:
+        """异步分块查询表数据，参数同DBUtils.query_df"""
+        return await self._offload(self.sync.query_df, table_name, **kwargs)
+
+    async def execute_sql(self, sql: str) -> any:
+        """
+        异步执行任意SQL语句
+        :param sql: SQL语句
+        :return: 结果行列表
+        """
+        if self.driver is None:
+            return await self._offload(self.sync.execute_sql, sql)
+        try:
+            return await self._fetch(sql)
+        except Exception as e:
+            raise Exception(f"执行SQL语句失败: {str(e)}")
+        finally:
+            # 原生驱动绕过了同步的execute_sql，同样需要使结果缓存失效
+            self.sync._invalidate_sql(sql)
+
+    async def count(self, table_name: str, condition: str = None) -> int:
+        """
+        异步查询数据数量
+        :param table_name: 表名
+        :param condition: WHERE条件语句
+        :return: 数据数量
+        """
+        if self.driver is None:
+            return await self._offload(self.sync.db.count_data, table_name, condition)
+        count_query = f"SELECT COUNT(*) FROM {table_name}"
+        if condition:
+            count_query += f" WHERE {condition}"
+        try:
+            return (await self._fetch(count_query))[0][0]
+        except Exception as e:
+            raise Exception(f"查询数据数量失败: {str(e)}")
+
+    async def query_iter(
+            self,
+            table_name: str,
+            columns: List[str] = ["*"],
+            condition: str = None,
+            limit: int = None,
+            batch_rows: int = 10000,
+            include_index: bool = False,
+            backend: str = "pandas"
+    ) -> AsyncIterator[pd.DataFrame | pl.DataFrame]:
+        """
+        异步流式查询表数据，参数同DBUtils.query_iter
+        原生驱动使用服务端游标逐批读取；否则在线程池中逐批推进同步的query_iter。
+        每次只在取下一批时占用信号量，因此消费方可以在迭代过程中发起其他数据库操作。
+        提前结束迭代时请用 contextlib.aclosing 或显式 await aclose()，以便立即归还连接
+        """
+        if backend not in ("pandas", "polars"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        if self.driver is None:
+            # 在线程池中逐批推进同步迭代器，结束或提前退出时关闭它以归还连接
+            iterator = self.sync.query_iter(table_name, columns, condition, limit, batch_rows, include_index, backend)
+            done = object()
+            try:
+                while True:
+                    df = await self._offload(next, iterator, done)
+                    if df is done:
+                        break
+                    yield df
+            finally:
+                try:
+                    await self._offload(iterator.close)
+                except RuntimeError:
+                    # 线程池已关闭（生成器在事件循环结束时才被回收），直接在当前线程关闭
+                    iterator.close()
+            return
+
+        column_codecs = await self._offload(self.sync._column_codecs, table_name)
+        binary_columns = await self._offload(self.sync.db.binary_columns, table_name) if not column_codecs else None
+        columns_str = ", ".join(columns)
+        select_query = f"SELECT {columns_str} FROM {table_name}"
+        if condition:
+            select_query += f" WHERE {condition}"
+        if limit:
+            select_query += f" LIMIT {limit}"
+        async for rows, names in self._native_batches(select_query, batch_rows):
+            df = pd.DataFrame.from_records(rows, columns=names)
+            yield await self._offload(self.sync._decode_batch, df, binary_columns, column_codecs, include_index, backend)
+
+    async def _native_batches(self, select_query: str, batch_rows: int) -> AsyncIterator[tuple]:
+        """
+        使用原生异步驱动的服务端游标逐批读取
+        :return: (行元组列表, 列名列表) 的异步迭代器
+        """
+        pool = await self._pool()
+        try:
+            if self.driver == "asyncpg":
+                async with pool.acquire() as conn:
+                    # asyncpg的游标只能在事务中使用
+                    async with conn.transaction():
+                        cursor = await conn.cursor(select_query)
+                        while True:
+                            async with self._semaphore:
+                                rows = await cursor.fetch(batch_rows)
+                            if not rows:
+                                break
+                            yield [tuple(row) for row in rows], list(rows[0].keys())
+            else:
+                import aiomysql
+                async with pool.acquire() as conn:
+                    async with conn.cursor(aiomysql.SSCursor) as cursor:
+                        await cursor.execute(select_query)
+                        names = [column[0] for column in cursor.description]
+                        while True:
+                            async with self._semaphore:
+                                rows = await cursor.fetchmany(batch_rows)
+                            if not rows:
+                                break
+                            yield list(rows), names
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Callable
+
+# chunk_size="auto"时每块的目标字节数
+DEFAULT_CHUNK_BYTES = 8 * 2 ** 20
+MIN_CHUNK_ROWS = 256
+MAX_CHUNK_ROWS = 1 << 20
+# query_df估算行宽时读取的行数
+PROBE_ROWS = 1000
+
+
+def auto_chunk_size(row_bytes: float, target_bytes: int = DEFAULT_CHUNK_BYTES, min_rows: int = MIN_CHUNK_ROWS,
+                    max_rows: int = MAX_CHUNK_ROWS) -> int:
+    """
+    按目标字节数计算每块的行数
+    :param row_bytes: 估算的（编码后）每行字节数
+    :param target_bytes: 每块的目标字节数
+    :return: 限制在[min_rows, max_rows]之间的行数
+    """
+    if row_bytes <= 0:
+        return max_rows
+    return int(max(min_rows, min(max_rows, target_bytes // row_bytes)))
+
+
+class ConcurrencyTuner:
+    """
+    运行中调整并发块数（max_workers="auto"）：按完成的块统计每个窗口的吞吐量（行/秒）和平均延迟，
+    吞吐量仍在上升时增加一个并发，吞吐量下降或延迟比最好的窗口高出一倍（服务器已饱和）时减少约四分之一，否则保持
+    调用方按limit控制同时执行的块数，并用timed包装每块任务
+    """
+
+    def __init__(self, max_workers: int, initial: int = None, min_workers: int = 1, increase: float = 0.05,
+                 decrease: float = 0.10, latency_factor: float = 2.0):
+        """
+        :param max_workers: 并发上限（线程池大小，通常为连接池上限）
+        :param initial: 初始并发数，默认为min(4, max_workers)
+        :param increase: 吞吐量至少上升该比例时增加并发
+        :param decrease: 吞吐量至少下降该比例时减少并发
+        :param latency_factor: 平均延迟超过最好窗口的该倍数时减少并发
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers必须大于0")
+        self.max_workers = max_workers
+        self.min_workers = max(1, min(min_workers, max_workers))
+        self.limit = max(self.min_workers, min(initial or 4, max_workers))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self._lock = threading.Lock()
+        self._window_start = None
+        self._window_rows = 0
+        self._window_seconds = 0.0
+        self._window_chunks = 0
+        self._last_throughput = None
+        self._best_latency = None
+        self.history = []
+
+    def timed(self, task: Callable[[], object]) -> Callable[[], object]:
+        """包装一块任务：记录其耗时和返回的行数（DataFrame的长度或统计字典中的rows）"""
+        def run():
+            start = time.perf_counter()
+            result = task()
+            rows = result.get("rows", 0) if isinstance(result, dict) else len(result) if result is not None else 0
+            self.record(rows, time.perf_counter() - start, start)
+            return result
+        return run
+
+    def record(self, rows: int, seconds: float, started: float = None) -> None:
+        """记录一块的结果，窗口内完成的块数达到当前并发数的两倍时调整并发"""
+        with self._lock:
+            now = time.perf_counter()
+            if self._window_start is None:
+                self._window_start = started if started is not None else now - seconds
+            self._window_rows += rows
+            self._window_seconds += seconds
+            self._window_chunks += 1
+            if self._window_chunks < max(2 * self.limit, 4):
+                return
+            elapsed = now - self._window_start
+            throughput = self._window_rows / elapsed if elapsed > 0 else 0.0
+            latency = self._window_seconds / self._window_chunks
+            self._adjust(throughput, latency)
+            self._window_start = now
+            self._window_rows = 0
+            self._window_seconds = 0.0
+            self._window_chunks = 0
+
+    def _adjust(self, throughput: float, latency: float) -> None:
+        previous = self._last_throughput
+        limit = self.limit
+        rising = previous is None or throughput >= previous * (1 + self.increase)
+        saturated = self._best_latency is not None and latency > self._best_latency * self.latency_factor
+        if rising and not saturated:
+            self.limit = min(self.max_workers, limit + 1)
+        elif saturated or throughput <= previous * (1 - self.decrease):
+            self.limit = max(self.min_workers, limit - max(1, limit // 4))
+        self._best_latency = latency if self._best_latency is None else min(self._best_latency, latency)
+        self._last_throughput = throughput
+        self.history.append({"workers": limit, "rows_per_sec": throughput, "latency": latency})
+
+    def summary(self) -> dict:
+        """调整过程：各窗口的并发数、吞吐量和平均延迟，以及最终的并发数"""
+        with self._lock:
+            return {"max_workers": self.max_workers, "workers": self.limit, "windows": list(self.history)}
@@ -0,0 +1,230 @@
+import base64
+import binascii
+import pickle
+from typing import List
+import numpy as np
+import pandas as pd
+import polars as pl
+
+BASE64_PREFIX = "base64_encode::"
+PICKLE_PREFIX = "base64_pickle_encode::"
+# 二进制存储模式下标记pickle列（PostgreSQL/MySQL写入列注释，SQLite写入声明类型）
+PICKLE_BINARY_MARKER = "opendbutils:pickle"
+# 记录每个表各列编码方式的元数据表
+SCHEMA_TABLE = "_opendbutils_schema"
+
+# 列编码方式
+CODEC_PLAIN = "plain"
+CODEC_INT = "int"
+CODEC_FLOAT = "float"
+CODEC_BASE64 = "base64"
+CODEC_PICKLE_BASE64 = "pickle_base64"
+CODEC_BINARY = "binary"
+CODEC_PICKLE_BINARY = "pickle_binary"
+
+
+class ColumnCodec:
+    """
+    按列批量编码/解码，输出与DataFrameUtils逐单元格编码的格式逐字节一致：
+        bytes   -> "base64_encode::" + base64
+        其他对象 -> "base64_pickle_encode::" + base64(pickle)
+    数值列直接用numpy转换类型；base64在整列上直接调用binascii，
+    省去Series.apply逐单元格调用Python方法的开销
+    """
+
+    @staticmethod
+    def decode(series: pd.Series, codec: str) -> pd.Series:
+        """
+        按元数据表中记录的编码方式解码一列
+        :param series: 从数据库读出的列
+        :param codec: 编码方式
+        :return: 解码后的列
+        """
+        if codec == CODEC_BASE64:
+            return ColumnCodec.decode_bytes(series)
+        elif codec == CODEC_PICKLE_BASE64:
+            return ColumnCodec.decode_pickle(series)
+        elif codec == CODEC_BINARY:
+            return ColumnCodec.from_binary(series)
+        elif codec == CODEC_PICKLE_BINARY:
+            return ColumnCodec.decode_pickle_binary(series)
+        return series
+
+    @staticmethod
+    def encode_bytes(series: pd.Series) -> pd.Series:
+        """bytes列 -> 带base64_encode::前缀的字符串列，空值保持为None"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        encoded = ColumnCodec.b64encode_many(list(values[mask]), BASE64_PREFIX)
+        return ColumnCodec._rebuild(series, mask, encoded)
+
+    @staticmethod
+    def decode_bytes(series: pd.Series) -> pd.Series:
+        """带base64_encode::前缀的字符串列 -> bytes列"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        decoded = ColumnCodec.b64decode_many(list(values[mask]), BASE64_PREFIX)
+        return ColumnCodec._rebuild(series, mask, decoded)
+
+    @staticmethod
+    def encode_pickle(series: pd.Series) -> pd.Series:
+        """任意对象列 -> 带base64_pickle_encode::前缀的字符串列，只有None视为空值"""
+        values = series.to_numpy(dtype=object)
+        mask = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        dumps = pickle.dumps
+        dumped = [dumps(value) for value in values[mask]]
+        encoded = ColumnCodec.b64encode_many(dumped, PICKLE_PREFIX)
+        return ColumnCodec._rebuild(series, mask, encoded)
+
+    @staticmethod
+    def decode_pickle(series: pd.Series) -> pd.Series:
+        """带base64_pickle_encode::前缀的字符串列 -> 原始对象列"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        loads = pickle.loads
+        decoded = [loads(data) for data in ColumnCodec.b64decode_many(list(values[mask]), PICKLE_PREFIX)]
+        return ColumnCodec._rebuild(series, mask, decoded)
+
+    @staticmethod
+    def to_binary(series: pd.Series) -> pd.Series:
+        """bytes列按原样以二进制存储，空值统一为None"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        return ColumnCodec._rebuild(series, mask, list(values[mask]))
+
+    @staticmethod
+    def from_binary(series: pd.Series) -> pd.Series:
+        """二进制列 -> bytes列（psycopg2返回memoryview，mysql-connector可能返回bytearray）"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        return ColumnCodec._rebuild(series, mask, [bytes(value) for value in values[mask]])
+
+    @staticmethod
+    def encode_pickle_binary(series: pd.Series) -> pd.Series:
+        """任意对象列 -> pickle后的bytes列，只有None视为空值"""
+        values = series.to_numpy(dtype=object)
+        mask = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+        dumps = pickle.dumps
+        return ColumnCodec._rebuild(series, mask, [dumps(value) for value in values[mask]])
+
+    @staticmethod
+    def decode_pickle_binary(series: pd.Series) -> pd.Series:
+        """pickle后的二进制列 -> 原始对象列"""
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        loads = pickle.loads
+        return ColumnCodec._rebuild(series, mask, [loads(value) for value in values[mask]])
+
+    @staticmethod
+    def to_int(series: pd.Series) -> pd.Series:
+        """numpy整数列 -> int64，等价于逐单元格int()"""
+        if pd.api.types.is_signed_integer_dtype(series.dtype) or series.dtype in (np.uint8, np.uint16, np.uint32):
+            return series.astype(np.int64)
+        return pd.Series([None if value is None else int(value) for value in series], index=series.index, name=series.name)
+
+    @staticmethod
+    def to_float(series: pd.Series) -> pd.Series:
+        """numpy浮点列 -> float64，等价于逐单元格float()"""
+        if pd.api.types.is_float_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+            return series.astype(np.float64)
+        return pd.Series([None if value is None else float(value) for value in series], index=series.index, name=series.name)
+
+    @staticmethod
+    def b64encode_many(values: List[bytes], prefix: str = "") -> List[str]:
+        """
+        批量base64编码
+        :param values: bytes列表
+        :param prefix: 每个结果前添加的前缀
+        :return: 字符串列表
+        """
+        b2a = binascii.b2a_base64
+        return [prefix + b2a(value, newline=False).decode("ascii") for value in values]
+
+    @staticmethod
+    def b64decode_many(strings: List[str], prefix: str = "") -> List[bytes]:
+        """
+        批量base64解码
+        :param strings: 带前缀的base64字符串列表
+        :param prefix: 需要去掉的前缀
+        :return: bytes列表
+        """
+        start = len(prefix)
+        if not all(string.startswith(prefix) for string in strings):
+            # 存在不带前缀的值，按原格式逐个解析
+            return [base64.b64decode(string.split(prefix)[1]) for string in strings]
+        a2b = binascii.a2b_base64
+        return [a2b(string[start:]) for string in strings]
+
+    @staticmethod
+    def encode_pl(series: pl.Series, binary: bool = False) -> tuple:
+        """
+        按polars列类型编码一列，格式与pandas路径一致；数值、字符串、布尔和日期时间列原样保留，不复制缓冲区
+        :param series: polars列
+        :param binary: 为True时bytes列和pickle后的对象列以原生二进制存储
+        :return: (编码后的列, 编码方式)
+        """
+        dtype = series.dtype
+        if dtype.is_integer():
+            return series, CODEC_INT
+        if dtype.is_float():
+            return series, CODEC_FLOAT
+        if dtype in (pl.Categorical, pl.Enum) or isinstance(dtype, (pl.Categorical, pl.Enum)):
+            return series.cast(pl.Utf8), CODEC_PLAIN
+        if dtype == pl.Binary:
+            if binary:
+                return series, CODEC_BINARY
+            return ColumnCodec._b64encode_pl(series, BASE64_PREFIX), CODEC_BASE64
+        if dtype.is_nested() or dtype == pl.Object:
+            dumps = pickle.dumps
+            dumped = pl.Series(series.name, [None if value is None else dumps(value) for value in series.to_list()], dtype=pl.Binary)
+            if binary:
+                return dumped, CODEC_PICKLE_BINARY
+            return ColumnCodec._b64encode_pl(dumped, PICKLE_PREFIX), CODEC_PICKLE_BASE64
+        return series, CODEC_PLAIN
+
+    @staticmethod
+    def decode_pl(series: pl.Series, codec: str, objects: bool = True) -> pl.Series:
+        """
+        按编码方式解码一列polars数据；base64在polars中按列解码，只有pickle需要逐个还原Python对象
+        :param series: 从数据库读出的列
+        :param codec: 编码方式
+        :param objects: 还原出的对象无法表示为Arrow类型时，True返回Object列，False保留pickle后的bytes
+        :return: 解码后的列
+        """
+        if series.dtype == pl.Null:
+            return series
+        if codec == CODEC_BASE64:
+            return series.str.strip_prefix(BASE64_PREFIX).str.decode("base64")
+        elif codec == CODEC_PICKLE_BASE64:
+            return ColumnCodec._unpickle_pl(series.str.strip_prefix(PICKLE_PREFIX).str.decode("base64"), objects)
+        elif codec == CODEC_BINARY:
+            return series if series.dtype == pl.Binary else series.cast(pl.Binary)
+        elif codec == CODEC_PICKLE_BINARY:
+            return ColumnCodec._unpickle_pl(series, objects)
+        return series
+
+    @staticmethod
+    def _b64encode_pl(series: pl.Series, prefix: str) -> pl.Series:
+        """Binary列 -> 带前缀的base64字符串列，空值保持为null"""
+        return pl.select((pl.lit(prefix) + series.bin.encode("base64")).alias(series.name)).to_series()
+
+    @staticmethod
+    def _unpickle_pl(series: pl.Series, objects: bool) -> pl.Series:
+        """pickle后的Binary列 -> 还原的值；列表、字典等可以推断出polars类型时转为List/Struct列"""
+        loads = pickle.loads
+        values = [None if value is None else loads(value) for value in series.to_list()]
+        try:
+            result = pl.Series(series.name, values)
+        except Exception:
+            result = pl.Series(series.name, values, dtype=pl.Object)
+        if result.dtype == pl.Object and not objects:
+            return series
+        return result
+
+    @staticmethod
+    def _rebuild(series: pd.Series, mask: np.ndarray, values: list) -> pd.Series:
+        """把非空位置的新值放回原来的位置，空值位置为None"""
+        # fromiter不会把等长的list展开成二维数组
+        result = np.full(len(series), None, dtype=object)
+        result[mask] = np.fromiter(values, dtype=object, count=len(values))
+        return pd.Series(result, index=series.index, name=series.name, dtype=object)
@@ -0,0 +1,274 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Tuple
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池，由各个数据库后端持有，并与DBUtils.engine共享"""
+
+    def __init__(
+            self,
+            creator: Callable[[], Any],
+            min_size: int = 1,
+            max_size: int = 8,
+            timeout: float = 30.0,
+            idle_timeout: float = 300.0,
+            ping_interval: float = 30.0,
+            ping: Callable[[Any], None] = None,
+            reset: Callable[[Any], None] = None
+    ):
+        """
+        初始化连接池
+        :param creator: 建立新物理连接的函数
+        :param min_size: 空闲回收时至少保留的连接数
+        :param max_size: 最大连接数（空闲 + 借出）
+        :param timeout: 等待可用连接的最长秒数
+        :param idle_timeout: 空闲超过该秒数的连接会被关闭，None表示不回收
+        :param ping_interval: 空闲超过该秒数的连接在借出前先做健康检查，0表示每次都检查，None表示不检查
+        :param ping: 健康检查函数，连接不可用时抛出异常，默认执行 SELECT 1
+        :param reset: 归还连接时的重置函数，默认执行 rollback
+        """
+        if max_size < 1:
+            raise ValueError("连接池最大连接数必须大于0")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("连接池最小连接数必须在0和最大连接数之间")
+        self.creator = creator
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.ping = ping or self._default_ping
+        self.reset = reset or self._default_reset
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use = {}
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "acquired": 0,
+            "released": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "idle_evicted": 0,
+        }
+
+    def acquire(self, timeout: float = None):
+        """
+        借用一个连接，没有空闲连接且已达上限时阻塞等待
+        :param timeout: 等待秒数，默认使用连接池的timeout
+        :return: 数据库连接
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        to_close = []
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("连接池已关闭")
+                to_close.extend(self._evict_idle_locked())
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise Exception(f"获取数据库连接超时: 等待超过 {timeout} 秒")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                wait_time = time.monotonic() - start
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += wait_time
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+        for stale in to_close:
+            self._close_quietly(stale)
+
+        if conn is not None and self._needs_ping(last_used):
+            try:
+                self.ping(conn)
+            except Exception:
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                self._close_quietly(conn)
+                conn = None
+        if conn is None:
+            try:
+                conn = self.creator()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["created"] += 1
+        with self._cond:
+            self._in_use[id(conn)] = conn
+            self._stats["acquired"] += 1
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """
+        归还连接
+        :param conn: 通过acquire借出的连接
+        :param discard: 为True时直接关闭该连接而不放回连接池
+        """
+        if not discard:
+            try:
+                self.reset(conn)
+            except Exception:
+                discard = True
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                return
+            self._stats["released"] += 1
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """以上下文管理器的方式借用连接，退出时自动归还"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def prune(self) -> int:
+        """
+        立即关闭空闲超时的连接
+        :return: 关闭的连接数
+        """
+        with self._cond:
+            stale = self._evict_idle_locked()
+        for conn in stale:
+            self._close_quietly(conn)
+        return len(stale)
+
+    def close(self) -> None:
+        """关闭连接池：关闭所有空闲连接，借出的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        """
+        连接池统计信息
+        :return: 包含连接数、借出数和等待耗时等指标的字典
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def _needs_ping(self, last_used: float) -> bool:
+        if self.ping_interval is None or last_used is None:
+            return False
+        return time.monotonic() - last_used >= self.ping_interval
+
+    def _evict_idle_locked(self) -> list:
+        """在持有锁时移除空闲超时的连接（最早归还的在列表前部），返回需要关闭的连接"""
+        if self.idle_timeout is None:
+            return []
+        now = time.monotonic()
+        stale = []
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] >= self.idle_timeout:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            self._stats["idle_evicted"] += 1
+            stale.append(conn)
+        return stale
+
+    def _close_quietly(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["closed"] += 1
+
+    @staticmethod
+    def _default_ping(conn) -> None:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _default_reset(conn) -> None:
+        conn.rollback()
+
+
+def create_pooled_engine(url: str, pool: ConnectionPool):
+    """
+    创建与ConnectionPool共享连接的SQLAlchemy引擎
+    :param url: 数据库URL，仅用于确定方言
+    :param pool: 连接池
+    :return: SQLAlchemy引擎
+    """
+    from sqlalchemy import create_engine
+    return create_engine(url, pool=_engine_pool_class()(pool))
+
+
+@functools.lru_cache(maxsize=None)
+def _engine_pool_class():
+    """在首次创建引擎时才导入SQLAlchemy并定义适配器类"""
+    from sqlalchemy.pool import NullPool
+
+    class _EnginePool(NullPool):
+        """SQLAlchemy连接池适配器：从ConnectionPool借用连接，关闭时归还而不是断开"""
+
+        def __init__(self, shared_pool: ConnectionPool, **kwargs):
+            self._shared_pool = shared_pool
+            super().__init__(lambda: shared_pool.acquire(), **kwargs)
+
+        def _close_connection(self, connection, *args, terminate: bool = False, **kwargs) -> None:
+            self._shared_pool.release(connection, discard=terminate)
+
+        def recreate(self):
+            return self.__class__(
+                self._shared_pool,
+                recycle=self._recycle,
+                echo=self.echo,
+                logging_name=self._orig_logging_name,
+                reset_on_return=self._reset_on_return,
+                pre_ping=self._pre_ping,
+                _dispatch=self.dispatch,
+                dialect=self._dialect,
+            )
+
+    return _EnginePool
+
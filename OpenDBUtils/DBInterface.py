@@ -1,7 +1,14 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Iterator
 import pandas as pd
 import polars as pl
+from .ConnectionPool import create_pooled_engine
+from .Instrumentation import Instrumentation
+from .Session import SessionConnection
+
+# upsert暂存表中的行号列，用于分段合并
+STAGING_ROW_COLUMN = "_opendbutils_row"
 
 class DBInterface(ABC):
     """数据库操作的抽象接口类"""
@@ -9,11 +16,109 @@ class DBInterface(ABC):
     @abstractmethod
     def __init__(self, dbname: str, user: str, password: str, host: str = 'localhost', port: str = None):
         """初始化数据库连接参数"""
-        pass
+        # 各线程进行中的会话所固定的连接（见Session）
+        self._session_local = threading.local()
+        # 计时区间的分发器，DBUtils通过它添加观测者（见Instrumentation）
+        self.instrumentation = Instrumentation()
+        self._engine = None
+        self._engine_lock = threading.Lock()
 
     @abstractmethod
     def _connect(self):
-        """建立数据库连接"""
+        """从连接池借用数据库连接，返回 (conn, cursor)"""
+        pass
+
+    @abstractmethod
+    def _release(self, conn, cursor):
+        """关闭游标并将连接归还连接池"""
+        pass
+
+    def _session_connection(self) -> SessionConnection | None:
+        """当前线程进行中的会话固定的连接，没有会话时返回None"""
+        return getattr(self._session_local, "conn", None)
+
+    @property
+    def engine(self):
+        """与连接池共享连接的SQLAlchemy引擎，首次访问时才导入SQLAlchemy并创建（URL由后端设置为_engine_url）"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = create_pooled_engine(self._engine_url, self.pool)
+        return self._engine
+
+    def _dispose_engine(self) -> None:
+        """关闭时释放已创建的引擎"""
+        if self._engine is not None:
+            self._engine.dispose()
+
+    def _acquire(self):
+        """从连接池借用连接，等待和建立连接的耗时记录为connect区间"""
+        with self.instrumentation.span("connect"):
+            return self.pool.acquire()
+
+    def _return_connection(self, conn, discard: bool = False) -> None:
+        """把连接归还连接池；会话固定的连接在会话结束时才归还"""
+        if conn is not self._session_connection():
+            self.pool.release(conn, discard=discard)
+
+    def open_session(self) -> SessionConnection:
+        """借出一个连接并固定给当前线程，之后当前线程的操作都使用该连接且不单独提交"""
+        # 先检查再借出，嵌套会话报错时不会占用连接池的连接
+        if self._session_connection() is not None:
+            raise ValueError("当前线程已有进行中的会话")
+        return self._pin_session(self.pool.acquire())
+
+    def close_session(self, commit: bool) -> None:
+        """
+        结束当前线程的会话：提交或回滚，然后归还连接
+        :param commit: 是否提交
+        """
+        conn = self._require_session()
+        try:
+            self._end_session(conn, commit)
+        finally:
+            self.pool.release(conn.raw)
+
+    def commit_session(self) -> None:
+        """提交当前会话的事务，会话继续使用同一个连接"""
+        conn = self._require_session()
+        if conn.failed:
+            raise Exception("会话中的操作已失败并回滚，不能提交")
+        conn.raw.commit()
+
+    def rollback_session(self) -> None:
+        """回滚当前会话的事务，会话继续使用同一个连接"""
+        conn = self._require_session()
+        conn.raw.rollback()
+        conn.restart()
+
+    def _pin_session(self, conn) -> SessionConnection:
+        if self._session_connection() is not None:
+            raise ValueError("当前线程已有进行中的会话")
+        session_conn = SessionConnection(conn)
+        self._session_local.conn = session_conn
+        return session_conn
+
+    def _require_session(self) -> SessionConnection:
+        conn = self._session_connection()
+        if conn is None:
+            raise ValueError("当前线程没有进行中的会话")
+        return conn
+
+    def _end_session(self, conn: SessionConnection, commit: bool) -> None:
+        """解除固定并提交或回滚；会话中有操作失败时不能提交"""
+        self._session_local.conn = None
+        if commit and conn.failed:
+            conn.raw.rollback()
+            raise Exception("会话中的操作已失败并回滚，不能提交")
+        if commit:
+            conn.raw.commit()
+        else:
+            conn.raw.rollback()
+
+    @abstractmethod
+    def close(self) -> None:
+        """关闭连接池中的所有连接"""
         pass
     
     @abstractmethod
@@ -31,6 +136,11 @@ class DBInterface(ABC):
         """插入单条数据"""
         pass
 
+    @abstractmethod
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
+        """在一个连接、一个事务中批量插入多行"""
+        pass
+
     @abstractmethod
     def insert_df(self, data: pd.DataFrame|pl.DataFrame, table_name: str):
         """插入DataFrame"""
@@ -46,16 +156,102 @@ class DBInterface(ABC):
         """查询数据并转换为DataFrame"""
         pass
 
+    @abstractmethod
+    def select_sql(self, sql: str, params: list = None) -> pd.DataFrame:
+        """在服务器上执行完整的SELECT语句并转换为DataFrame"""
+        pass
+
+    @abstractmethod
+    def select_sql_pl(self, sql: str, params: list = None) -> pl.DataFrame:
+        """在服务器上执行完整的SELECT语句并直接读为polars DataFrame，不经过pandas"""
+        pass
+
+    @abstractmethod
+    def select_pl(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None, offset: int = None) -> pl.DataFrame:
+        """查询数据并直接读为polars DataFrame（Arrow内存），不经过pandas"""
+        pass
+
+    @abstractmethod
+    def select_iter(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None, batch_rows: int = 10000) -> Iterator[pd.DataFrame]:
+        """流式查询数据，按批返回DataFrame"""
+        pass
+
     @abstractmethod
     def count_data(self, table_name: str, condition: str = None) -> int:
         """查询数据数量"""
         pass
 
+    @abstractmethod
+    def estimate_count(self, table_name: str) -> int | None:
+        """从数据库统计信息读取表的估计行数，不扫描表"""
+        pass
+
+    @abstractmethod
+    def primary_key(self, table_name: str) -> List[str]:
+        """查询主键列"""
+        pass
+
+    @abstractmethod
+    def key_bounds(self, table_name: str, column: str, condition: str = None) -> Tuple[Any, Any]:
+        """查询列的最小值和最大值"""
+        pass
+
+    @abstractmethod
+    def key_histogram(self, table_name: str, column: str) -> List[Tuple[Any, float]]:
+        """读取列直方图统计信息"""
+        pass
+
+    @abstractmethod
+    def binary_column_type(self, pickled: bool = False) -> str:
+        """原生二进制列的DDL类型"""
+        pass
+
+    @abstractmethod
+    def mark_pickle_column(self, table_name: str, column: str) -> None:
+        """在表结构中把二进制列标记为pickle列"""
+        pass
+
+    @abstractmethod
+    def binary_columns(self, table_name: str) -> dict:
+        """从表结构中读取二进制列及其编码方式"""
+        pass
+
+    @abstractmethod
+    def save_column_codecs(self, table_name: str, column_codecs: dict, replace: bool = False) -> None:
+        """把各列的编码方式写入元数据表"""
+        pass
+
+    @abstractmethod
+    def load_column_codecs(self, table_name: str) -> dict:
+        """从元数据表读取各列的编码方式"""
+        pass
+
+    @abstractmethod
+    def delete_column_codecs(self, table_name: str) -> None:
+        """删除元数据表中该表的记录"""
+        pass
+
     @abstractmethod
     def delete_data(self, table_name: str, condition: str) -> None:
         """删除数据"""
         pass
 
+    @abstractmethod
+    def create_staging_table(self, table_name: str, staging_name: str, columns: List[str]) -> None:
+        """创建只在当前连接可见的临时暂存表，列类型与目标表相同，另有带索引的行号列"""
+        pass
+
+    @abstractmethod
+    def merge_staging(self, table_name: str, staging_name: str, columns: List[str], key_columns: List[str],
+                      update_columns: List[str], start: int, stop: int) -> int:
+        """把暂存表中行号在[start, stop)内的行合并进目标表，键冲突时更新update_columns"""
+        pass
+
+    @abstractmethod
+    def drop_staging_table(self, staging_name: str) -> None:
+        """删除临时暂存表"""
+        pass
+
     @abstractmethod
     def drop_table(self, table_name: str) -> None:
         """删除表"""
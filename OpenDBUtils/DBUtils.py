@@ -1,58 +1,382 @@
-from .PostgreUtils import PostgreUtils
-from .MysqlUtils import MysqlUtils
-from .SQLiteUtils import SQLiteUtils
 import pandas as pd
 import concurrent.futures
-from sqlalchemy import create_engine
+import importlib
+import os
+import time
+import functools
+import threading
+import uuid
+import collections
+from contextlib import contextmanager
 import polars as pl
-import base64
-import pickle
-from typing import List
+import json
+from typing import List, Iterator
 import numpy as np
+from pandas.api.types import infer_dtype
+from .ProcessCodec import ProcessCodec
+from .AutoTune import DEFAULT_CHUNK_BYTES, PROBE_ROWS, ConcurrencyTuner, auto_chunk_size
+from .Instrumentation import Observer, StatsCollector
+from .QueryCache import QueryCache
+from .QueryBuilder import TableQuery
+from .RowWriter import RowWriter
+from .SqlPlanner import SqlPlanner
+from .Session import Session
+from .DBInterface import STAGING_ROW_COLUMN
+from .ColumnCodec import (
+    ColumnCodec, BASE64_PREFIX, PICKLE_PREFIX, CODEC_PLAIN, CODEC_INT, CODEC_FLOAT,
+    CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_BINARY, CODEC_PICKLE_BINARY
+)
+
+# db_instance -> (后端模块/类名, 所需驱动的可选依赖名)
+_BACKENDS = {
+    "postgresql": ("PostgreUtils", "postgresql"),
+    "mysql": ("MysqlUtils", "mysql"),
+    "sqlite": ("SQLiteUtils", None),
+}
+
+
+def _load_backend(db_instance: str):
+    """首次使用某种数据库时才导入其后端模块和驱动，只用SQLite时不加载psycopg2和mysql.connector"""
+    if db_instance not in _BACKENDS:
+        raise ValueError(f"Unsupported database instance: {db_instance}")
+    name, extra = _BACKENDS[db_instance]
+    try:
+        module = importlib.import_module(f".{name}", __package__)
+    except ImportError as e:
+        if extra is None:
+            raise
+        raise ImportError(f"{db_instance}后端需要安装数据库驱动: pip install \"OpenDBUtils[{extra}]\" ({str(e)})") from e
+    return getattr(module, name)
+
 
 class DBUtils:
-    def __init__(self, db_name, user=None, password=None, host=None, port=None, db_instance="postgresql"):
+    def __init__(
+            self,
+            db_name,
+            user=None,
+            password=None,
+            host=None,
+            port=None,
+            db_instance="postgresql",
+            pool_min_size: int = 1,
+            pool_max_size: int = 8,
+            pool_timeout: float = 30.0,
+            pool_idle_timeout: float = 300.0,
+            pool_ping_interval: float = 30.0,
+            sqlite_profile: str | dict = "default",
+            sqlite_writer_profile: str | dict = "bulk_load",
+            codec_processes: int = None,
+            cache_max_bytes: int = 0,
+            cache_ttl: float = 60.0,
+            collect_stats: bool = False,
+            auto_chunk_bytes: int = DEFAULT_CHUNK_BYTES
+    ):
+        """
+        初始化数据库工具
+        :param db_instance: "postgresql"、"mysql" 或 "sqlite"
+        :param sqlite_profile: SQLite连接池连接的PRAGMA配置（"default"、"read_heavy" 或 {pragma: 值}）
+        :param sqlite_writer_profile: SQLite专用写连接的PRAGMA配置（默认 "bulk_load"）
+        :param codec_processes: query_df(process_codec=True)时解码使用的子进程数，默认为CPU核数
+        :param cache_max_bytes: query_df结果缓存的字节数上限，0表示不缓存
+        :param cache_ttl: 缓存条目的有效秒数，None表示只在写入该表或容量不足时失效
+        :param collect_stats: 是否启用内置的统计观测者，记录连接、分块读写、编解码、计数和线程池排队的耗时，见stats
+        :param auto_chunk_bytes: chunk_size="auto"时每块的目标字节数
+        """
+        pool_options = dict(
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_timeout=pool_timeout,
+            pool_idle_timeout=pool_idle_timeout,
+            pool_ping_interval=pool_ping_interval
+        )
         if db_instance == "postgresql":
             if not user or not password or not host or not port:
                 raise ValueError("PostgreSQL数据库需要提供用户名、密码、主机和端口")
-            self.db = PostgreUtils(db_name, user, password, host, port)
-            self.engine = create_engine(f"postgresql://{user}:{password}@{host}:{port}/{db_name}")  
+            self.db = _load_backend(db_instance)(db_name, user, password, host, port, **pool_options)
         elif db_instance == "mysql":
             if not user or not password or not host or not port:
                 raise ValueError("MySQL数据库需要提供用户名、密码、主机和端口")
-            self.db = MysqlUtils(db_name, user, password, host, port)
-            self.engine = create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db_name}")
+            self.db = _load_backend(db_instance)(db_name, user, password, host, port, **pool_options)
         elif db_instance == "sqlite":
             if not db_name:
                 raise ValueError("SQLite数据库需要提供数据库文件名")
-            self.db = SQLiteUtils(db_name, user, password, host, port)
-            self.engine = create_engine(f"sqlite:///{db_name}")
+            self.db = _load_backend(db_instance)(db_name, user, password, host, port, **pool_options,
+                                                 pragma_profile=sqlite_profile, writer_profile=sqlite_writer_profile)
         else:
             raise ValueError(f"Unsupported database instance: {db_instance}")
+        self.db_instance = db_instance
+        # 各表的列编码方式缓存 {表名: {列名: 编码方式}}
+        self._codec_cache = {}
+        self._codec_lock = threading.Lock()
+        # 分块读写共用的线程池，为None时每次调用新建（AsyncDBUtils会设置为共享的有界线程池）
+        self.executor = None
+        self._process_codec = ProcessCodec(codec_processes)
+        # query_df的结果缓存，通过本对象写入、删除或执行SQL时自动使相关表的缓存失效
+        self.query_cache = QueryCache(cache_max_bytes, cache_ttl) if cache_max_bytes else None
+        # 计时区间由后端和本对象共同产生，没有观测者时不计时
+        self.instrumentation = self.db.instrumentation
+        self.instrumentation.backend = db_instance
+        self.stats_collector = StatsCollector() if collect_stats else None
+        if self.stats_collector is not None:
+            self.instrumentation.add_observer(self.stats_collector)
+        self.auto_chunk_bytes = auto_chunk_bytes
+        # 最近一次自动调节的结果，见autotune_stats
+        self._autotune = None
+
+    @property
+    def engine(self):
+        """与后端共享同一个连接池的SQLAlchemy引擎，首次使用时才导入SQLAlchemy并创建"""
+        return self.db.engine
+
+    @contextmanager
+    def _chunk_executor(self, max_workers: int):
+        """分块任务使用的线程池：设置了共享线程池时直接使用，否则为本次调用新建"""
+        if self.executor is not None:
+            yield self.executor
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor
+
+    def _submit(self, executor, fn, *args, **kwargs) -> concurrent.futures.Future:
+        """提交任务到线程池；有观测者时把任务在队列中等待的时间记录为queue_wait区间"""
+        if not self.instrumentation.enabled:
+            return executor.submit(fn, *args, **kwargs)
+        submitted = time.perf_counter()
+
+        def run():
+            self.instrumentation.emit("queue_wait", time.perf_counter() - submitted, {})
+            return fn(*args, **kwargs)
+
+        return executor.submit(run)
+
+    def _resolve_workers(self, max_workers: int | str, writer: bool = False) -> tuple:
+        """
+        解析max_workers参数
+        "auto": 线程池大小为连接池上限，由ConcurrencyTuner在运行中调整同时执行的块数；
+            SQLite写入只有一个写连接，线程池只用于准备行数据，大小为CPU核数且不调整
+        :return: (线程池大小, 并发调节器)，固定并发时调节器为None
+        """
+        if max_workers != "auto":
+            if not isinstance(max_workers, int) or max_workers < 1:
+                raise ValueError(f"max_workers必须是正整数或\"auto\": {max_workers}")
+            return max_workers, None
+        if writer and self.db_instance == "sqlite":
+            return os.cpu_count() or 4, None
+        tuner = ConcurrencyTuner(self.db.pool.max_size)
+        return tuner.max_workers, tuner
+
+    def _run_adaptive(self, executor, tuner: ConcurrencyTuner, tasks) -> list:
+        """
+        按tuner.limit控制同时执行的块数，依次提交tasks中的无参数任务
+        :return: 按提交顺序排列的任务结果
+        """
+        results = {}
+        pending = {}
+        tasks = enumerate(tasks)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < tuner.limit:
+                    item = next(tasks, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, task = item
+                    pending[self._submit(executor, tuner.timed(task))] = index
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+        return [results[i] for i in range(len(results))]
+
+    def _note_autotune(self, chunk_size: int, tuner: ConcurrencyTuner = None) -> None:
+        self._autotune = {"chunk_size": chunk_size, **(tuner.summary() if tuner is not None else {})}
+
+    def autotune_stats(self) -> dict:
+        """
+        最近一次使用chunk_size="auto"或max_workers="auto"的调用选定的块大小，以及并发调整过程
+        :return: {"chunk_size", "max_workers", "workers", "windows": [{"workers", "rows_per_sec", "latency"}]}，没有时返回None
+        """
+        return self._autotune
+
+    def add_observer(self, observer: Observer) -> Observer:
+        """
+        添加观测者，接收计时区间 connect、insert_df、insert_rows、select_df、count_data、execute、delete_data、
+        encode、decode、queue_wait，以及SQLite专用写连接的write_chunks（见Instrumentation.Observer）
+        :param observer: Observer实例，或 callback(name, seconds, attrs) 函数
+        :return: 添加的观测者，用于remove_observer
+        """
+        return self.instrumentation.add_observer(observer)
+
+    def remove_observer(self, observer: Observer) -> None:
+        """移除观测者"""
+        self.instrumentation.remove_observer(observer)
+
+    def stats(self, format: str = "dict") -> dict | str:
+        """
+        统计摘要：各计时区间的次数、耗时、行数、字节数和错误数（需要collect_stats=True），以及连接池和结果缓存的统计信息
+        :param format: "dict"、"json"，或 "prometheus"（Prometheus文本格式）
+        """
+        if format == "prometheus":
+            text = self.stats_collector.to_prometheus() if self.stats_collector is not None else ""
+            pool = self.pool_stats()
+            lines = []
+            for key, value in pool.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE opendbutils_pool_{key} gauge")
+                    lines.append(f'opendbutils_pool_{key}{{backend="{self.instrumentation.backend}"}} {value}')
+            return text + "\n".join(lines) + "\n"
+        stats = {
+            "spans": self.stats_collector.summary() if self.stats_collector is not None else None,
+            "pool": self.pool_stats(),
+            "cache": self.cache_stats(),
+        }
+        if format == "json":
+            return json.dumps(stats)
+        if format == "dict":
+            return stats
+        raise ValueError(f"Unsupported stats format: {format}")
+
+    def reset_stats(self) -> None:
+        """清零计时区间的统计"""
+        if self.stats_collector is not None:
+            self.stats_collector.reset()
+
+    def pool_stats(self) -> dict:
+        """连接池统计信息（连接数、借出数、等待次数与耗时等）"""
+        return self.db.pool.stats()
+
+    @contextmanager
+    def session(self, commit: bool = False) -> Iterator[Session]:
+        """
+        固定一个连接的会话，会话中的execute、store_df、insert_rows、delete_data、query_df、count在同一个事务中执行:
+            with db.session() as s:
+                s.delete_data("events", "day = '2024-01-01'")
+                s.store_df(df, "events")
+                s.commit()
+        :param commit: 退出时是否自动提交；为False时需调用s.commit()，退出时未提交的操作回滚。出现异常时总是回滚
+        """
+        self.db.open_session()
+        session = Session(self)
+        try:
+            yield session
+        except BaseException:
+            self.db.close_session(commit=False)
+            raise
+        self.db.close_session(commit=commit)
+        if commit:
+            session._invalidate()
+
+    def transaction(self):
+        """
+        事务: with db.transaction() as s: ...，正常退出时提交，出现异常时回滚，见session
+        """
+        return self.session(commit=True)
+
+    def cache_stats(self) -> dict:
+        """结果缓存统计信息（命中、未命中、淘汰次数等），未启用缓存时返回None"""
+        return self.query_cache.stats() if self.query_cache is not None else None
+
+    def clear_cache(self) -> None:
+        """清空结果缓存"""
+        if self.query_cache is not None:
+            self.query_cache.clear()
+
+    def _invalidate(self, table_name: str = None) -> None:
+        """使表（None表示全部表）的结果缓存失效"""
+        if self.query_cache is not None:
+            self.query_cache.invalidate(table_name)
+
+    def close(self) -> None:
+        """关闭连接池中的所有连接，以及已创建的编解码进程池"""
+        self.db.close()
+        self._process_codec.close()
 
     def store_df(
             self, 
             data: pl.DataFrame | pd.DataFrame, 
             table_name: str, 
-            chunk_size: int = 2048, 
-            max_workers: int = 8, 
+            chunk_size: int | str = 2048, 
+            max_workers: int | str = 8, 
             table_replace: bool = False, 
             encode: bool = True,
-            include_index: bool = False
+            include_index: bool = False,
+            binary: bool = False,
+            backend: str = "pandas"
     ):
+        """
+        并行分块写入DataFrame
+        :param chunk_size: 每块的行数；"auto"按编码后的平均行宽使每块约为auto_chunk_bytes字节
+        :param max_workers: 并行线程数；"auto"在写入过程中按每块的吞吐量和延迟调整并发数（上限为连接池大小），见autotune_stats
+        :param binary: 为True时bytes列和对象列以原生二进制列（BYTEA/LONGBLOB/BLOB）存储，而不是base64文本
+        :param backend: 编码方式
+            "pandas": 转为pandas后按单元格的Python类型判断各列的编码方式
+            "polars"/"arrow": 数据保持在Arrow缓冲区中，按polars列类型编码，只有需要编码的列会生成新缓冲区，
+                分块为零拷贝切片；data也可以是pyarrow.Table
+        """
         if data is None:
             return
-        if isinstance(data, pl.DataFrame):
-            data = data.to_pandas()
-        data = DataFrameUtils(data).encode(encode)
-        data = pl.from_pandas(data, include_index=include_index)
-        if table_replace:
-            data.head(0).write_database(table_name, self.engine.connect(), if_table_exists="replace")
-        num_chunks = (len(data) + chunk_size - 1) // chunk_size  # 计算总块数
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(self.db.insert_df, data.slice(i * chunk_size, chunk_size), table_name) for i in range(num_chunks)]
-            for future in futures:
-                future.result()
+        if backend in ("polars", "arrow") and len(data) == 0:
+            return
+        data, frame_utils = self._encode_frame(data, encode, include_index, binary, backend)
+        auto = "auto" in (chunk_size, max_workers)
+        if chunk_size == "auto":
+            chunk_size = auto_chunk_size(data.estimated_size() / max(len(data), 1), self.auto_chunk_bytes)
+        max_workers, tuner = self._resolve_workers(max_workers, writer=True)
+        # 写入前后都使缓存失效：写入期间开始的查询不会被缓存，写入后的查询读到新数据
+        self._invalidate(table_name)
+        try:
+            if table_replace:
+                self._replace_table(data, table_name, frame_utils.binary_columns)
+            self._save_column_codecs(table_name, frame_utils.column_codecs, replace=table_replace)
+            if self.db_instance == "sqlite":
+                self._store_single_writer(data, table_name, chunk_size, max_workers)
+            else:
+                num_chunks = (len(data) + chunk_size - 1) // chunk_size  # 计算总块数
+                with self._chunk_executor(max_workers) as executor:
+                    if tuner is not None:
+                        self._run_adaptive(executor, tuner, (
+                            functools.partial(self.db.insert_df, data.slice(i * chunk_size, chunk_size), table_name)
+                            for i in range(num_chunks)
+                        ))
+                    else:
+                        futures = [self._submit(executor, self.db.insert_df, data.slice(i * chunk_size, chunk_size), table_name) for i in range(num_chunks)]
+                        for future in futures:
+                            future.result()
+            if auto:
+                self._note_autotune(chunk_size, tuner)
+        finally:
+            self._invalidate(table_name)
+
+    def _encode_frame(self, data, encode: bool, include_index: bool, binary: bool, backend: str):
+        """
+        按store_df的backend编码DataFrame
+        :return: (编码后的polars DataFrame, 编码器)，编码器记录了各列的编码方式和原生二进制列
+        """
+        if backend not in ("pandas", "polars", "arrow"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        with self.instrumentation.span("encode", rows=len(data)) as attrs:
+            if backend == "pandas":
+                if isinstance(data, pl.DataFrame):
+                    data = data.to_pandas()
+                frame_utils = DataFrameUtils(data)
+                data = frame_utils.encode(encode, binary=binary)
+                data = pl.from_pandas(data, include_index=include_index)
+            else:
+                if isinstance(data, pd.DataFrame):
+                    data = pl.from_pandas(data, include_index=include_index)
+                elif not isinstance(data, pl.DataFrame):
+                    data = pl.from_arrow(data)
+                frame_utils = PolarsFrameUtils(data)
+                data = frame_utils.encode(encode, binary=binary)
+            if self.instrumentation.enabled:
+                attrs["bytes"] = int(data.estimated_size())
+            return data, frame_utils
 
     def store_dict(
             self, 
@@ -61,10 +385,387 @@ class DBUtils:
             max_workers: int = 8, 
             table_replace: bool = False, 
             encode: bool = True,
-            include_index: bool = False
+            include_index: bool = False,
+            binary: bool = False,
+            backend: str = "pandas"
     ):
         for key, data in datas.items():
-            self.store_df(data, key, chunk_size, max_workers, table_replace, encode, include_index)
+            self.store_df(data, key, chunk_size, max_workers, table_replace, encode, include_index, binary, backend)
+
+    def upsert_df(
+            self,
+            data: pl.DataFrame | pd.DataFrame,
+            table_name: str,
+            key_columns: List[str],
+            update_columns: List[str] = None,
+            chunk_size: int = 50000,
+            encode: bool = True,
+            include_index: bool = False,
+            binary: bool = False,
+            backend: str = "pandas"
+    ) -> dict:
+        """
+        按键批量插入或更新：先在一个固定连接上把数据整体写入临时暂存表（走各数据库最快的写入方式：PostgreSQL的COPY、
+        MySQL的LOAD DATA、SQLite的专用写连接），再按行号分段执行 INSERT ... SELECT ... ON CONFLICT DO UPDATE
+        （PostgreSQL/SQLite）或 ON DUPLICATE KEY UPDATE（MySQL），每段单独提交，避免长事务持有大量行锁和WAL
+        中途失败时已提交的段保留，重新执行同一次upsert即可补齐
+        :param data: 数据，列名须为目标表的列，同一键出现多次时保留最后一行
+        :param table_name: 目标表名，key_columns上需要有主键或唯一索引
+        :param key_columns: 判断冲突的键列
+        :param update_columns: 键冲突时更新的列，默认为除键列外的全部列；为空列表时只插入新键，保留已有行
+        :param chunk_size: 每段合并的行数
+        :param encode: 编码方式同store_df
+        :param include_index: 是否写入索引，同store_df
+        :param binary: 同store_df
+        :param backend: 同store_df
+        :return: {"rows", "chunks", "affected", "seconds", "rows_per_sec"}，affected为数据库报告的影响行数
+            （MySQL中更新的行计为2）
+        """
+        if not key_columns:
+            raise ValueError("key_columns不能为空")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError(f"chunk_size必须是正整数: {chunk_size}")
+        start = time.perf_counter()
+        stats = {"rows": 0, "chunks": 0, "affected": 0}
+        if data is None or len(data) == 0:
+            return self._stream_stats(stats, start)
+        data, frame_utils = self._encode_frame(data, encode, include_index, binary, backend)
+        columns = list(data.columns)
+        missing = [column for column in key_columns if column not in columns]
+        if missing:
+            raise ValueError(f"数据中缺少键列: {', '.join(missing)}")
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in key_columns]
+        # 一条语句中同一键出现两次时ON CONFLICT DO UPDATE会报错
+        data = data.unique(subset=key_columns, keep="last", maintain_order=True)
+        data = data.with_columns(pl.int_range(0, pl.len(), dtype=pl.Int64).alias(STAGING_ROW_COLUMN))
+        staging_name = f"_opendbutils_stage_{uuid.uuid4().hex[:12]}"
+        self._invalidate(table_name)
+        try:
+            # 临时表只在创建它的连接上可见，暂存、合并和删除都在会话固定的连接上进行
+            with self.session() as session:
+                try:
+                    self.db.create_staging_table(table_name, staging_name, columns)
+                    for i in range(0, len(data), chunk_size):
+                        self.db.insert_df(data.slice(i, chunk_size), staging_name)
+                    if frame_utils.column_codecs:
+                        self.db.save_column_codecs(table_name, frame_utils.column_codecs)
+                    session.commit()
+                    for i in range(0, len(data), chunk_size):
+                        stats["affected"] += self.db.merge_staging(
+                            table_name, staging_name, columns, key_columns, update_columns, i, i + chunk_size
+                        )
+                        session.commit()
+                        stats["rows"] += min(chunk_size, len(data) - i)
+                        stats["chunks"] += 1
+                except BaseException:
+                    session.rollback()
+                    try:
+                        self.db.drop_staging_table(staging_name)
+                        session.commit()
+                    except Exception:
+                        # 保留原始错误；暂存表名唯一，残留的临时表随连接关闭而删除
+                        pass
+                    raise
+                self.db.drop_staging_table(staging_name)
+                session.commit()
+        finally:
+            self._forget_codecs(table_name)
+            self._invalidate(table_name)
+        return self._stream_stats(stats, start)
+
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
+        """
+        在一个连接、一个事务中批量插入多行（不做列编码），代替逐行调用insert_data
+        PostgreSQL使用按(表, 列)缓存的服务端预处理多行INSERT，MySQL使用executemany改写的多行INSERT，SQLite经由专用写连接
+        :param table_name: 表名
+        :param columns: 列名列表
+        :param rows: 行数据，每行按columns顺序排列
+        :param batch_size: 每条INSERT语句的行数
+        :return: 插入的行数
+        """
+        try:
+            return self.db.insert_rows(table_name, columns, rows, batch_size=batch_size)
+        finally:
+            self._invalidate(table_name)
+
+    def row_writer(
+            self,
+            table_name: str,
+            columns: List[str],
+            max_rows: int = 10000,
+            max_delay: float = 1.0,
+            batch_size: int = 1000
+    ) -> RowWriter:
+        """
+        创建缓冲写入器，积累到max_rows行或等待超过max_delay秒时通过insert_rows批量写入，见RowWriter
+        用法: with db.row_writer("events", ["ts", "kind"]) as writer: writer.write((ts, kind))
+        """
+        return RowWriter(self, table_name, columns, max_rows=max_rows, max_delay=max_delay, batch_size=batch_size)
+
+    def store_stream(
+            self,
+            source,
+            table_name: str,
+            chunk_size: int = 2048,
+            max_workers: int = 8,
+            max_in_flight: int = None,
+            batch_rows: int = 100000,
+            table_replace: bool = False,
+            encode: bool = True,
+            binary: bool = False,
+            backend: str = "polars"
+    ) -> dict:
+        """
+        流式写入：逐批读取数据源，各块在线程池中编码并写入，同时只保留有限的块在内存中
+        :param source: 数据源
+            DataFrame（pandas/polars/pyarrow.Table），或产生DataFrame/pyarrow.RecordBatch的迭代器
+            polars LazyFrame（例如 pl.scan_parquet/pl.scan_csv 的结果），由流式引擎逐批执行
+            文件路径（.parquet、.csv、.ipc/.arrow/.feather、.ndjson/.jsonl），按扩展名使用对应的pl.scan_*
+        :param chunk_size: 每块的行数，每块单独编码和写入
+        :param max_workers: 并行线程数
+        :param max_in_flight: 已提交但未写入的块数上限，默认为max_workers的2倍；达到上限时暂停读取数据源
+        :param batch_rows: 从LazyFrame/文件每次读取的行数
+        :param table_replace: 是否按第一块的结构重建表
+        :param backend: 编码方式，"polars"/"arrow"（按列类型）或 "pandas"（按单元格的Python类型），见store_df
+        :return: 统计信息 {"rows", "chunks", "seconds", "rows_per_sec"}
+        """
+        if backend not in ("pandas", "polars", "arrow"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        max_in_flight = max_in_flight or 2 * max_workers
+        start = time.perf_counter()
+        stats = {"rows": 0, "chunks": 0}
+        chunks = self._stream_chunks(source, chunk_size, batch_rows)
+        encode_chunk = functools.partial(self._encode_chunk, encode=encode, binary=binary, backend=backend)
+        self._invalidate(table_name)
+        try:
+            first = next(chunks, None)
+            if first is None:
+                return self._stream_stats(stats, start)
+            # 第一块在当前线程编码，按其结构建表并写入编码元数据
+            data, frame_utils = encode_chunk(first)
+            if table_replace:
+                self._replace_table(data, table_name, frame_utils.binary_columns)
+            codecs = {}
+            self._merge_stream_codecs(codecs, frame_utils.column_codecs)
+            self._save_column_codecs(table_name, frame_utils.column_codecs, replace=table_replace)
+            with self._chunk_executor(max_workers) as executor:
+                if self.db_instance == "sqlite":
+                    # 各块在线程池中编码并转换为行元组，按顺序交给专用写连接在一个事务中写入；
+                    # 写事务进行期间其他连接不能写入元数据表，后续块升级的编码方式在写入结束后保存
+                    upgraded = {}
+
+                    def prepare(chunk):
+                        chunk_data, chunk_utils = encode_chunk(chunk)
+                        return self.db.prepare_rows(chunk_data), chunk_utils.column_codecs
+
+                    def prepared_chunks():
+                        pending = collections.deque()
+                        yield self.db.prepare_rows(data)
+                        for chunk in chunks:
+                            pending.append(self._submit(executor, prepare, chunk))
+                            if len(pending) >= max_in_flight:
+                                rows, chunk_codecs = pending.popleft().result()
+                                upgraded.update(self._merge_stream_codecs(codecs, chunk_codecs))
+                                yield rows
+                        while pending:
+                            rows, chunk_codecs = pending.popleft().result()
+                            upgraded.update(self._merge_stream_codecs(codecs, chunk_codecs))
+                            yield rows
+
+                    result = self.db.write_chunks(table_name, data.columns, prepared_chunks(), schema=data.schema)
+                    stats["rows"], stats["chunks"] = result["rows"], result["batches"]
+                    if upgraded:
+                        self._save_column_codecs(table_name, upgraded)
+                    return self._stream_stats(stats, start)
+
+                def insert(chunk_data, chunk_codecs):
+                    self.db.insert_df(chunk_data, table_name)
+                    return len(chunk_data), chunk_codecs
+
+                def write(chunk):
+                    chunk_data, chunk_utils = encode_chunk(chunk)
+                    return insert(chunk_data, chunk_utils.column_codecs)
+
+                def collect(future):
+                    rows, chunk_codecs = future.result()
+                    stats["rows"] += rows
+                    stats["chunks"] += 1
+                    upgraded = self._merge_stream_codecs(codecs, chunk_codecs)
+                    if upgraded:
+                        self._save_column_codecs(table_name, upgraded)
+
+                pending = collections.deque([self._submit(executor, insert, data, frame_utils.column_codecs)])
+                try:
+                    for chunk in chunks:
+                        # 背压: 未完成的块达到上限时先等待最早的块写完，再读取数据源
+                        while len(pending) >= max_in_flight:
+                            collect(pending.popleft())
+                        pending.append(self._submit(executor, write, chunk))
+                    while pending:
+                        collect(pending.popleft())
+                except BaseException:
+                    for future in pending:
+                        future.cancel()
+                    raise
+            return self._stream_stats(stats, start)
+        finally:
+            self._invalidate(table_name)
+
+    @staticmethod
+    def _stream_stats(stats: dict, start: float) -> dict:
+        seconds = time.perf_counter() - start
+        stats.update(seconds=seconds, rows_per_sec=stats["rows"] / seconds if seconds > 0 else 0.0)
+        return stats
+
+    @staticmethod
+    def _stream_chunks(source, chunk_size: int, batch_rows: int) -> Iterator[pd.DataFrame | pl.DataFrame]:
+        """把数据源逐批读取并切成chunk_size行的块，polars的块为零拷贝切片"""
+        if isinstance(source, (str, os.PathLike)):
+            source = DBUtils._scan_file(source)
+        if isinstance(source, pl.LazyFrame):
+            batches = DBUtils._lazy_batches(source, batch_rows)
+        elif isinstance(source, (pd.DataFrame, pl.DataFrame)) or hasattr(source, "to_batches"):
+            batches = [source]
+        else:
+            batches = source
+        for batch in batches:
+            if isinstance(batch, pd.DataFrame):
+                for i in range(0, len(batch), chunk_size):
+                    yield batch.iloc[i:i + chunk_size]
+                continue
+            if not isinstance(batch, pl.DataFrame):
+                batch = pl.from_arrow(batch)
+            for i in range(0, len(batch), chunk_size):
+                yield batch.slice(i, chunk_size)
+
+    @staticmethod
+    def _lazy_batches(lazy: pl.LazyFrame, batch_rows: int) -> Iterator[pl.DataFrame]:
+        """由polars流式引擎逐批执行LazyFrame；没有collect_batches的旧版本polars按行号切片逐段执行"""
+        if hasattr(lazy, "collect_batches"):
+            yield from lazy.collect_batches(chunk_size=batch_rows)
+            return
+        offset = 0
+        while True:
+            batch = lazy.slice(offset, batch_rows).collect()
+            if len(batch):
+                yield batch
+            if len(batch) < batch_rows:
+                return
+            offset += batch_rows
+
+    @staticmethod
+    def _scan_file(path) -> pl.LazyFrame:
+        """按扩展名惰性打开文件"""
+        scanners = {
+            ".parquet": pl.scan_parquet,
+            ".csv": pl.scan_csv,
+            ".ipc": pl.scan_ipc,
+            ".arrow": pl.scan_ipc,
+            ".feather": pl.scan_ipc,
+            ".ndjson": pl.scan_ndjson,
+            ".jsonl": pl.scan_ndjson,
+        }
+        extension = os.path.splitext(os.fspath(path))[1].lower()
+        if extension not in scanners:
+            raise ValueError(f"Unsupported file type: {extension}")
+        return scanners[extension](path)
+
+    def _encode_chunk(self, chunk: pd.DataFrame | pl.DataFrame, encode: bool, binary: bool, backend: str):
+        """
+        编码流式写入的一块
+        :return: (编码后的polars DataFrame, 编码器)，编码器记录了该块的编码方式
+        """
+        with self.instrumentation.span("encode", rows=len(chunk)):
+            if backend == "pandas":
+                if isinstance(chunk, pl.DataFrame):
+                    chunk = chunk.to_pandas()
+                frame_utils = DataFrameUtils(chunk)
+                return pl.from_pandas(frame_utils.encode(encode, binary=binary)), frame_utils
+            if isinstance(chunk, pd.DataFrame):
+                chunk = pl.from_pandas(chunk)
+            frame_utils = PolarsFrameUtils(chunk)
+            return frame_utils.encode(encode, binary=binary), frame_utils
+
+    @staticmethod
+    def _merge_stream_codecs(codecs: dict, chunk_codecs: dict) -> dict:
+        """
+        合并流式写入中各块的编码方式：没有需要编码的值的块（例如全为空）之后可以升级为具体编码，两种不同的具体编码冲突
+        :param codecs: 已确定的编码方式，原地更新
+        :return: 本块新确定的具体编码 {列名: 编码方式}
+        """
+        encoded = (CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_BINARY, CODEC_PICKLE_BINARY)
+        upgraded = {}
+        for col, codec in chunk_codecs.items():
+            known = codecs.get(col)
+            if known is None:
+                codecs[col] = codec
+            elif codec in encoded and known != codec:
+                if known in encoded:
+                    raise ValueError(f"列 {col} 在不同的块中编码方式不一致: {known} / {codec}")
+                codecs[col] = upgraded[col] = codec
+        return upgraded
+
+    def _store_single_writer(self, data: pl.DataFrame, table_name: str, chunk_size: int, max_workers: int):
+        """
+        SQLite只允许一个写入者：各块的行转换在线程池中并行进行，
+        再按顺序交给专用写连接在一个事务中写入，最多预先准备max_workers块
+        """
+        num_chunks = (len(data) + chunk_size - 1) // chunk_size
+        with self._chunk_executor(max_workers) as executor:
+            def prepared_chunks():
+                pending = collections.deque()
+                for i in range(num_chunks):
+                    pending.append(self._submit(executor, self.db.prepare_rows, data.slice(i * chunk_size, chunk_size)))
+                    if len(pending) >= max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+            self.db.write_chunks(table_name, data.columns, prepared_chunks(), schema=data.schema)
+
+    def _replace_table(self, data: pl.DataFrame, table_name: str, binary_columns: dict = None):
+        """
+        按DataFrame的结构重建空表
+        :param binary_columns: 需要建为原生二进制类型的列 {列名: "bytes" | "pickle"}
+        """
+        with self.engine.connect() as conn:
+            if not binary_columns:
+                data.head(0).write_database(table_name, conn, if_table_exists="replace")
+                return
+            dtype = {
+                col: _column_type(self.db.binary_column_type(pickled=(kind == "pickle")))
+                for col, kind in binary_columns.items()
+            }
+            data.head(0).to_pandas().to_sql(table_name, conn, if_exists="replace", index=False, dtype=dtype)
+        for col, kind in binary_columns.items():
+            if kind == "pickle":
+                self.db.mark_pickle_column(table_name, col)
+
+    def _save_column_codecs(self, table_name: str, column_codecs: dict, replace: bool = False):
+        """写入列编码元数据并使该表的缓存失效"""
+        if column_codecs:
+            self.db.save_column_codecs(table_name, column_codecs, replace=replace)
+        self._forget_codecs(table_name)
+
+    def _forget_codecs(self, table_name: str) -> None:
+        """清除表的编码方式缓存"""
+        with self._codec_lock:
+            self._codec_cache.pop(table_name, None)
+
+    def _column_codecs(self, table_name: str) -> dict:
+        """
+        读取表的列编码方式，每个表只查询一次元数据表
+        :return: {列名: 编码方式}，没有元数据的旧表返回空字典
+        """
+        with self._codec_lock:
+            if table_name in self._codec_cache:
+                return self._codec_cache[table_name]
+        column_codecs = self.db.load_column_codecs(table_name)
+        if column_codecs:
+            with self._codec_lock:
+                self._codec_cache[table_name] = column_codecs
+        return column_codecs
 
     def query_df(
             self, 
@@ -72,99 +773,585 @@ class DBUtils:
             columns: List[str] = ["*"], 
             condition: str = None, 
             limit: int = None, 
-            chunk_size: int = 2048, 
-            max_workers: int = 8,
-            include_index: bool = False
-    ) -> pd.DataFrame:
-        total_count = self.db.count_data(table_name, condition)
-        if limit:
+            chunk_size: int | str = 2048, 
+            max_workers: int | str = 8,
+            include_index: bool = False,
+            partition_by: str = None,
+            read_mode: str = "sql",
+            backend: str = "pandas",
+            process_codec: bool = False,
+            cache: bool = True,
+            count: str = "estimate"
+    ) -> pd.DataFrame | pl.DataFrame:
+        """
+        并行分块查询表数据
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param chunk_size: 每块的行数；"auto"先读取少量行估算平均行宽，使每块约为auto_chunk_bytes字节
+        :param max_workers: 并行线程数；"auto"在读取过程中按每块的吞吐量和延迟调整并发数（上限为连接池大小），见autotune_stats
+        :param include_index: 是否将第一列作为索引
+        :param partition_by: 分块方式
+            None: LIMIT/OFFSET分块
+            "auto": 使用后端默认的键（主键，SQLite为rowid，PostgreSQL无主键时为ctid），
+                没有可用的键或键不是数值类型又没有直方图统计信息时使用LIMIT/OFFSET分块
+            "primary_key": 使用主键（复合主键取第一列），主键无法按范围拆分时使用LIMIT/OFFSET分块
+            "rowid": SQLite的rowid
+            "ctid": PostgreSQL按数据块范围分区
+            其他值: 作为有索引的列名，按该列的取值范围分区
+            指定了limit时忽略，使用LIMIT/OFFSET分块
+        :param read_mode: 每个分块的读取方式
+            "sql": pd.read_sql_query
+            "copy": PostgreSQL的 COPY (SELECT ...) TO STDOUT，由polars原生解析
+        :param backend: 返回类型
+            "pandas": pandas DataFrame
+            "polars": 各分块直接读为polars DataFrame（见select_pl），在Arrow缓冲区上解码后拼接，不经过pandas
+            "arrow": 同"polars"，最后返回pyarrow.Table；无法表示为Arrow类型的pickle对象列保留为pickle后的bytes
+        :param process_codec: 为True时base64/pickle解码在子进程中进行（见ProcessCodec），行数较少的列仍在当前进程中解码，
+            只适用于pandas
+        :param cache: 启用了结果缓存（cache_max_bytes）时是否使用缓存；命中时返回缓存结果的副本
+        :param count: 规划分块的行数来源
+            "exact": 先执行 SELECT COUNT(*)，按精确行数一次提交全部分块
+            "estimate"（默认）: 使用数据库统计信息中的估计行数（pg_class.reltuples、information_schema.TABLES.TABLE_ROWS、
+                sqlite_stat1），不扫描表；估计值只决定预先提交的分块数和范围分区数，读取持续到某块不满为止，
+                估计值偏小、偏大或没有统计信息都不会漏行或多行
+            "none": 不查询行数，每次保持max_workers个分块在读取，直到某块不满为止
+        :return: 查询结果DataFrame
+        """
+        if self.query_cache is None or not cache:
+            return self._query_df(table_name, columns, condition, limit, chunk_size, max_workers, include_index,
+                                  partition_by, read_mode, backend, process_codec, count)
+        # 分块参数和编解码方式不影响结果，不计入缓存键
+        key = (
+            QueryCache.table_key(table_name), tuple(columns), self._condition_key(condition),
+            limit, include_index, partition_by, read_mode, backend
+        )
+        found, data = self.query_cache.get(key)
+        if found:
+            return data
+        generation = self.query_cache.generation(table_name)
+        data = self._query_df(table_name, columns, condition, limit, chunk_size, max_workers, include_index,
+                              partition_by, read_mode, backend, process_codec, count)
+        self.query_cache.put(key, table_name, data, generation)
+        return data
+
+    def _condition_key(self, condition: str) -> str | None:
+        """
+        缓存键中的条件：只规范化字符串字面量和引号标识符之外的空白和注释，
+        字面量中的空白不同（'a  b' 与 'a b'）时是不同的查询；无法切分的条件按原文
+        """
+        if not condition:
+            return None
+        try:
+            tokens = SqlPlanner.tokenize(condition, backslash_escapes=(self.db_instance == "mysql"))
+        except ValueError:
+            return condition
+        return " ".join(token.text for token in tokens)
+
+    def _query_df(
+            self,
+            table_name: str,
+            columns: List[str],
+            condition: str,
+            limit: int,
+            chunk_size: int | str,
+            max_workers: int | str,
+            include_index: bool,
+            partition_by: str,
+            read_mode: str,
+            backend: str,
+            process_codec: bool,
+            count: str
+    ) -> pd.DataFrame | pl.DataFrame:
+        """query_df的实际查询，不经过缓存"""
+        if backend not in ("pandas", "polars", "arrow"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        if backend != "pandas" and include_index:
+            raise ValueError("include_index只适用于pandas")
+        if read_mode == "sql":
+            select_chunk = self.db.select_df if backend == "pandas" else self.db.select_pl
+        elif read_mode == "copy":
+            if self.db_instance != "postgresql":
+                raise ValueError("copy读取方式只支持PostgreSQL")
+            select_chunk = functools.partial(self.db.select_df_copy, backend="pandas" if backend == "pandas" else "polars")
+        else:
+            raise ValueError(f"Unsupported read mode: {read_mode}")
+        auto = "auto" in (chunk_size, max_workers)
+        if chunk_size == "auto":
+            chunk_size = self._probe_chunk_size(select_chunk, table_name, columns, condition)
+        max_workers, tuner = self._resolve_workers(max_workers)
+        if count == "exact":
+            total_count = self.db.count_data(table_name, condition)
+        elif count == "estimate":
+            # 估计值是整表的行数，有条件时只是上界
+            total_count = self.db.estimate_count(table_name)
+        elif count == "none":
+            total_count = None
+        else:
+            raise ValueError(f"Unsupported count mode: {count}")
+        if limit and total_count is not None:
             total_count = min(total_count, limit)
-        if total_count == 0:
+        if auto:
+            self._note_autotune(chunk_size, tuner)
+        if total_count == 0 and count == "exact":
             return None
-        num_chunks = (total_count + chunk_size - 1) // chunk_size
-        # Process chunks in parallel
-        partial_dfs = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [
-                executor.submit(
-                    self.db.select_df,
+        num_chunks = (total_count + chunk_size - 1) // chunk_size if total_count is not None else None
+        with self._chunk_executor(max_workers) as executor:
+            def chunk_task(chunk_condition, chunk_limit, chunk_offset):
+                return functools.partial(
+                    select_chunk,
                     table_name,
                     columns=columns,
-                    condition=condition,
-                    limit=chunk_size,
-                    offset=i * chunk_size
-                ) for i in range(num_chunks)
-            ]
-            for future in futures:
-                df = future.result()
-                partial_dfs.append(df)
-
-        def process_df(df: pd.DataFrame):
-            df = DataFrameUtils(df).decode()
-            return df
+                    condition=chunk_condition,
+                    limit=chunk_limit,
+                    offset=chunk_offset
+                )
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(process_df, df) for df in partial_dfs]
-            for future in futures:
-                future.result()
-        if include_index:
-            data = pd.concat(partial_dfs, ignore_index=True)
-            data = data.set_index(data.columns[0])
+            def submit(chunk_condition, chunk_limit, chunk_offset):
+                task = chunk_task(chunk_condition, chunk_limit, chunk_offset)
+                return self._submit(executor, tuner.timed(task) if tuner is not None else task)
+
+            def read_all(chunks):
+                if tuner is not None:
+                    return self._run_adaptive(executor, tuner, (chunk_task(*chunk) for chunk in chunks))
+                futures = [submit(*chunk) for chunk in chunks]
+                return [future.result() for future in futures]
+
+            num_partitions = num_chunks if num_chunks is not None else max_workers
+            predicates = None
+            # 有limit时范围分区会把每个分区读完再截断，使用LIMIT/OFFSET分块只读取需要的行
+            if partition_by is not None and not limit and num_partitions > 1:
+                # 范围谓词覆盖全表，分区数只影响每块的大小，使用估计行数也不会漏行；键无法拆分时为None
+                predicates = self._plan_partitions(table_name, partition_by, condition, num_partitions)
+            if predicates is not None:
+                partial_dfs = read_all([(self._and_condition(condition, predicate), None, None) for predicate in predicates])
+            elif count == "exact":
+                partial_dfs = read_all([
+                    (condition, min(chunk_size, total_count - i * chunk_size), i * chunk_size)
+                    for i in range(num_chunks)
+                ])
+            else:
+                # 估计值偏大（统计信息过期）时不能按它一次提交全部分块，同时读取的分块数不超过2倍线程数
+                in_flight = min(max(num_chunks or 0, max_workers), 2 * max_workers)
+                partial_dfs = self._read_until_short(submit, condition, chunk_size, limit, in_flight, tuner)
+        if all(len(df) == 0 for df in partial_dfs):
+            return None
+        # 范围分区得到的空分区不参与拼接
+        partial_dfs = [df for df in partial_dfs if len(df) > 0] or partial_dfs[:1]
+        column_codecs = self._column_codecs(table_name)
+        # 没有编码元数据的旧表从表结构读取二进制列，其余列按前缀识别
+        binary_columns = self.db.binary_columns(table_name) if not column_codecs else None
+        if backend != "pandas":
+            # 先拼接再整列解码，各分块推断出的类型不同（例如全为空的分块）时取公共类型
+            data = pl.concat(partial_dfs, how="vertical_relaxed", rechunk=False)
+            if limit and len(data) > limit:
+                data = data.head(limit)
+            with self.instrumentation.span("decode", rows=len(data)):
+                data = PolarsFrameUtils(data).decode(binary_columns, column_codecs, objects=(backend == "polars"))
+            return data.to_arrow() if backend == "arrow" else data
+
+        if process_codec:
+            # 先拼接，再把需要解码的列整体交给子进程
+            data = pd.concat(partial_dfs, ignore_index=include_index)
+            with self.instrumentation.span("decode", rows=len(data)):
+                DataFrameUtils(data).decode(binary_columns, column_codecs, process_codec=self._process_codec)
+            if include_index:
+                data = data.set_index(data.columns[0])
         else:
-            data = pd.concat(partial_dfs)
+            def process_df(df: pd.DataFrame):
+                with self.instrumentation.span("decode", rows=len(df)):
+                    df = DataFrameUtils(df).decode(binary_columns, column_codecs)
+                return df
+
+            with self._chunk_executor(max_workers) as executor:
+                futures = [self._submit(executor, process_df, df) for df in partial_dfs]
+                for future in futures:
+                    future.result()
+            if include_index:
+                data = pd.concat(partial_dfs, ignore_index=True)
+                data = data.set_index(data.columns[0])
+            else:
+                data = pd.concat(partial_dfs)
+        if limit and len(data) > limit:
+            data = data.head(limit)
         return data
 
-    def query_df_sql(self, sql: str) -> pd.DataFrame:
+    @staticmethod
+    def _read_until_short(submit, condition: str, chunk_size: int, limit: int, in_flight: int,
+                          tuner: ConcurrencyTuner = None) -> list:
+        """
+        不依赖行数的LIMIT/OFFSET分块读取：保持in_flight个分块在读取，按顺序取回结果，
+        某块返回的行数少于请求的行数时说明已到末尾，不再提交新的分块，已提交的后续分块结果丢弃
+        :param submit: submit(condition, limit, offset) -> Future
+        :param tuner: 提供时同时读取的分块数为tuner.limit，代替in_flight
+        :return: 按偏移量排列的分块结果
+        """
+        pending = collections.deque()
+        next_offset = 0
+
+        def submit_next():
+            nonlocal next_offset
+            size = chunk_size if limit is None else min(chunk_size, limit - next_offset)
+            pending.append((size, submit(condition, size, next_offset)))
+            next_offset += size
+
+        def window():
+            return tuner.limit if tuner is not None else in_flight
+
+        while len(pending) < window() and (limit is None or next_offset < limit):
+            submit_next()
+        partial_dfs = []
+        while pending:
+            size, future = pending.popleft()
+            df = future.result()
+            partial_dfs.append(df)
+            if len(df) < size:
+                for _, rest in pending:
+                    rest.cancel()
+                # 未能取消的分块已在执行，等待其结束以免在线程池关闭后仍占用连接
+                concurrent.futures.wait([rest for _, rest in pending])
+                break
+            while len(pending) < window() and (limit is None or next_offset < limit):
+                submit_next()
+        return partial_dfs
+
+    def _probe_chunk_size(self, select_chunk, table_name: str, columns: List[str], condition: str) -> int:
+        """读取PROBE_ROWS行估算每行的字节数，计算使每块约为auto_chunk_bytes字节的行数"""
+        sample = select_chunk(table_name, columns=columns, condition=condition, limit=PROBE_ROWS)
+        if sample is None or len(sample) == 0:
+            return auto_chunk_size(0, self.auto_chunk_bytes)
+        return auto_chunk_size(QueryCache.size_of(sample) / len(sample), self.auto_chunk_bytes)
+
+    def query_iter(
+            self,
+            table_name: str,
+            columns: List[str] = ["*"],
+            condition: str = None,
+            limit: int = None,
+            batch_rows: int = 10000,
+            include_index: bool = False,
+            backend: str = "pandas"
+    ) -> Iterator[pd.DataFrame | pl.DataFrame]:
+        """
+        流式查询表数据，逐批解码后返回，内存占用与表大小无关
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param batch_rows: 每批的行数
+        :param include_index: 是否将第一列作为索引
+        :param backend: 返回的DataFrame类型，"pandas" 或 "polars"
+        :return: DataFrame迭代器
+        """
+        if backend not in ("pandas", "polars"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        column_codecs = self._column_codecs(table_name)
+        binary_columns = self.db.binary_columns(table_name) if not column_codecs else None
+        for df in self.db.select_iter(table_name, columns=columns, condition=condition, limit=limit, batch_rows=batch_rows):
+            yield self._decode_batch(df, binary_columns, column_codecs, include_index, backend)
+
+    def _decode_batch(self, df: pd.DataFrame, binary_columns: dict, column_codecs: dict, include_index: bool,
+                      backend: str) -> pd.DataFrame | pl.DataFrame:
+        """解码流式查询的一批数据，并转换为需要的DataFrame类型"""
+        with self.instrumentation.span("decode", rows=len(df)):
+            DataFrameUtils(df).decode(binary_columns, column_codecs)
+        if include_index:
+            df = df.set_index(df.columns[0])
+        if backend == "polars":
+            df = pl.from_pandas(df, include_index=include_index)
+        return df
+
+    def _plan_partitions(self, table_name: str, partition_by: str, condition: str, num_partitions: int) -> List[str]:
+        """
+        将查询拆分为互不重叠的范围谓词
+        :param table_name: 表名
+        :param partition_by: 分块方式，见query_df
+        :param condition: WHERE条件语句
+        :param num_partitions: 期望的分区数量
+        :return: 范围谓词列表，所有谓词的并集覆盖全表且两两不相交；
+            "auto"/"primary_key"的键不是数值类型又没有直方图统计信息、或"auto"时表没有可用的键，无法按范围拆分，返回None
+        """
+        nullable = False
+        if partition_by == "ctid":
+            if self.db_instance != "postgresql":
+                raise ValueError("ctid分区只支持PostgreSQL")
+            return self._ctid_partitions(table_name, num_partitions)
+        elif partition_by == "rowid":
+            if not self.db_instance == "sqlite":
+                raise ValueError("rowid分区只支持SQLite")
+            column = "rowid"
+        elif partition_by in ("auto", "primary_key"):
+            primary_key = self.db.primary_key(table_name)
+            if partition_by == "auto" and self.db_instance == "sqlite" and self.db.has_rowid(table_name):
+                column = "rowid"
+            elif primary_key:
+                column = primary_key[0]
+            elif partition_by == "auto" and self.db_instance == "postgresql":
+                return self._ctid_partitions(table_name, num_partitions)
+            elif partition_by == "auto":
+                return None
+            else:
+                raise ValueError(f"表 {table_name} 没有主键，无法按主键分区")
+        else:
+            column = partition_by
+            nullable = True
+
+        bounds = self._histogram_bounds(self.db.key_histogram(table_name, column), num_partitions)
+        if not bounds:
+            bounds = self._min_max_bounds(*self.db.key_bounds(table_name, column, condition), num_partitions)
+        if bounds is None:
+            # 指定的列必须能分区；自动选择的键（例如TEXT/uuid主键）不能分区时由调用方改为不分区读取
+            if nullable:
+                raise ValueError("分区列必须是数值类型，或者具有直方图统计信息")
+            return None
+        literals = [self._sql_literal(bound) for bound in bounds]
+        if not literals:
+            predicates = [f"{column} IS NOT NULL"]
+        else:
+            predicates = [f"{column} < {literals[0]}"]
+            predicates += [f"{column} >= {lo} AND {column} < {hi}" for lo, hi in zip(literals, literals[1:])]
+            predicates.append(f"{column} >= {literals[-1]}")
+        if nullable:
+            predicates.append(f"{column} IS NULL")
+        return predicates
+
+    def _ctid_partitions(self, table_name: str, num_partitions: int) -> List[str]:
+        """按PostgreSQL数据块范围拆分ctid谓词（PostgreSQL 14+ 使用TID Range Scan）"""
+        blocks = self.db.relation_blocks(table_name)
+        num_partitions = max(1, min(num_partitions, blocks))
+        edges = [blocks * i // num_partitions for i in range(1, num_partitions)]
+        if not edges:
+            return ["TRUE"]
+        predicates = [f"ctid < '({edges[0]},0)'::tid"]
+        predicates += [
+            f"ctid >= '({lo},0)'::tid AND ctid < '({hi},0)'::tid" for lo, hi in zip(edges, edges[1:])
+        ]
+        predicates.append(f"ctid >= '({edges[-1]},0)'::tid")
+        return predicates
+
+    @staticmethod
+    def _histogram_bounds(histogram: List[tuple], num_partitions: int) -> list:
+        """从 [(边界值, 累计比例)] 直方图中选出等行数的分区边界"""
+        if len(histogram) < 2:
+            return []
+        bounds = []
+        position = 0
+        for i in range(1, num_partitions):
+            quantile = i / num_partitions
+            while position < len(histogram) - 1 and histogram[position][1] < quantile:
+                position += 1
+            value = histogram[position][0]
+            if not bounds or bounds[-1] != value:
+                bounds.append(value)
+        return bounds
+
+    @staticmethod
+    def _min_max_bounds(low, high, num_partitions: int) -> list | None:
+        """在数值列的最小值和最大值之间均匀切分分区边界，列不是数值类型时返回None"""
+        if low is None or high is None:
+            return []
+        if isinstance(low, (int, np.integer)) and isinstance(high, (int, np.integer)):
+            low, high = int(low), int(high)
+            span = high - low + 1
+            num_partitions = min(num_partitions, span)
+            return [low + span * i // num_partitions for i in range(1, num_partitions)]
+        if isinstance(low, (float, np.floating)) and isinstance(high, (float, np.floating)):
+            return [low + (high - low) * i / num_partitions for i in range(1, num_partitions)] if high > low else []
+        return None
+
+    @staticmethod
+    def _sql_literal(value) -> str:
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return str(value)
+        return "'" + str(value).replace("'", "''") + "'"
+
+    @staticmethod
+    def _and_condition(condition: str, predicate: str) -> str:
+        if not condition:
+            return predicate
+        return f"({condition}) AND ({predicate})"
+
+    def query_df_sql(
+            self,
+            sql: str,
+            chunk_size: int | str = 2048,
+            max_workers: int | str = 8,
+            partition_by: str = "auto",
+            backend: str = "pandas"
+    ) -> pd.DataFrame | pl.DataFrame:
         """
         执行SQL查询并返回DataFrame
-        :param sql: SQL查询语句
+        语句经SqlPlanner词法分析，大小写、字符串字面量和表达式保持原文：单表的简单扫描（可带WHERE和LIMIT）交给query_df并行分块读取，
+        聚合、DISTINCT、窗口函数、GROUP BY、ORDER BY、OFFSET、连接、子查询和WITH等不能分块的语句在服务器上一次执行
+        :param sql: SQL查询语句，只支持单条只读的SELECT/WITH语句
+        :param chunk_size: 简单扫描时每块的行数，见query_df
+        :param max_workers: 简单扫描时的并行线程数，见query_df
+        :param partition_by: 简单扫描时的分块方式，见query_df；"auto"在表没有可用的键、键无法按范围拆分（非数值类型且没有直方图）
+            或语句带LIMIT时使用LIMIT/OFFSET分块
+        :param backend: 返回类型，"pandas"、"polars"或"arrow"
         :return: 查询结果DataFrame
         """
-        sql = sql.lower()
-        if not sql.strip().startswith("select"):
-            raise ValueError("只支持SELECT查询语句")
-            
-        # 提取FROM后的表名
-        if len(sql.split(" from ")) < 2:
-            raise ValueError("FROM语句缺失")
-        table_name = sql.split("from")[1].strip().split("where")[0].strip()
-
-        # 提取列名
-        columns = []
-        columns_part = sql.split("select")[1].strip().split("from")[0].strip()
-        if columns_part == "*":
-            columns = ["*"]
+        if backend not in ("pandas", "polars", "arrow"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        plan = SqlPlanner.plan(sql, backslash_escapes=(self.db_instance == "mysql"))
+        if plan.mode == "scan":
+            # 带LIMIT或键无法拆分时query_df改用LIMIT/OFFSET分块
+            return self.query_df(plan.table, columns=plan.columns, condition=plan.condition, limit=plan.limit,
+                                 chunk_size=chunk_size, max_workers=max_workers, partition_by=partition_by,
+                                 backend=backend)
+
+        data = self.db.select_sql(plan.sql)
+        if plan.table is not None:
+            column_codecs = self._column_codecs(plan.table)
+            binary_columns = self.db.binary_columns(plan.table) if not column_codecs else None
         else:
-            if ' as ' in columns_part:
-                columns = [columns_part]
-            else:
-                columns = [col.strip() for col in columns_part.split(",")]
+            # 连接和子查询的结果列无法对应到某张表，按前缀识别编码
+            column_codecs, binary_columns = None, {}
+        data = self._decode_batch(data, binary_columns, column_codecs, False, "pandas" if backend == "pandas" else "polars")
+        return data.to_arrow() if backend == "arrow" else data
+
+    def table(self, table_name: str) -> TableQuery:
+        """
+        惰性查询：db_utils.table("events").select("id", "kind").filter(col("id") > 10).sort("id").limit(5).collect()
+        投影、过滤、排序和LIMIT编译为参数化SQL在服务器上执行，见TableQuery
+        :param table_name: 表名
+        """
+        return TableQuery(self, table_name)
+
+    def _collect_query(self, query: TableQuery, backend: str, chunk_size: int, max_workers: int | str,
+                       cache: bool) -> pd.DataFrame | pl.DataFrame:
+        """执行TableQuery：只有投影和过滤、估计行数超过chunk_size且键可以按范围拆分时并行读取，否则一次查询"""
+        if backend not in ("pandas", "polars", "arrow"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        if self.query_cache is None or not cache:
+            return self._run_query(query, backend, chunk_size, max_workers)
+        sql, params = query.compile()
+        key = (QueryCache.table_key(query.table_name), "table", sql, tuple(params or ()), backend)
+        found, data = self.query_cache.get(key)
+        if found:
+            return data
+        generation = self.query_cache.generation(query.table_name)
+        data = self._run_query(query, backend, chunk_size, max_workers)
+        self.query_cache.put(key, query.table_name, data, generation)
+        return data
+
+    def _run_query(self, query: TableQuery, backend: str, chunk_size: int,
+                   max_workers: int | str) -> pd.DataFrame | pl.DataFrame:
+        table_name = query.table_name
+        select = self.db.select_sql if backend == "pandas" else self.db.select_sql_pl
+        predicates = None
+        if query.is_scan:
+            # 只使用统计信息中的估计行数，没有统计信息时一次查询，不额外执行COUNT(*)
+            total_count = self.db.estimate_count(table_name)
+            if total_count is not None and total_count > chunk_size:
+                num_partitions = (total_count + chunk_size - 1) // chunk_size
+                # 表没有可用的键或键无法按范围拆分时为None
+                predicates = self._plan_partitions(table_name, "auto", None, num_partitions)
+        if predicates is None:
+            partial_dfs = [select(*query.compile())]
+        else:
+            # 范围谓词覆盖全表，与过滤条件取AND，各分区互不重叠
+            max_workers, tuner = self._resolve_workers(max_workers)
+            tasks = [functools.partial(select, *query.compile([predicate])) for predicate in predicates]
+            with self._chunk_executor(max_workers) as executor:
+                if tuner is not None:
+                    partial_dfs = self._run_adaptive(executor, tuner, tasks)
+                else:
+                    futures = [self._submit(executor, task) for task in tasks]
+                    partial_dfs = [future.result() for future in futures]
+            partial_dfs = [df for df in partial_dfs if len(df) > 0] or partial_dfs[:1]
+        column_codecs = self._column_codecs(table_name)
+        binary_columns = self.db.binary_columns(table_name) if not column_codecs else None
+        if backend != "pandas":
+            data = pl.concat(partial_dfs, how="vertical_relaxed", rechunk=False) if len(partial_dfs) > 1 else partial_dfs[0]
+            with self.instrumentation.span("decode", rows=len(data)):
+                data = PolarsFrameUtils(data).decode(binary_columns, column_codecs, objects=(backend == "polars"))
+            return data.to_arrow() if backend == "arrow" else data
+        data = pd.concat(partial_dfs, ignore_index=True) if len(partial_dfs) > 1 else partial_dfs[0]
+        return self._decode_batch(data, binary_columns, column_codecs, False, "pandas")
 
-        # 提取WHERE条件（如果有）
-        condition = None
-        if " where " in sql:
-            condition = sql.split("where")[1].strip()
-        
-        # 使用query_df方法执行查询
-        return self.query_df(table_name, columns=columns, condition=condition)
-    
     def execute_sql(self, sql: str) -> any:
-        return self.db.execute(sql)
+        """
+        执行任意SQL语句；写入语句使其修改的表的结果缓存失效，无法识别修改了哪些表时清空全部缓存
+        """
+        try:
+            return self.db.execute(sql)
+        finally:
+            self._invalidate_sql(sql)
+
+    def _invalidate_sql(self, sql: str) -> None:
+        """按SQL语句修改的表使结果缓存失效"""
+        if self.query_cache is None:
+            return
+        tables = QueryCache.written_tables(sql)
+        if tables is None:
+            self.query_cache.invalidate()
+        for table in tables or []:
+            self.query_cache.invalidate(table)
+
+    def delete_data(self, table_name: str, condition: str) -> None:
+        """
+        删除数据
+        :param table_name: 表名
+        :param condition: WHERE条件语句
+        """
+        try:
+            self.db.delete_data(table_name, condition)
+        finally:
+            self._invalidate(table_name)
 
     def drop_table(self, table_name: str):
-        return self.db.drop_table(table_name)
+        try:
+            result = self.db.drop_table(table_name)
+        finally:
+            self._invalidate(table_name)
+        self.db.delete_column_codecs(table_name)
+        self._forget_codecs(table_name)
+        return result
     
     def create_table(self, table_name: str, columns: List[str]):
         return self.db.create_table(table_name, columns)
 
     def create_table_df(self, table_name: str, df: pd.DataFrame):
-        df.head(0).write_database(table_name, self.engine.connect(), if_table_exists="replace")
+        with self.engine.connect() as conn:
+            df.head(0).write_database(table_name, conn, if_table_exists="replace")
+
+@functools.lru_cache(maxsize=None)
+def _column_type_class():
+    """建表时直接使用给定DDL类型名的SQLAlchemy类型；在首次使用时定义，以免导入时加载SQLAlchemy"""
+    from sqlalchemy.types import UserDefinedType
+
+    class _ColumnType(UserDefinedType):
+        cache_ok = True
+
+        def __init__(self, ddl: str):
+            self.ddl = ddl
+
+        def get_col_spec(self, **kwargs):
+            return self.ddl
+
+    return _ColumnType
+
+
+def _column_type(ddl: str):
+    return _column_type_class()(ddl)
+
 
 class DataFrameUtils:
     def __init__(self, data: pd.DataFrame):
         self.data = data
+        # 二进制存储模式下以原生二进制列存储的列 {列名: "bytes" | "pickle"}
+        self.binary_columns = {}
+        # encode确定的各列编码方式，写入元数据表
+        self.column_codecs = {}
     
-    def encode(self, encode: bool = True):
+    def encode(self, encode: bool = True, binary: bool = False):
+        """
+        编码DataFrame
+        :param encode: 是否编码bytes/numpy数值/其他对象列
+        :param binary: 为True时bytes列和pickle后的对象列以原生二进制存储，而不是带前缀的base64字符串
+        """
         if self.data is None or len(self.data) == 0:
             return None
         col_types = self._check_column_types(self.data)
@@ -173,65 +1360,91 @@ class DataFrameUtils:
                 raise ValueError(f"Column {col} not found in DataFrame")
             if not encode and col_types[col] != 0:
                 raise ValueError(f"Column {col} is not a common column")
-            if col_types[col] == 1 and encode:
-                self.data[col] = self.data[col].apply(self._to_base64)
+        for col in self.data.columns:
+            if col_types[col] == 1 and encode and binary:
+                self.data[col] = ColumnCodec.to_binary(self.data[col])
+                self.binary_columns[col] = "bytes"
+                self.column_codecs[col] = CODEC_BINARY
+            elif col_types[col] == 1 and encode:
+                self.data[col] = ColumnCodec.encode_bytes(self.data[col])
+                self.column_codecs[col] = CODEC_BASE64
             elif col_types[col] == 2 and encode:
-                self.data[col] = self.data[col].apply(self._to_int)
+                self.data[col] = ColumnCodec.to_int(self.data[col])
+                self.column_codecs[col] = CODEC_INT
             elif col_types[col] == 3 and encode:
-                self.data[col] = self.data[col].apply(self._to_float)
+                self.data[col] = ColumnCodec.to_float(self.data[col])
+                self.column_codecs[col] = CODEC_FLOAT
+            elif col_types[col] == -1 and encode and binary:
+                self.data[col] = ColumnCodec.encode_pickle_binary(self.data[col])
+                self.binary_columns[col] = "pickle"
+                self.column_codecs[col] = CODEC_PICKLE_BINARY
             elif col_types[col] == -1 and encode:
-                self.data[col] = self.data[col].apply(self._to_pickle_base64)
+                self.data[col] = ColumnCodec.encode_pickle(self.data[col])
+                self.column_codecs[col] = CODEC_PICKLE_BASE64
+            else:
+                self.column_codecs[col] = CODEC_PLAIN
         return self.data
 
-    def decode(self):
+    def decode(self, binary_columns: dict = None, column_codecs: dict = None, process_codec: ProcessCodec = None):
+        """
+        解码DataFrame
+        :param binary_columns: 从表结构中读取的二进制列 {列名: "bytes" | "pickle"}，其余列按base64前缀识别
+        :param column_codecs: 元数据表中记录的列编码方式，记录中的列按其解码；结果中不在记录里的列
+            （别名、表达式等）仍按前缀识别
+        :param process_codec: 提供时行数足够多的base64/pickle列在子进程中解码
+        """
         if self.data is None or len(self.data) == 0:
             return None
+        column_codecs = column_codecs or {}
+        unknown = [col for col in self.data.columns if col not in column_codecs]
+        codecs = self._detect_codecs(binary_columns or {}, unknown)
+        codecs.update((col, column_codecs[col]) for col in self.data.columns if col in column_codecs)
+        processed = self._process_decode(process_codec, codecs) if process_codec else {}
         for col in self.data.columns:
-            filtered_df = self.data[self.data[col].notna()]
-            if len(filtered_df) == 0:
-                continue
-            if isinstance(filtered_df[col].iloc[0], str) and filtered_df[col].iloc[0].startswith("base64_encode::"):
-                self.data[col] = self.data[col].apply(self._from_base64)
-            elif isinstance(filtered_df[col].iloc[0], str) and filtered_df[col].iloc[0].startswith("base64_pickle_encode::"):
-                self.data[col] = self.data[col].apply(self._from_pickle_base64)
+            codec = codecs.get(col, CODEC_PLAIN)
+            if col in processed:
+                self.data[col] = processed[col]
+            elif codec != CODEC_PLAIN:
+                self.data[col] = ColumnCodec.decode(self.data[col], codec)
         return self.data
 
-    def _to_pickle_base64(self, entry: any):
-        if entry is None:
-            return None
-        binary_data = pickle.dumps(entry)
-        base64_str = base64.b64encode(binary_data).decode('utf-8')
-        return "base64_pickle_encode::" + base64_str
-    
-    def _from_pickle_base64(self, entry: str):
-        if entry is None:
-            return None
-        base64_str = entry.split("base64_pickle_encode::")[1]
-        binary_data = base64.b64decode(base64_str)
-        return pickle.loads(binary_data)
-    
-    def _to_base64(self, entry: any):
-        if entry is None:
-            return None
-        base64_str = base64.b64encode(entry).decode('utf-8')
-        return "base64_encode::" + base64_str
-    
-    def _from_base64(self, entry: str):
-        if entry is None:
-            return None
-        base64_str = entry.split("base64_encode::")[1]
-        return base64.b64decode(base64_str)
-    
-    def _to_int(self, entry: any):
-        if entry is None:
-            return None
-        return int(entry)
-    
-    def _to_float(self, entry: any):
-        if entry is None:
-            return None
-        return float(entry)
-    
+    def _detect_codecs(self, binary_columns: dict, columns: List[str]) -> dict:
+        """没有编码元数据的列，从表结构中的二进制列和字符串的base64前缀推断其编码方式"""
+        codecs = {}
+        for col in columns:
+            if binary_columns.get(col) == "bytes":
+                codecs[col] = CODEC_BINARY
+                continue
+            elif binary_columns.get(col) == "pickle":
+                codecs[col] = CODEC_PICKLE_BINARY
+                continue
+            notna = self.data[col].notna().to_numpy()
+            if not notna.any():
+                continue
+            sample_value = self.data[col].iloc[notna.argmax()]
+            if isinstance(sample_value, str) and sample_value.startswith(BASE64_PREFIX):
+                codecs[col] = CODEC_BASE64
+            elif isinstance(sample_value, str) and sample_value.startswith(PICKLE_PREFIX):
+                codecs[col] = CODEC_PICKLE_BASE64
+        return codecs
+
+    def _process_decode(self, process_codec: ProcessCodec, codecs: dict) -> dict:
+        """在子进程中解码行数足够多的base64/pickle列，返回 {列名: 解码后的列}"""
+        jobs = {}
+        for col, codec in codecs.items():
+            if col not in self.data.columns or codec not in (CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_PICKLE_BINARY):
+                continue
+            values = self.data[col].to_numpy(dtype=object)
+            mask = ~pd.isna(values)
+            if process_codec.worthwhile(mask):
+                jobs[col] = (values, mask, codec)
+        if not jobs:
+            return {}
+        return {
+            col: ColumnCodec._rebuild(self.data[col], jobs[col][1], values)
+            for col, values in process_codec.decode(jobs).items()
+        }
+
     def _check_column_types(self, data: pd.DataFrame) -> dict[str, int]:
         """
         检查DataFrame中各列的数据类型并返回类型标识
@@ -245,18 +1458,22 @@ class DataFrameUtils:
                 1: bytes
                 2: numpy.int
                 3: numpy.float
-               -1: 其他类型
+               -1: 其他类型或混合类型
         """
         col_types = {}
         if len(data) == 0:
             return col_types
         for col in data.columns:
-            filtered_df = data[data[col].notna()]
-            if len(filtered_df) == 0:
+            notna = data[col].notna().to_numpy()
+            if not notna.any():
                 col_types[col] = 0 
                 continue
+            if infer_dtype(data[col], skipna=True) in ("mixed", "mixed-integer"):
+                # 混合类型的列（例如字符串和列表混在一起）不能只看第一个值，整列pickle
+                col_types[col] = -1
+                continue
             
-            sample_value = filtered_df[col].iloc[0]
+            sample_value = data[col].iloc[notna.argmax()]
             if isinstance(sample_value, (str, int, float)):
                 col_types[col] = 0
             elif isinstance(sample_value, bytes):
@@ -269,3 +1486,72 @@ class DataFrameUtils:
                 col_types[col] = -1
             
         return col_types
+
+
+class PolarsFrameUtils:
+    """
+    DataFrameUtils的polars版本：按polars列类型确定编码方式，在Arrow缓冲区上按列编码/解码，
+    编码格式和元数据与DataFrameUtils相同，两种方式写入的表可以互相读取
+    """
+    def __init__(self, data: pl.DataFrame):
+        self.data = data
+        # 二进制存储模式下以原生二进制列存储的列 {列名: "bytes" | "pickle"}
+        self.binary_columns = {}
+        # encode确定的各列编码方式，写入元数据表
+        self.column_codecs = {}
+
+    def encode(self, encode: bool = True, binary: bool = False) -> pl.DataFrame:
+        """
+        编码DataFrame，不需要编码的列直接沿用原来的缓冲区
+        :param encode: 是否编码bytes列和嵌套/对象列
+        :param binary: 为True时bytes列和pickle后的对象列以原生二进制存储，而不是带前缀的base64字符串
+        """
+        encoded = []
+        for col in self.data.columns:
+            series, codec = ColumnCodec.encode_pl(self.data.get_column(col), binary=binary)
+            if codec in (CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_BINARY, CODEC_PICKLE_BINARY):
+                if not encode:
+                    raise ValueError(f"Column {col} is not a common column")
+                encoded.append(series)
+            elif series.dtype != self.data.schema[col]:
+                encoded.append(series)
+            if codec == CODEC_BINARY:
+                self.binary_columns[col] = "bytes"
+            elif codec == CODEC_PICKLE_BINARY:
+                self.binary_columns[col] = "pickle"
+            self.column_codecs[col] = codec
+        if encoded:
+            self.data = self.data.with_columns(encoded)
+        return self.data
+
+    def decode(self, binary_columns: dict = None, column_codecs: dict = None, objects: bool = True) -> pl.DataFrame:
+        """
+        解码DataFrame
+        :param binary_columns: 从表结构中读取的二进制列 {列名: "bytes" | "pickle"}，其余字符串列按base64前缀识别
+        :param column_codecs: 元数据表中记录的列编码方式，记录中的列按其解码；其余列（别名、表达式等）仍按前缀识别
+        :param objects: pickle还原的对象无法表示为Arrow类型时，True返回Object列，False保留pickle后的bytes
+        """
+        column_codecs = column_codecs or {}
+        binary_columns = binary_columns or {}
+        codecs = {}
+        for col in self.data.columns:
+            if col in column_codecs:
+                codecs[col] = column_codecs[col]
+            elif binary_columns.get(col) == "bytes":
+                codecs[col] = CODEC_BINARY
+            elif binary_columns.get(col) == "pickle":
+                codecs[col] = CODEC_PICKLE_BINARY
+            elif self.data.schema[col] == pl.Utf8:
+                sample = self.data.get_column(col).drop_nulls().head(1).to_list()
+                if sample and sample[0].startswith(BASE64_PREFIX):
+                    codecs[col] = CODEC_BASE64
+                elif sample and sample[0].startswith(PICKLE_PREFIX):
+                    codecs[col] = CODEC_PICKLE_BASE64
+        decoded = [
+            ColumnCodec.decode_pl(self.data.get_column(col), codec, objects=objects)
+            for col, codec in codecs.items()
+            if codec in (CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_BINARY, CODEC_PICKLE_BINARY)
+        ]
+        if decoded:
+            self.data = self.data.with_columns(decoded)
+        return self.data
@@ -0,0 +1,228 @@
+import bisect
+import functools
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+import pandas as pd
+import polars as pl
+
+# 耗时直方图的桶上界（秒），用于Prometheus导出
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Observer:
+    """观测者接口：每个计时区间结束时调用on_span"""
+
+    def on_span(self, name: str, seconds: float, attrs: dict) -> None:
+        """
+        :param name: 区间名，例如 "connect"、"insert_df"、"select_df"、"encode"、"decode"、"count_data"、"queue_wait"
+        :param seconds: 耗时秒数
+        :param attrs: 附加信息：backend、rows、bytes、sql_hash（SQL文本的SHA-1前16位）、error（异常类型名）等
+        """
+        pass
+
+
+class _CallbackObserver(Observer):
+    def __init__(self, callback: Callable[[str, float, dict], None]):
+        self.callback = callback
+
+    def on_span(self, name: str, seconds: float, attrs: dict) -> None:
+        self.callback(name, seconds, attrs)
+
+
+class Instrumentation:
+    """
+    计时区间的分发器，由数据库后端持有并与DBUtils共享
+    没有观测者时span只是一个空的上下文管理器，几乎没有开销
+    """
+
+    def __init__(self, backend: str = None):
+        """
+        :param backend: 后端名，附加到每个区间的backend属性
+        """
+        self.backend = backend
+        self._observers = []
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._observers)
+
+    def add_observer(self, observer: Observer | Callable[[str, float, dict], None]) -> Observer:
+        """
+        添加观测者
+        :param observer: Observer实例，或 callback(name, seconds, attrs) 函数
+        :return: 添加的观测者（传入函数时为包装后的Observer，可用于remove_observer）
+        """
+        if not isinstance(observer, Observer):
+            observer = _CallbackObserver(observer)
+        # 复制后替换，分发时不需要加锁
+        self._observers = self._observers + [observer]
+        return observer
+
+    def remove_observer(self, observer: Observer) -> None:
+        self._observers = [item for item in self._observers if item is not observer]
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """
+        计时区间: with instrumentation.span("insert_df", rows=n) as attrs: ...
+        区间内可以修改attrs或调用annotate补充信息，抛出异常时记录error属性
+        """
+        if not self._observers:
+            yield attrs
+            return
+        stack = self._stack()
+        stack.append(attrs)
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            self.emit(name, seconds, attrs)
+
+    def annotate(self, **attrs) -> None:
+        """给当前线程中最内层的区间补充信息，例如 annotate(sql=select_query)"""
+        if not self._observers:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].update(attrs)
+
+    def emit(self, name: str, seconds: float, attrs: dict) -> None:
+        """把一个已结束的区间交给所有观测者；SQL文本只以哈希值传递，观测者的异常不影响数据库操作"""
+        attrs.setdefault("backend", self.backend)
+        sql = attrs.pop("sql", None)
+        if sql is not None:
+            attrs["sql_hash"] = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+        for observer in self._observers:
+            try:
+                observer.on_span(name, seconds, attrs)
+            except Exception:
+                pass
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @staticmethod
+    def result_size(result) -> dict:
+        """从操作的返回值中取得行数和字节数"""
+        if isinstance(result, pd.DataFrame):
+            return {"rows": len(result), "bytes": int(result.memory_usage(index=False).sum())}
+        if isinstance(result, pl.DataFrame):
+            return {"rows": len(result), "bytes": int(result.estimated_size())}
+        if isinstance(result, dict):
+            return {key: result[key] for key in ("rows", "bytes") if result.get(key) is not None}
+        if isinstance(result, bool):
+            return {}
+        if isinstance(result, int):
+            return {"rows": result}
+        if isinstance(result, list):
+            return {"rows": len(result)}
+        return {}
+
+
+def instrumented(name: str):
+    """后端方法的装饰器：把整个调用记录为一个区间，返回值的行数和字节数附加到区间上"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if not instrumentation.enabled:
+                return method(self, *args, **kwargs)
+            with instrumentation.span(name) as attrs:
+                result = method(self, *args, **kwargs)
+                attrs.update(Instrumentation.result_size(result))
+                return result
+        return wrapper
+    return decorator
+
+
+class StatsCollector(Observer):
+    """
+    内置的统计观测者：按(区间名, 后端)汇总次数、耗时、行数、字节数和错误数，并保留耗时直方图
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def on_span(self, name: str, seconds: float, attrs: dict) -> None:
+        key = (name, attrs.get("backend"))
+        with self._lock:
+            entry = self._spans.get(key)
+            if entry is None:
+                entry = self._spans[key] = {
+                    "count": 0, "errors": 0, "seconds_total": 0.0, "seconds_max": 0.0,
+                    "rows": 0, "bytes": 0, "buckets": [0] * (len(SPAN_BUCKETS) + 1),
+                }
+            entry["count"] += 1
+            entry["seconds_total"] += seconds
+            entry["seconds_max"] = max(entry["seconds_max"], seconds)
+            entry["rows"] += attrs.get("rows") or 0
+            entry["bytes"] += attrs.get("bytes") or 0
+            if "error" in attrs:
+                entry["errors"] += 1
+            entry["buckets"][bisect.bisect_left(SPAN_BUCKETS, seconds)] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans = {}
+
+    def summary(self) -> dict:
+        """
+        :return: {区间名: {后端: {"count", "errors", "seconds_total", "seconds_mean", "seconds_max", "rows", "bytes",
+                 "rows_per_sec"}}}
+        """
+        with self._lock:
+            spans = {key: dict(entry) for key, entry in self._spans.items()}
+        summary = {}
+        for (name, backend), entry in sorted(spans.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            entry.pop("buckets")
+            entry["seconds_mean"] = entry["seconds_total"] / entry["count"]
+            entry["rows_per_sec"] = entry["rows"] / entry["seconds_total"] if entry["seconds_total"] > 0 else 0.0
+            summary.setdefault(name, {})[str(backend)] = entry
+        return summary
+
+    def to_json(self, **kwargs) -> str:
+        """导出为JSON文本"""
+        return json.dumps(self.summary(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "opendbutils") -> str:
+        """导出为Prometheus文本格式：耗时直方图以及行数、字节数、错误数计数器"""
+        with self._lock:
+            spans = {key: dict(entry, buckets=list(entry["buckets"])) for key, entry in self._spans.items()}
+        lines = [
+            f"# HELP {prefix}_span_seconds Time spent in instrumented operations",
+            f"# TYPE {prefix}_span_seconds histogram",
+        ]
+        counters = []
+        for (name, backend), entry in sorted(spans.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            labels = f'span="{name}",backend="{backend or ""}"'
+            cumulative = 0
+            for bound, count in zip(SPAN_BUCKETS, entry["buckets"]):
+                cumulative += count
+                lines.append(f'{prefix}_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_span_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f"{prefix}_span_seconds_sum{{{labels}}} {entry['seconds_total']}")
+            lines.append(f"{prefix}_span_seconds_count{{{labels}}} {entry['count']}")
+            counters.append((labels, entry))
+        for metric, field, help_text in (
+                ("rows_total", "rows", "Rows processed by instrumented operations"),
+                ("bytes_total", "bytes", "Bytes processed by instrumented operations"),
+                ("errors_total", "errors", "Instrumented operations that raised"),
+        ):
+            lines.append(f"# HELP {prefix}_span_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_span_{metric} counter")
+            lines += [f"{prefix}_span_{metric}{{{labels}}} {entry[field]}" for labels, entry in counters]
+        return "\n".join(lines) + "\n"
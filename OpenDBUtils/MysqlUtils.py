@@ -1,49 +1,142 @@
 import mysql.connector
 import io
-from typing import List, Tuple, Any
+import json
+import os
+import shutil
+import tempfile
+import time
+import weakref
+import numpy as np
+from urllib.parse import quote
+from typing import List, Tuple, Any, Iterator
 import pandas as pd
 import polars as pl
-from mysql.connector import Error
-from .DBInterface import DBInterface
-from sqlalchemy import create_engine
+from mysql.connector import Error, errorcode
+from .DBInterface import DBInterface, STAGING_ROW_COLUMN
+from .Instrumentation import instrumented
+from .ConnectionPool import ConnectionPool
+from .ArrowReader import ArrowReader
+from .ColumnCodec import PICKLE_BINARY_MARKER, SCHEMA_TABLE, CODEC_PLAIN
 
 class MysqlUtils(DBInterface):
-    def __init__(self, dbname: str, user: str, password: str, host: str = 'localhost', port: str = '3306'):
-        """初始化数据库连接参数"""
+    def __init__(self, dbname: str, user: str, password: str, host: str = 'localhost', port: str = '3306',
+                 pool_min_size: int = 1, pool_max_size: int = 8, pool_timeout: float = 30.0,
+                 pool_idle_timeout: float = 300.0, pool_ping_interval: float = 30.0):
+        """
+        初始化数据库连接参数
+        :param pool_min_size: 连接池空闲回收时至少保留的连接数
+        :param pool_max_size: 连接池最大连接数
+        :param pool_timeout: 等待可用连接的最长秒数
+        :param pool_idle_timeout: 空闲连接的回收秒数
+        :param pool_ping_interval: 空闲超过该秒数的连接在借出前做健康检查
+        """
         super().__init__(dbname, user, password, host, port)
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.pool = ConnectionPool(
+            self._new_connection,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            idle_timeout=pool_idle_timeout,
+            ping_interval=pool_ping_interval,
+            ping=lambda conn: conn.ping(reconnect=False)
+        )
+        # SQLAlchemy引擎在首次使用时创建，见DBInterface.engine
+        self._engine_url = "mysql+mysqlconnector://"
+        # Arrow原生读取引擎："adbc"、"connectorx"，都未安装时为None
+        self.arrow_engine = ArrowReader.engine(None)
+        # LOAD DATA LOCAL INFILE 只允许读取该私有目录中的文件；优先放在内存文件系统上
+        self._infile_dir = tempfile.mkdtemp(prefix="opendbutils_mysql_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self._infile_cleanup = weakref.finalize(self, shutil.rmtree, self._infile_dir, True)
+        self._server_limits = None
+        # 元数据表已确认存在，之后不再执行CREATE TABLE（会隐式提交事务）
+        self._schema_table_ready = False
+
+    def _new_connection(self):
+        """建立新的物理数据库连接"""
+        return mysql.connector.connect(
+            database=self.dbname,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=self.port,
+            allow_local_infile_in_path=self._infile_dir
+        )
 
     def _connect(self):
-        """建立数据库连接"""
-        try:
-            conn = mysql.connector.connect(
-                database=self.dbname,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
+        """从连接池借用数据库连接；当前线程有进行中的会话时使用会话固定的连接"""
+        try:
+            conn = self._session_connection() or self._acquire()
             cursor = conn.cursor()
             return conn, cursor
-        except Error as e:
+        except Exception as e:
             raise Exception(f"数据库连接失败: {str(e)}")
 
+    def _release(self, conn, cursor):
+        """关闭游标并将连接归还连接池"""
+        cursor.close()
+        self._return_connection(conn)
+
+    def close(self) -> None:
+        """关闭连接池中的所有连接"""
+        self._dispose_engine()
+        self.pool.close()
+        self._infile_cleanup()
+
+    def open_session(self):
+        """会话开始前先建好元数据表：会话中执行CREATE TABLE会隐式提交会话的事务"""
+        self._ensure_schema_table()
+        return super().open_session()
+
+    def _execute_ddl(self, sql: str) -> None:
+        """
+        在连接池的另一个连接上执行DDL并提交；MySQL的DDL会隐式提交当前事务，不能在会话固定的连接上执行
+        :param sql: DDL语句
+        """
+        conn = self._acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            conn.commit()
+            cursor.close()
+        finally:
+            self.pool.release(conn)
+
+    def _ensure_schema_table(self) -> None:
+        """创建列编码元数据表（每个实例只执行一次）"""
+        if self._schema_table_ready:
+            return
+        try:
+            self._execute_ddl(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+                "table_name VARCHAR(255) NOT NULL, column_name VARCHAR(255) NOT NULL, codec VARCHAR(32) NOT NULL, "
+                "PRIMARY KEY (table_name, column_name))"
+            )
+        except Error as e:
+            raise Exception(f"创建列编码元数据表失败: {str(e)}")
+        self._schema_table_ready = True
+
+    def _arrow_uri(self) -> str:
+        """connectorx使用的连接URI"""
+        return f"mysql://{quote(str(self.user), safe='')}:{quote(str(self.password), safe='')}@{self.host}:{self.port}/{self.dbname}"
+
+    @instrumented("execute")
     def execute(self, sql: str) -> any:
         """执行任意SQL语句"""
         try:
             conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
             cursor.execute(sql)
             return cursor.fetchall()
         except Error as e:
             conn.rollback()
             raise Exception(f"执行SQL语句失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def create_table(self, table_name: str, columns: List[str]) -> None:
         """
@@ -61,8 +154,7 @@ class MysqlUtils(DBInterface):
             conn.rollback()
             raise Exception(f"创建表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def insert_data(self, table_name: str, columns: List[str], values: List[Any]) -> None:
         """
@@ -82,24 +174,245 @@ class MysqlUtils(DBInterface):
             conn.rollback()
             raise Exception(f"插入数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
-    def insert_df(self, data: pd.DataFrame|pl.DataFrame, table_name: str):
+    @instrumented("insert_rows")
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
         """
-        使用copy命令插入数据
-        :param data: 数据框
+        在一个连接、一个事务中批量插入多行
+        mysql-connector的executemany把每批改写为一条多行INSERT，每批只有一次网络往返和一次语句解析
         :param table_name: 表名
+        :param columns: 列名列表
+        :param rows: 行数据（元组列表）
+        :param batch_size: 每条INSERT语句的行数，一批的语句长度不能超过max_allowed_packet
+        :return: 插入的行数
         """
+        if batch_size < 1:
+            raise ValueError("batch_size必须大于0")
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return 0
+        columns_str = ", ".join(columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        insert_query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+        self.instrumentation.annotate(sql=insert_query)
         try:
-            if isinstance(data, pl.DataFrame):
-                data = data.to_pandas()
-            engine = create_engine(f"mysql+mysqlconnector://{self.user}:{self.password}@{self.host}:{self.port}/{self.dbname}")
-            data.to_sql(table_name, engine, if_exists='append', index=False)
+            conn, cursor = self._connect()
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(insert_query, rows[start:start + batch_size])
+            conn.commit()
+            return len(rows)
+        except Error as e:
+            conn.rollback()
+            raise Exception(f"批量插入数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("insert_df")
+    def insert_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str, method: str = "auto",
+                  unique_checks: bool = True) -> dict:
+        """
+        批量插入数据：服务器允许时使用 LOAD DATA LOCAL INFILE，否则按max_allowed_packet切分为大批量的executemany
+        整个加载在一个事务中完成（关闭autocommit），结束后恢复连接的会话设置再归还连接池
+        表不存在时先按数据的结构建表（与原先的to_sql(if_exists="append")一致）
+        :param data: 数据框，列名即目标列清单
+        :param table_name: 表名
+        :param method: "auto"、"load_data" 或 "executemany"
+        :param unique_checks: 为False时本次加载期间关闭唯一性检查（SET unique_checks = 0），调用方需保证数据不重复
+        :return: 本次加载的统计信息 {"rows", "bytes", "batches", "seconds", "rows_per_sec", "format"}
+        """
+        if method not in ("auto", "load_data", "executemany"):
+            raise ValueError(f"不支持的批量插入方式: {method}")
+        start = time.perf_counter()
+        if isinstance(data, pd.DataFrame):
+            data = pl.from_pandas(data)
+        # NaN无法写入MySQL数值列，与to_sql一样按NULL处理
+        data = data.with_columns(
+            pl.col(name).fill_nan(None) for name, dtype in data.schema.items() if dtype in (pl.Float32, pl.Float64)
+        )
+        session_changed = False
+        discard = False
+        try:
+            conn, cursor = self._connect()
+            local_infile, max_allowed_packet = self._load_limits(cursor)
+            self._ensure_table(cursor, table_name, data.schema)
+            conn.autocommit = False
+            if not unique_checks:
+                cursor.execute("SET SESSION unique_checks = 0")
+                session_changed = True
+            stats = None
+            if method == "load_data" or (method == "auto" and local_infile):
+                try:
+                    stats = self._load_data(cursor, data, table_name)
+                except Error as e:
+                    if method == "load_data" or e.errno not in (errorcode.ER_NOT_ALLOWED_COMMAND, errorcode.ER_CLIENT_LOCAL_FILES_DISABLED):
+                        raise
+                    # 服务器或客户端禁止了LOCAL INFILE，之后直接使用executemany
+                    self._server_limits = (False, max_allowed_packet)
+            if stats is None:
+                stats = self._insert_many(cursor, data, table_name, max_allowed_packet)
+            conn.commit()
         except Exception as e:
-            raise Exception(f"copy插入数据失败: {str(e)}")
+            if "conn" in locals():
+                conn.rollback()
+            raise Exception(f"批量插入数据失败: {str(e)}")
         finally:
-            pass
+            if "cursor" in locals():
+                if session_changed:
+                    try:
+                        cursor.execute("SET SESSION unique_checks = 1")
+                    except Exception:
+                        # 无法恢复会话设置的连接不能再交给其他调用方
+                        discard = True
+                cursor.close()
+                self._return_connection(conn, discard=discard)
+        seconds = time.perf_counter() - start
+        stats.update({
+            "rows": len(data),
+            "seconds": seconds,
+            "rows_per_sec": len(data) / seconds if seconds > 0 else float("inf"),
+        })
+        return stats
+
+    def _ensure_table(self, cursor, table_name: str, schema: dict) -> None:
+        """
+        表不存在时按polars结构建表；先用 SELECT ... LIMIT 0 探测（能看到临时表，也不会隐式提交），
+        建表在连接池的另一个连接上执行，不会隐式提交当前连接（或会话）的事务
+        :param cursor: 游标
+        :param table_name: 表名
+        :param schema: {列名: polars类型}
+        """
+        try:
+            cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 0")
+            cursor.fetchall()
+            return
+        except Error as e:
+            if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+        self._execute_ddl(self._create_table_sql(table_name, schema))
+
+    @staticmethod
+    def _create_table_sql(table_name: str, schema: dict) -> str:
+        """按polars结构生成 CREATE TABLE IF NOT EXISTS；文本列使用LONGTEXT，容纳base64编码后的大对象"""
+        columns = []
+        for name, dtype in schema.items():
+            if dtype == pl.Boolean:
+                sql_type = "BOOL"
+            elif dtype == pl.UInt64:
+                sql_type = "BIGINT UNSIGNED"
+            elif dtype.is_integer():
+                sql_type = "BIGINT"
+            elif dtype.is_float():
+                sql_type = "DOUBLE"
+            elif dtype == pl.Binary:
+                sql_type = "LONGBLOB"
+            elif dtype == pl.Date:
+                sql_type = "DATE"
+            elif isinstance(dtype, pl.Datetime):
+                sql_type = "DATETIME(6)"
+            elif dtype == pl.Time:
+                sql_type = "TIME(6)"
+            elif isinstance(dtype, pl.Decimal):
+                sql_type = f"DECIMAL({dtype.precision or 38}, {dtype.scale or 0})"
+            else:
+                sql_type = "LONGTEXT"
+            columns.append("`" + name.replace("`", "``") + "` " + sql_type)
+        return f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})"
+
+    def _load_limits(self, cursor) -> Tuple[bool, int]:
+        """
+        查询服务器是否允许LOCAL INFILE以及max_allowed_packet，结果在实例上缓存
+        :return: (是否允许LOCAL INFILE, max_allowed_packet字节数)
+        """
+        if self._server_limits is None:
+            cursor.execute("SELECT @@GLOBAL.local_infile, @@max_allowed_packet")
+            local_infile, max_allowed_packet = cursor.fetchone()
+            self._server_limits = (bool(int(local_infile)), int(max_allowed_packet))
+        return self._server_limits
+
+    def _load_data(self, cursor, data: pl.DataFrame, table_name: str) -> dict:
+        """
+        把数据写成CSV放在私有临时目录中，通过 LOAD DATA LOCAL INFILE 发送给服务器
+        LOCAL模式下服务器会把数据错误降级为警告并继续执行，因此有警告时直接报错，由调用方回滚
+        """
+        targets = []
+        assignments = []
+        converted = []
+        for i, (name, dtype) in enumerate(data.schema.items()):
+            if dtype == pl.Binary:
+                # 二进制列以十六进制文本传输，再由UNHEX还原
+                targets.append(f"@v{i}")
+                assignments.append(f"{name} = UNHEX(@v{i})")
+                converted.append(pl.col(name).bin.encode("hex"))
+            elif dtype == pl.Boolean:
+                targets.append(name)
+                converted.append(pl.col(name).cast(pl.Int8))
+            else:
+                targets.append(name)
+        if converted:
+            data = data.with_columns(converted)
+        # 空值写为不带引号的NULL，字符串一律加引号，因此字符串"NULL"不会被当作空值
+        output = io.BytesIO()
+        data.write_csv(output, include_header=False, null_value="NULL", quote_style="non_numeric",
+                       datetime_format="%Y-%m-%d %H:%M:%S%.f")
+        payload = output.getvalue()
+
+        fd, path = tempfile.mkstemp(suffix=".csv", dir=self._infile_dir)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(payload)
+            load_query = (
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' INTO TABLE {table_name} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(targets)})"
+            )
+            if assignments:
+                load_query += f" SET {', '.join(assignments)}"
+            cursor.execute(load_query)
+        finally:
+            os.remove(path)
+        if cursor.warning_count:
+            cursor.execute("SHOW WARNINGS LIMIT 3")
+            warnings = "; ".join(str(row[2]) for row in cursor.fetchall())
+            raise Exception(f"LOAD DATA 产生 {cursor.warning_count} 条警告: {warnings}")
+        return {"bytes": len(payload), "batches": 1, "format": "load_data"}
+
+    def _insert_many(self, cursor, data: pl.DataFrame, table_name: str, max_allowed_packet: int) -> dict:
+        """
+        使用executemany批量插入；mysql-connector会把每一批改写成一条多行INSERT语句，
+        因此按估算的每行SQL长度切分，使每条语句不超过max_allowed_packet
+        """
+        columns_str = ", ".join(data.columns)
+        placeholders = ", ".join(["%s"] * len(data.columns))
+        insert_query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+        self.instrumentation.annotate(sql=insert_query)
+        row_bytes = self._estimate_row_bytes(data)
+        budget = max(int(max_allowed_packet * 0.8) - len(insert_query), 1)
+        ends = np.cumsum(row_bytes)
+        total_bytes = int(ends[-1]) if len(ends) else 0
+        batches = 0
+        start = 0
+        while start < len(data):
+            consumed = int(ends[start - 1]) if start else 0
+            end = max(int(np.searchsorted(ends, consumed + budget, side="right")), start + 1)
+            cursor.executemany(insert_query, data.slice(start, end - start).rows())
+            batches += 1
+            start = end
+        return {"bytes": total_bytes, "batches": batches, "format": "executemany"}
+
+    @staticmethod
+    def _estimate_row_bytes(data: pl.DataFrame) -> np.ndarray:
+        """估算每行在INSERT语句中的字节数：变长值按转义后最多两倍计算，定长值按字面量的最大长度计算"""
+        sizes = np.full(len(data), 4 + 4 * len(data.columns), dtype=np.int64)
+        for name, dtype in data.schema.items():
+            column = data.get_column(name)
+            if dtype == pl.Utf8:
+                sizes += 2 * column.str.len_bytes().fill_null(0).to_numpy().astype(np.int64) + 8
+            elif dtype == pl.Binary:
+                sizes += 2 * column.bin.size().fill_null(0).to_numpy().astype(np.int64) + 16
+            else:
+                sizes += 32
+        return sizes
 
     def select_data(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None, offset: int = None) -> List[Tuple]:
         """
@@ -126,9 +439,9 @@ class MysqlUtils(DBInterface):
         except Error as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
+    @instrumented("select_df")
     def select_df(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None, offset: int = None) -> pd.DataFrame:
         """
         查询数据并转换为DataFrame
@@ -149,13 +462,129 @@ class MysqlUtils(DBInterface):
                 select_query += f" LIMIT {limit}"
             if offset:
                 select_query += f" OFFSET {offset}"
+            self.instrumentation.annotate(sql=select_query)
             return pd.read_sql_query(select_query, conn)
         except Error as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    @instrumented("select_sql")
+    def select_sql(self, sql: str, params: list = None) -> pd.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并转换为DataFrame
+        :param sql: SQL查询语句
+        :param params: 占位符（%s）对应的参数
+        :return: 查询结果DataFrame
+        """
+        try:
+            conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
+            return pd.read_sql_query(sql, conn, params=params)
+        except Error as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("select_sql")
+    def select_sql_pl(self, sql: str, params: list = None) -> pl.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并直接读为polars DataFrame，不经过pandas
+        没有参数时与select_pl相同，优先使用Arrow原生读取引擎；有参数时从连接池连接的游标按列构建
+        :param sql: SQL查询语句
+        :param params: 占位符（%s）对应的参数
+        :return: 查询结果polars DataFrame
+        """
+        self.instrumentation.annotate(sql=sql)
+        try:
+            if self.arrow_engine and not params:
+                return ArrowReader.read_uri(sql, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(sql, params or ())
+            return ArrowReader.from_cursor(cursor)
+        except Error as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
+
+    @instrumented("select_df")
+    def select_pl(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                  offset: int = None) -> pl.DataFrame:
+        """
+        查询数据并直接读为polars DataFrame（Arrow内存），不经过pandas
+        安装了connectorx时由其直接生成Arrow数据（使用独立连接），否则从连接池连接的游标按列构建
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param offset: 偏移量
+        :return: 查询结果polars DataFrame
+        """
+        columns_str = ", ".join(columns)
+        select_query = f"SELECT {columns_str} FROM {table_name}"
+        if condition:
+            select_query += f" WHERE {condition}"
+        if limit:
+            select_query += f" LIMIT {limit}"
+        if offset:
+            select_query += f" OFFSET {offset}"
+        self.instrumentation.annotate(sql=select_query)
+        try:
+            if self.arrow_engine:
+                return ArrowReader.read_uri(select_query, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(select_query)
+            return ArrowReader.from_cursor(cursor)
+        except Error as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
 
+    def select_iter(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                    batch_rows: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        使用无缓冲游标流式查询数据，每次只在内存中保留一批
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param batch_rows: 每批的行数
+        :return: DataFrame迭代器
+        """
+        try:
+            conn = self._acquire()
+            # 无缓冲游标边读边取，结果集不会一次性加载到客户端
+            cursor = conn.cursor(buffered=False)
+            columns_str = ", ".join(columns)
+            select_query = f"SELECT {columns_str} FROM {table_name}"
+            if condition:
+                select_query += f" WHERE {condition}"
+            if limit:
+                select_query += f" LIMIT {limit}"
+            cursor.execute(select_query)
+        except Exception as e:
+            if "conn" in locals():
+                self.pool.release(conn)
+            raise Exception(f"查询数据失败: {str(e)}")
+        exhausted = False
+        try:
+            column_names = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    exhausted = True
+                    break
+                yield pd.DataFrame.from_records(rows, columns=column_names)
+        finally:
+            if exhausted:
+                self._release(conn, cursor)
+            else:
+                # 提前结束时连接上还有未读取的结果，直接丢弃该连接比读完剩余结果更快
+                self.pool.release(conn, discard=True)
+
+    @instrumented("count_data")
     def count_data(self, table_name: str, condition: str = None) -> int:
         """
         查询数据数量
@@ -168,14 +597,215 @@ class MysqlUtils(DBInterface):
             count_query = f"SELECT COUNT(*) FROM {table_name}"
             if condition:
                 count_query += f" WHERE {condition}"
+            self.instrumentation.annotate(sql=count_query)
             cursor.execute(count_query)
             return cursor.fetchone()[0]
         except Error as e:
             raise Exception(f"查询数据数量失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    def estimate_count(self, table_name: str) -> int | None:
+        """
+        从information_schema.TABLES.TABLE_ROWS读取表的估计行数（InnoDB为采样估计），不扫描表
+        :param table_name: 表名
+        :return: 估计行数，没有统计信息时返回None
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                (table_name,)
+            )
+            row = cursor.fetchone()
+        except Exception as e:
+            raise Exception(f"查询估计行数失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+        if not row or row[0] is None:
+            return None
+        return int(row[0])
+
+    def primary_key(self, table_name: str) -> List[str]:
+        """
+        查询表的主键列
+        :param table_name: 表名
+        :return: 主键列名列表（按索引顺序），没有主键时为空列表
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+                "ORDER BY ORDINAL_POSITION",
+                (table_name,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Error as e:
+            raise Exception(f"查询主键失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
+    def key_bounds(self, table_name: str, column: str, condition: str = None) -> Tuple[Any, Any]:
+        """
+        查询列的最小值和最大值
+        :param table_name: 表名
+        :param column: 列名
+        :param condition: WHERE条件语句
+        :return: (最小值, 最大值)
+        """
+        try:
+            conn, cursor = self._connect()
+            bounds_query = f"SELECT MIN({column}), MAX({column}) FROM {table_name}"
+            if condition:
+                bounds_query += f" WHERE {condition}"
+            cursor.execute(bounds_query)
+            return tuple(cursor.fetchone())
+        except Error as e:
+            raise Exception(f"查询列范围失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def key_histogram(self, table_name: str, column: str) -> List[Tuple[Any, float]]:
+        """
+        读取 ANALYZE TABLE ... UPDATE HISTOGRAM 生成的列直方图 (MySQL 8.0+)
+        :param table_name: 表名
+        :param column: 列名
+        :return: [(边界值, 累计比例)]，没有统计信息时为空列表
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT HISTOGRAM FROM information_schema.COLUMN_STATISTICS "
+                "WHERE SCHEMA_NAME = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+                (table_name, column)
+            )
+            row = cursor.fetchone()
+        except Error:
+            # MySQL 8.0以下或MariaDB没有COLUMN_STATISTICS
+            return []
+        finally:
+            self._release(conn, cursor)
+        if not row or not row[0]:
+            return []
+        histogram = json.loads(row[0]) if isinstance(row[0], (str, bytes)) else row[0]
+        # singleton桶为 [值, 累计频率]，equi-height桶为 [下界, 上界, 累计频率, 不同值数量]
+        buckets = histogram.get("buckets", [])
+        if histogram.get("histogram-type") == "equi-height":
+            return [(bucket[1], bucket[2]) for bucket in buckets]
+        return [(bucket[0], bucket[1]) for bucket in buckets]
+
+    def binary_column_type(self, pickled: bool = False) -> str:
+        """
+        原生二进制列的DDL类型
+        :param pickled: 是否为pickle列（MySQL通过列注释区分）
+        :return: 类型名
+        """
+        return "LONGBLOB"
+
+    def mark_pickle_column(self, table_name: str, column: str) -> None:
+        """
+        通过列注释把二进制列标记为pickle列；ALTER TABLE会隐式提交事务，不能在会话中执行
+        :param table_name: 表名
+        :param column: 列名
+        """
+        if self._session_connection() is not None:
+            raise ValueError("ALTER TABLE会隐式提交会话的事务，不能在会话中标记pickle列")
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"ALTER TABLE {table_name} MODIFY COLUMN {column} LONGBLOB COMMENT '{PICKLE_BINARY_MARKER}'")
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            raise Exception(f"标记pickle列失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def binary_columns(self, table_name: str) -> dict:
+        """
+        从表结构中读取BLOB/BINARY列
+        :param table_name: 表名
+        :return: {列名: "bytes" | "pickle"}
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT COLUMN_NAME, COLUMN_COMMENT FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+                "AND DATA_TYPE IN ('tinyblob', 'blob', 'mediumblob', 'longblob', 'binary', 'varbinary')",
+                (table_name,)
+            )
+            return {
+                name: "pickle" if comment == PICKLE_BINARY_MARKER else "bytes"
+                for name, comment in cursor.fetchall()
+            }
+        except Error as e:
+            raise Exception(f"查询二进制列失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def save_column_codecs(self, table_name: str, column_codecs: dict, replace: bool = False) -> None:
+        """
+        把各列的编码方式写入元数据表
+        :param table_name: 表名
+        :param column_codecs: {列名: 编码方式}
+        :param replace: 为True时先清除该表原有的记录（表被重建时）；否则只把plain升级为具体编码，已有的编码保持不变
+        """
+        self._ensure_schema_table()
+        try:
+            conn, cursor = self._connect()
+            if replace:
+                cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            cursor.executemany(
+                f"INSERT INTO {SCHEMA_TABLE} (table_name, column_name, codec) VALUES (%s, %s, %s) "
+                f"ON DUPLICATE KEY UPDATE codec = IF(codec = '{CODEC_PLAIN}', VALUES(codec), codec)",
+                [(table_name, column, codec) for column, codec in column_codecs.items()]
+            )
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                # 元数据表被外部删除，下次重新创建
+                self._schema_table_ready = False
+            raise Exception(f"写入列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def load_column_codecs(self, table_name: str) -> dict:
+        """
+        从元数据表读取各列的编码方式
+        :param table_name: 表名
+        :return: {列名: 编码方式}，元数据表或记录不存在时为空字典
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"SELECT column_name, codec FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            return {column: codec for column, codec in cursor.fetchall()}
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                return {}
+            raise Exception(f"读取列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def delete_column_codecs(self, table_name: str) -> None:
+        """
+        删除元数据表中该表的记录
+        :param table_name: 表名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            conn.commit()
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                return
+            conn.rollback()
+            raise Exception(f"删除列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("delete_data")
     def delete_data(self, table_name: str, condition: str) -> None:
         """
         删除数据
@@ -185,14 +815,89 @@ class MysqlUtils(DBInterface):
         try:
             conn, cursor = self._connect()
             delete_query = f"DELETE FROM {table_name} WHERE {condition}"
+            self.instrumentation.annotate(sql=delete_query)
             cursor.execute(delete_query)
             conn.commit()
         except Error as e:
             conn.rollback()
             raise Exception(f"删除数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    def create_staging_table(self, table_name: str, staging_name: str, columns: List[str]) -> None:
+        """
+        创建只在当前连接可见的临时暂存表，列类型与目标表相同（不复制约束），另有带索引的行号列
+        :param table_name: 目标表名
+        :param staging_name: 暂存表名
+        :param columns: 暂存的列
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            # 行号列和索引在同一条CREATE TEMPORARY TABLE中声明：临时表的ALTER TABLE和CREATE INDEX也会隐式提交，
+            # upsert_df的会话事务会被提前提交
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {staging_name} "
+                f"({STAGING_ROW_COLUMN} BIGINT, INDEX {staging_name}_row ({STAGING_ROW_COLUMN})) "
+                f"SELECT {columns_str} FROM {table_name} LIMIT 0"
+            )
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            raise Exception(f"创建暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("merge_staging")
+    def merge_staging(self, table_name: str, staging_name: str, columns: List[str], key_columns: List[str],
+                      update_columns: List[str], start: int, stop: int) -> int:
+        """
+        把暂存表中行号在[start, stop)内的行合并进目标表
+        :param table_name: 目标表名，key_columns上需要有主键或唯一索引
+        :param staging_name: 暂存表名
+        :param columns: 合并的列
+        :param key_columns: 冲突判断的键列
+        :param update_columns: 键冲突时更新的列，为空时保留已有行
+        :param start: 起始行号
+        :param stop: 结束行号（不含）
+        :return: 数据库报告的影响行数
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            # 没有要更新的列时把键列赋值为自身，保留已有行（INSERT IGNORE会同时忽略其他错误）
+            assignments = [f"{column} = s.{column}" for column in update_columns] or [
+                f"{key_columns[0]} = {table_name}.{key_columns[0]}"
+            ]
+            merge_query = (
+                f"INSERT INTO {table_name} ({columns_str}) SELECT {columns_str} FROM {staging_name} AS s "
+                f"WHERE {STAGING_ROW_COLUMN} >= {start} AND {STAGING_ROW_COLUMN} < {stop} "
+                f"ON DUPLICATE KEY UPDATE {', '.join(assignments)}"
+            )
+            self.instrumentation.annotate(sql=merge_query)
+            cursor.execute(merge_query)
+            conn.commit()
+            return cursor.rowcount
+        except Error as e:
+            conn.rollback()
+            raise Exception(f"合并数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def drop_staging_table(self, staging_name: str) -> None:
+        """
+        删除临时暂存表
+        :param staging_name: 暂存表名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_name}")
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            raise Exception(f"删除暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
     def drop_table(self, table_name: str) -> None:
         """
@@ -208,5 +913,4 @@ class MysqlUtils(DBInterface):
             conn.rollback()
             raise Exception(f"删除表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close() 
\ No newline at end of file
+            self._release(conn, cursor) 
\ No newline at end of file
@@ -0,0 +1,137 @@
+import numpy as np
+import polars as pl
+
+# COPY BINARY 文件头: 签名 + 标志位(int32) + 头部扩展长度(int32)
+COPY_BINARY_HEADER = b"PGCOPY\n\377\r\n\0" + b"\0\0\0\0" + b"\0\0\0\0"
+COPY_BINARY_TRAILER = b"\377\377"
+
+# PostgreSQL 纪元 2000-01-01 相对 Unix 纪元的偏移
+_PG_EPOCH_DAYS = 10957
+_PG_EPOCH_MICROSECONDS = _PG_EPOCH_DAYS * 86400 * 1000000
+
+# 定长类型: PostgreSQL类型名 -> (polars类型, 大端numpy类型)
+_FIXED_TYPES = {
+    "int2": (pl.Int16, ">i2"),
+    "int4": (pl.Int32, ">i4"),
+    "int8": (pl.Int64, ">i8"),
+    "float4": (pl.Float32, ">f4"),
+    "float8": (pl.Float64, ">f8"),
+    "bool": (pl.Boolean, ">u1"),
+}
+# 二进制格式与文本格式相同（UTF-8字节）的类型
+_TEXT_TYPES = {"text", "varchar", "bpchar", "name", "json", "xml", "citext"}
+
+
+class BinaryCopyEncoder:
+    """
+    把polars DataFrame按列直接编码为 COPY ... FROM STDIN (FORMAT binary) 的字节流
+    每一列的定长值、长度字段和变长数据都用numpy整列写入输出缓冲区，不逐行构造Python对象
+    """
+
+    @staticmethod
+    def supports(pg_types: list) -> bool:
+        """
+        判断目标列类型是否都能编码为二进制COPY格式
+        :param pg_types: 目标列的PostgreSQL类型名（pg_type.typname）
+        """
+        return all(
+            pg_type in _FIXED_TYPES or pg_type in _TEXT_TYPES or pg_type in ("bytea", "timestamp", "timestamptz", "date")
+            for pg_type in pg_types
+        )
+
+    @staticmethod
+    def encode(data: pl.DataFrame, pg_types: list) -> bytes:
+        """
+        编码为二进制COPY字节流
+        :param data: 数据框，列顺序与COPY语句的列清单一致
+        :param pg_types: 每列对应的PostgreSQL类型名
+        :return: 包含文件头和结束标记的完整字节流
+        """
+        rows = len(data)
+        num_columns = len(data.columns)
+        columns = [
+            BinaryCopyEncoder._encode_column(data.get_column(name), pg_type)
+            for name, pg_type in zip(data.columns, pg_types)
+        ]
+
+        # 每行: int16字段数 + 每个字段 (int32长度 + 数据)
+        row_sizes = np.full(rows, 2, dtype=np.int64)
+        for _, lengths, _, _ in columns:
+            row_sizes += 4 + np.maximum(lengths, 0)
+        row_starts = len(COPY_BINARY_HEADER) + np.cumsum(row_sizes) - row_sizes
+        total = len(COPY_BINARY_HEADER) + int(row_sizes.sum()) + len(COPY_BINARY_TRAILER)
+
+        buffer = np.zeros(total, dtype=np.uint8)
+        buffer[:len(COPY_BINARY_HEADER)] = np.frombuffer(COPY_BINARY_HEADER, dtype=np.uint8)
+        buffer[total - len(COPY_BINARY_TRAILER):] = np.frombuffer(COPY_BINARY_TRAILER, dtype=np.uint8)
+        BinaryCopyEncoder._scatter_fixed(buffer, row_starts, np.full(rows, num_columns, dtype=">i2"))
+
+        field_starts = row_starts + 2
+        for values, lengths, offsets, width in columns:
+            BinaryCopyEncoder._scatter_fixed(buffer, field_starts, lengths.astype(">i4"))
+            valid = lengths >= 0
+            data_starts = field_starts + 4
+            if width:
+                BinaryCopyEncoder._scatter_fixed(buffer, data_starts[valid], values[valid])
+            elif len(values):
+                sizes = np.maximum(lengths, 0)
+                buffer[np.arange(len(values)) + np.repeat(data_starts - offsets[:-1], sizes)] = values
+            field_starts = data_starts + np.maximum(lengths, 0)
+        return buffer.tobytes()
+
+    @staticmethod
+    def _scatter_fixed(buffer: np.ndarray, starts: np.ndarray, values: np.ndarray) -> None:
+        """把定长值的大端字节写入各自的起始位置"""
+        width = values.dtype.itemsize
+        if len(values) == 0:
+            return
+        buffer[starts[:, None] + np.arange(width)] = values.view(np.uint8).reshape(-1, width)
+
+    @staticmethod
+    def _encode_column(series: pl.Series, pg_type: str):
+        """
+        编码一列
+        :return: (数据, 每行长度(空值为-1), 变长数据的偏移量, 定长宽度(变长为0))
+        """
+        nulls = series.is_null().to_numpy()
+        if pg_type in _FIXED_TYPES:
+            polars_type, numpy_type = _FIXED_TYPES[pg_type]
+            values = series.cast(polars_type, strict=True).fill_null(0).to_numpy().astype(numpy_type)
+            width = values.dtype.itemsize
+        elif pg_type == "date":
+            days = series.cast(pl.Date, strict=True).cast(pl.Int32).fill_null(_PG_EPOCH_DAYS).to_numpy()
+            values = (days.astype(np.int64) - _PG_EPOCH_DAYS).astype(">i4")
+            width = 4
+        elif pg_type in ("timestamp", "timestamptz"):
+            if not isinstance(series.dtype, pl.Datetime):
+                series = series.cast(pl.Datetime("us"), strict=True)
+            microseconds = series.dt.cast_time_unit("us").dt.epoch("us").fill_null(_PG_EPOCH_MICROSECONDS).to_numpy()
+            values = (microseconds - _PG_EPOCH_MICROSECONDS).astype(">i8")
+            width = 8
+        else:
+            values, offsets = BinaryCopyEncoder._variable_buffers(series, pg_type)
+            lengths = np.diff(offsets)
+            lengths[nulls] = -1
+            return values, lengths, offsets, 0
+        lengths = np.full(len(series), width, dtype=np.int64)
+        lengths[nulls] = -1
+        return values, lengths, None, width
+
+    @staticmethod
+    def _variable_buffers(series: pl.Series, pg_type: str):
+        """通过Arrow的偏移量/数据缓冲区取得变长列的字节，不逐个构造Python对象"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if pg_type != "bytea" and series.dtype != pl.Utf8:
+            series = series.cast(pl.Utf8, strict=True)
+        array = pc.cast(series.to_arrow(), pa.large_binary())
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        _, offsets_buffer, data_buffer = array.buffers()
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+        if data_buffer is None:
+            data = np.zeros(0, dtype=np.uint8)
+        else:
+            data = np.frombuffer(data_buffer, dtype=np.uint8)[offsets[0]:offsets[-1]]
+        return data, offsets - offsets[0]
@@ -1,49 +1,122 @@
 import psycopg2
 import io
+import time
+import concurrent.futures
+import hashlib
+import threading
+import uuid
+import weakref
 from psycopg2.extras import execute_values
-from typing import List, Tuple, Any
+from urllib.parse import quote
+from typing import List, Tuple, Any, Iterator
 import pandas as pd
 import polars as pl
-from .DBInterface import DBInterface
+from .DBInterface import DBInterface, STAGING_ROW_COLUMN
+from .Instrumentation import instrumented
+from .ConnectionPool import ConnectionPool
+from .ArrowReader import ArrowReader
+from .PostgreCopy import BinaryCopyEncoder
+from .ColumnCodec import PICKLE_BINARY_MARKER, SCHEMA_TABLE, CODEC_PLAIN
+from .Session import physical_connection
+
+
+_PG_OID_BOOL = 16
+_PG_OID_BYTEA = 17
+_PG_OID_DATE = 1082
+_PG_OID_TIMESTAMP = 1114
+_PG_OID_TIMESTAMPTZ = 1184
+# COPY TO STDOUT读取时可以直接由CSV解析器转换的类型（按类型OID），其余类型先按字符串读取
+_COPY_READ_TYPES = {
+    20: pl.Int64,    # int8
+    21: pl.Int16,    # int2
+    23: pl.Int32,    # int4
+    26: pl.Int64,    # oid
+    700: pl.Float32,  # float4
+    701: pl.Float64,  # float8
+    1700: pl.Float64,  # numeric
+}
 
 
 class PostgreUtils(DBInterface):
-    def __init__(self, dbname: str, user: str, password: str, host: str = 'localhost', port: str = '5432'):
-        """初始化数据库连接参数"""
+    def __init__(self, dbname: str, user: str, password: str, host: str = 'localhost', port: str = '5432',
+                 pool_min_size: int = 1, pool_max_size: int = 8, pool_timeout: float = 30.0,
+                 pool_idle_timeout: float = 300.0, pool_ping_interval: float = 30.0):
+        """
+        初始化数据库连接参数
+        :param pool_min_size: 连接池空闲回收时至少保留的连接数
+        :param pool_max_size: 连接池最大连接数
+        :param pool_timeout: 等待可用连接的最长秒数
+        :param pool_idle_timeout: 空闲连接的回收秒数
+        :param pool_ping_interval: 空闲超过该秒数的连接在借出前做健康检查
+        """
         super().__init__(dbname, user, password, host, port)
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.pool = ConnectionPool(
+            self._new_connection,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            idle_timeout=pool_idle_timeout,
+            ping_interval=pool_ping_interval
+        )
+        # SQLAlchemy引擎在首次使用时创建，见DBInterface.engine
+        self._engine_url = "postgresql+psycopg2://"
+        # Arrow原生读取引擎："adbc"、"connectorx"，都未安装时为None
+        self.arrow_engine = ArrowReader.engine("adbc_driver_postgresql")
+        # 各物理连接上已PREPARE的语句名 {连接: {语句名}}，连接关闭后自动移除
+        self._prepared = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+
+    def _new_connection(self):
+        """建立新的物理数据库连接"""
+        return psycopg2.connect(
+            dbname=self.dbname,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=self.port
+        )
 
     def _connect(self):
-        """建立数据库连接"""
-        try:
-            conn = psycopg2.connect(
-                dbname=self.dbname,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
+        """从连接池借用数据库连接；当前线程有进行中的会话时使用会话固定的连接"""
+        try:
+            conn = self._session_connection() or self._acquire()
             cursor = conn.cursor()
             return conn, cursor
         except Exception as e:
             raise Exception(f"数据库连接失败: {str(e)}")
 
+    def _release(self, conn, cursor):
+        """关闭游标并将连接归还连接池"""
+        cursor.close()
+        self._return_connection(conn)
+
+    def close(self) -> None:
+        """关闭连接池中的所有连接"""
+        self._dispose_engine()
+        self.pool.close()
+
+    def _arrow_uri(self) -> str:
+        """ADBC/connectorx使用的连接URI"""
+        return f"postgresql://{quote(str(self.user), safe='')}:{quote(str(self.password), safe='')}@{self.host}:{self.port}/{self.dbname}"
+
+    @instrumented("execute")
     def execute(self, sql: str) -> any:
         """执行任意SQL语句"""
         try:
             conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
             cursor.execute(sql)
             return cursor.fetchall()
         except Exception as e:
             conn.rollback()
             raise Exception(f"执行SQL语句失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def create_table(self, table_name: str, columns: List[str]) -> None:
         """
@@ -61,8 +134,7 @@ class PostgreUtils(DBInterface):
             conn.rollback()
             raise Exception(f"创建表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def insert_data(self, table_name: str, columns: List[str], values: List[Any]) -> None:
         """
@@ -82,30 +154,162 @@ class PostgreUtils(DBInterface):
             conn.rollback()
             raise Exception(f"插入数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    @instrumented("insert_rows")
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
+        """
+        在一个连接、一个事务中批量插入多行
+        整批的行使用服务端预处理的多行INSERT（PREPARE一次，之后每批只EXECUTE），预处理语句按(表, 列, 批大小)在每个连接上缓存；
+        不足一批的剩余行使用execute_values
+        :param table_name: 表名
+        :param columns: 列名列表
+        :param rows: 行数据（元组列表）
+        :param batch_size: 每条INSERT语句的行数，受PostgreSQL每条语句最多65535个参数的限制
+        :return: 插入的行数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size必须大于0")
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return 0
+        batch_size = max(min(batch_size, 65535 // len(columns)), 1)
+        columns_str = ", ".join(columns)
+        full = len(rows) // batch_size * batch_size
+        self.instrumentation.annotate(sql=f"INSERT INTO {table_name} ({columns_str})")
+        try:
+            conn, cursor = self._connect()
+            if full:
+                name = self._prepare_insert(conn, cursor, table_name, columns, batch_size)
+                execute_query = f"EXECUTE {name} ({', '.join(['%s'] * (len(columns) * batch_size))})"
+                for start in range(0, full, batch_size):
+                    cursor.execute(execute_query, [value for row in rows[start:start + batch_size] for value in row])
+            if full < len(rows):
+                execute_values(cursor, f"INSERT INTO {table_name} ({columns_str}) VALUES %s", rows[full:], page_size=batch_size)
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"批量插入数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
-    def insert_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str):
+    def _prepare_insert(self, conn, cursor, table_name: str, columns: List[str], batch_size: int) -> str:
+        """
+        在该连接上预处理batch_size行的多行INSERT，已预处理过时直接返回语句名
+        预处理语句属于会话、不受事务回滚影响，参数类型由目标列推断
+        """
+        name = "opendbutils_insert_" + hashlib.md5(f"{table_name}|{','.join(columns)}|{batch_size}".encode()).hexdigest()[:16]
+        # 预处理语句属于物理连接，会话中按被包装的连接记录
+        conn = physical_connection(conn)
+        with self._prepared_lock:
+            if name in self._prepared.get(conn, ()):
+                return name
+        width = len(columns)
+        values = ", ".join(
+            "(" + ", ".join(f"${row * width + i + 1}" for i in range(width)) + ")" for row in range(batch_size)
+        )
+        cursor.execute(f"PREPARE {name} AS INSERT INTO {table_name} ({', '.join(columns)}) VALUES {values}")
+        with self._prepared_lock:
+            self._prepared.setdefault(conn, set()).add(name)
+        return name
+
+    @instrumented("insert_df")
+    def insert_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str, copy_format: str = "binary") -> dict:
         """
         使用copy命令插入数据
-        :param data: 数据框
+        :param data: 数据框，列名即COPY的目标列清单
         :param table_name: 表名
+        :param copy_format: "binary" 使用 COPY ... (FORMAT binary)，目标列类型不支持时自动退回 "csv"
+        :return: 本次COPY的统计信息 {"rows", "bytes", "seconds", "rows_per_sec", "format"}
         """
+        start = time.perf_counter()
         try:
             if isinstance(data, pd.DataFrame):
                 data = pl.from_pandas(data)
-            output = io.BytesIO()
-            data.write_csv(output, include_header=False, separator='\t')
             conn, cursor = self._connect()
-            output.seek(0)
-            cursor.copy_from(output, table_name, sep='\t', null="")
+            columns_str = ", ".join(data.columns)
+            payload = None
+            self.instrumentation.annotate(sql=f"COPY {table_name} ({columns_str})")
+            if copy_format == "binary":
+                pg_types = self._column_types(cursor, table_name, data.columns)
+                if BinaryCopyEncoder.supports(pg_types):
+                    try:
+                        payload = BinaryCopyEncoder.encode(data, pg_types)
+                        copy_format = "binary"
+                    except Exception:
+                        # 数据无法按目标类型转换（或未安装pyarrow）时退回CSV
+                        payload = None
+            if payload is not None:
+                cursor.copy_expert(f"COPY {table_name} ({columns_str}) FROM STDIN (FORMAT binary)", io.BytesIO(payload))
+            else:
+                # CSV格式会正确处理文本中的制表符、换行和引号；bytea使用\x十六进制输入格式
+                binary_columns = [name for name, dtype in data.schema.items() if dtype == pl.Binary]
+                if binary_columns:
+                    data = data.with_columns(
+                        (pl.lit("\\x") + pl.col(name).bin.encode("hex")).alias(name) for name in binary_columns
+                    )
+                output = io.BytesIO()
+                data.write_csv(output, include_header=False)
+                payload = output.getvalue()
+                copy_format = "csv"
+                cursor.copy_expert(f"COPY {table_name} ({columns_str}) FROM STDIN (FORMAT csv)", io.BytesIO(payload))
             conn.commit()
-            conn.close()
         except Exception as e:
+            if "conn" in locals():
+                conn.rollback()
             raise Exception(f"copy插入数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            if "cursor" in locals():
+                self._release(conn, cursor)
+        seconds = time.perf_counter() - start
+        return {
+            "rows": len(data),
+            "bytes": len(payload),
+            "seconds": seconds,
+            "rows_per_sec": len(data) / seconds if seconds > 0 else float("inf"),
+            "format": copy_format,
+        }
+
+    def copy_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str, streams: int = 4,
+                copy_format: str = "binary") -> List[dict]:
+        """
+        把数据切成多段，在多个连接池连接上并行执行COPY
+        :param data: 数据框
+        :param table_name: 表名
+        :param streams: 并行COPY流的数量
+        :param copy_format: "binary" 或 "csv"
+        :return: 每个COPY流的统计信息列表
+        """
+        if isinstance(data, pd.DataFrame):
+            data = pl.from_pandas(data)
+        streams = max(1, min(streams, len(data)))
+        slice_size = (len(data) + streams - 1) // streams
+        with concurrent.futures.ThreadPoolExecutor(max_workers=streams) as executor:
+            futures = [
+                executor.submit(self.insert_df, data.slice(i * slice_size, slice_size), table_name, copy_format)
+                for i in range(streams)
+            ]
+            return [future.result() for future in futures]
+
+    def _column_types(self, cursor, table_name: str, columns: List[str]) -> List[str]:
+        """
+        查询目标列的PostgreSQL类型名
+        :param cursor: 游标
+        :param table_name: 表名
+        :param columns: 列名列表
+        :return: 与columns一一对应的pg_type.typname
+        """
+        cursor.execute(
+            "SELECT a.attname, t.typname FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid "
+            "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped",
+            (table_name,)
+        )
+        types = dict(cursor.fetchall())
+        missing = [column for column in columns if column not in types]
+        if missing:
+            raise Exception(f"表 {table_name} 中不存在列: {', '.join(missing)}")
+        return [types[column] for column in columns]
 
     def select_data(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
                     offset: int = None) -> List[Tuple]:
@@ -133,9 +337,9 @@ class PostgreUtils(DBInterface):
         except Exception as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
+    @instrumented("select_df")
     def select_df(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
                   offset: int = None) -> pd.DataFrame:
         """
@@ -157,13 +361,189 @@ class PostgreUtils(DBInterface):
                 select_query += f" LIMIT {limit}"
             if offset:
                 select_query += f" OFFSET {offset}"
+            self.instrumentation.annotate(sql=select_query)
             return pd.read_sql_query(select_query, conn)
         except Exception as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            conn.close()
-            cursor.close()
+            self._release(conn, cursor)
+
+    @instrumented("select_sql")
+    def select_sql(self, sql: str, params: list = None) -> pd.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并转换为DataFrame
+        :param sql: SQL查询语句
+        :param params: 占位符（%s）对应的参数
+        :return: 查询结果DataFrame
+        """
+        try:
+            conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
+            return pd.read_sql_query(sql, conn, params=params)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
+    @instrumented("select_df")
+    def select_df_copy(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                       offset: int = None, backend: str = "pandas") -> pd.DataFrame | pl.DataFrame:
+        """
+        使用 COPY (SELECT ...) TO STDOUT 以CSV格式读取数据，并用polars的原生CSV解析器解析，
+        不经过逐行构造Python元组
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param offset: 偏移量
+        :param backend: 返回的DataFrame类型，"pandas" 或 "polars"
+        :return: 查询结果DataFrame
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            select_query = f"SELECT {columns_str} FROM {table_name}"
+            if condition:
+                select_query += f" WHERE {condition}"
+            if limit:
+                select_query += f" LIMIT {limit}"
+            if offset:
+                select_query += f" OFFSET {offset}"
+            self.instrumentation.annotate(sql=select_query)
+            # 先取得结果列的类型，用于指定CSV解析的schema
+            cursor.execute(f"SELECT * FROM ({select_query}) AS copy_query LIMIT 0")
+            description = cursor.description
+            output = io.BytesIO()
+            cursor.copy_expert(f"COPY ({select_query}) TO STDOUT (FORMAT csv, HEADER true)", output)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+        output.seek(0)
+        data = self._parse_copy_csv(output, description)
+        return data.to_pandas() if backend == "pandas" else data
+
+    @staticmethod
+    def _parse_copy_csv(output: io.BytesIO, description) -> pl.DataFrame:
+        """按结果列的PostgreSQL类型把COPY输出的CSV解析为polars DataFrame"""
+        names = [column.name for column in description]
+        schema = {name: _COPY_READ_TYPES.get(column.type_code, pl.Utf8) for name, column in zip(names, description)}
+        if output.getbuffer().nbytes == 0:
+            return pl.DataFrame(schema=schema)
+        # CSV中未加引号的空字段为NULL，""为空字符串，与polars的解析规则一致
+        data = pl.read_csv(output, schema=schema)
+        conversions = []
+        for name, column in zip(names, description):
+            if column.type_code == _PG_OID_BOOL:
+                conversions.append(pl.col(name) == "t")
+            elif column.type_code == _PG_OID_BYTEA:
+                conversions.append(pl.col(name).str.strip_prefix("\\x").str.decode("hex"))
+            elif column.type_code == _PG_OID_DATE:
+                conversions.append(pl.col(name).str.to_date(strict=False))
+            elif column.type_code == _PG_OID_TIMESTAMP:
+                conversions.append(pl.col(name).str.to_datetime(strict=False))
+            elif column.type_code == _PG_OID_TIMESTAMPTZ:
+                conversions.append(pl.col(name).str.to_datetime(time_zone="UTC", strict=False))
+        if conversions:
+            data = data.with_columns(conversions)
+        return data
+
+    @instrumented("select_sql")
+    def select_sql_pl(self, sql: str, params: list = None) -> pl.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并直接读为polars DataFrame，不经过pandas
+        没有参数时与select_pl相同，优先使用Arrow原生读取引擎；有参数时从连接池连接的游标按列构建
+        :param sql: SQL查询语句
+        :param params: 占位符（%s）对应的参数
+        :return: 查询结果polars DataFrame
+        """
+        self.instrumentation.annotate(sql=sql)
+        try:
+            if self.arrow_engine and not params:
+                return ArrowReader.read_uri(sql, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(sql, params or ())
+            return ArrowReader.from_cursor(cursor)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
+
+    @instrumented("select_df")
+    def select_pl(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                  offset: int = None) -> pl.DataFrame:
+        """
+        查询数据并直接读为polars DataFrame（Arrow内存），不经过pandas
+        安装了ADBC驱动(adbc-driver-postgresql)或connectorx时由其直接生成Arrow数据（使用独立连接），否则从连接池连接的游标按列构建
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param offset: 偏移量
+        :return: 查询结果polars DataFrame
+        """
+        columns_str = ", ".join(columns)
+        select_query = f"SELECT {columns_str} FROM {table_name}"
+        if condition:
+            select_query += f" WHERE {condition}"
+        if limit:
+            select_query += f" LIMIT {limit}"
+        if offset:
+            select_query += f" OFFSET {offset}"
+        self.instrumentation.annotate(sql=select_query)
+        try:
+            if self.arrow_engine:
+                return ArrowReader.read_uri(select_query, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(select_query)
+            return ArrowReader.from_cursor(cursor)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
+
+    def select_iter(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                    batch_rows: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        使用服务端命名游标流式查询数据，每次只在内存中保留一批
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param batch_rows: 每批的行数
+        :return: DataFrame迭代器
+        """
+        try:
+            conn = self._acquire()
+            # 命名游标在服务端保存结果集，客户端每次只取itersize行
+            cursor = conn.cursor(name=f"opendbutils_{uuid.uuid4().hex}")
+            cursor.itersize = batch_rows
+            columns_str = ", ".join(columns)
+            select_query = f"SELECT {columns_str} FROM {table_name}"
+            if condition:
+                select_query += f" WHERE {condition}"
+            if limit:
+                select_query += f" LIMIT {limit}"
+            cursor.execute(select_query)
+        except Exception as e:
+            if "conn" in locals():
+                self.pool.release(conn)
+            raise Exception(f"查询数据失败: {str(e)}")
+        try:
+            column_names = None
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if column_names is None:
+                    column_names = [desc[0] for desc in cursor.description]
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=column_names)
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("count_data")
     def count_data(self, table_name: str, condition: str = None) -> int:
         """
         查询数据数量
@@ -176,14 +556,237 @@ class PostgreUtils(DBInterface):
             count_query = f"SELECT COUNT(*) FROM {table_name}"
             if condition:
                 count_query += f" WHERE {condition}"
+            self.instrumentation.annotate(sql=count_query)
             cursor.execute(count_query)
             return cursor.fetchone()[0]
         except Exception as e:
             raise Exception(f"查询数据数量失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    def estimate_count(self, table_name: str) -> int | None:
+        """
+        从pg_class.reltuples读取表的估计行数（由VACUUM/ANALYZE更新），不扫描表
+        :param table_name: 表名，可带schema前缀
+        :return: 估计行数，表从未分析过时返回None
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table_name,))
+            row = cursor.fetchone()
+        except Exception as e:
+            raise Exception(f"查询估计行数失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+        # PostgreSQL 14+ 未分析过的表为-1，更早的版本为0
+        if not row or row[0] is None or row[0] <= 0:
+            return None
+        return int(row[0])
+
+    def primary_key(self, table_name: str) -> List[str]:
+        """
+        查询表的主键列
+        :param table_name: 表名
+        :return: 主键列名列表（按索引顺序），没有主键时为空列表
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT a.attname FROM pg_index i "
+                "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                "WHERE i.indrelid = %s::regclass AND i.indisprimary "
+                "ORDER BY array_position(i.indkey, a.attnum)",
+                (table_name,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            raise Exception(f"查询主键失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def key_bounds(self, table_name: str, column: str, condition: str = None) -> Tuple[Any, Any]:
+        """
+        查询列的最小值和最大值
+        :param table_name: 表名
+        :param column: 列名
+        :param condition: WHERE条件语句
+        :return: (最小值, 最大值)
+        """
+        try:
+            conn, cursor = self._connect()
+            bounds_query = f"SELECT MIN({column}), MAX({column}) FROM {table_name}"
+            if condition:
+                bounds_query += f" WHERE {condition}"
+            cursor.execute(bounds_query)
+            return tuple(cursor.fetchone())
+        except Exception as e:
+            raise Exception(f"查询列范围失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def key_histogram(self, table_name: str, column: str) -> List[Tuple[Any, float]]:
+        """
+        读取pg_stats中的等高直方图
+        :param table_name: 表名，可带schema前缀
+        :param column: 列名
+        :return: [(边界值, 累计比例)]，没有统计信息时为空列表
+        """
+        schema, _, table = table_name.rpartition(".")
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT histogram_bounds::text::text[] FROM pg_stats "
+                "WHERE schemaname = COALESCE(NULLIF(%s, ''), current_schema()) AND tablename = %s AND attname = %s",
+                (schema, table, column)
+            )
+            row = cursor.fetchone()
+            if not row or not row[0] or len(row[0]) < 2:
+                return []
+            bounds = row[0]
+            return [(value, i / (len(bounds) - 1)) for i, value in enumerate(bounds)]
+        except Exception as e:
+            raise Exception(f"查询直方图失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def relation_blocks(self, table_name: str) -> int:
+        """
+        查询表占用的数据块数量，用于按ctid分区
+        :param table_name: 表名
+        :return: 数据块数量
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT pg_relation_size(%s::regclass) / current_setting('block_size')::int",
+                (table_name,)
+            )
+            return int(cursor.fetchone()[0])
+        except Exception as e:
+            raise Exception(f"查询数据块数量失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def binary_column_type(self, pickled: bool = False) -> str:
+        """
+        原生二进制列的DDL类型
+        :param pickled: 是否为pickle列（PostgreSQL通过列注释区分）
+        :return: 类型名
+        """
+        return "BYTEA"
+
+    def mark_pickle_column(self, table_name: str, column: str) -> None:
+        """
+        通过列注释把二进制列标记为pickle列
+        :param table_name: 表名
+        :param column: 列名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"COMMENT ON COLUMN {table_name}.{column} IS '{PICKLE_BINARY_MARKER}'")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"标记pickle列失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
+    def binary_columns(self, table_name: str) -> dict:
+        """
+        从表结构中读取BYTEA列
+        :param table_name: 表名
+        :return: {列名: "bytes" | "pickle"}
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                "SELECT a.attname, col_description(a.attrelid, a.attnum) FROM pg_attribute a "
+                "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped "
+                "AND a.atttypid = 'bytea'::regtype",
+                (table_name,)
+            )
+            return {
+                name: "pickle" if comment == PICKLE_BINARY_MARKER else "bytes"
+                for name, comment in cursor.fetchall()
+            }
+        except Exception as e:
+            raise Exception(f"查询二进制列失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def save_column_codecs(self, table_name: str, column_codecs: dict, replace: bool = False) -> None:
+        """
+        把各列的编码方式写入元数据表
+        :param table_name: 表名
+        :param column_codecs: {列名: 编码方式}
+        :param replace: 为True时先清除该表原有的记录（表被重建时）；否则只把plain升级为具体编码，已有的编码保持不变
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+                "table_name VARCHAR(255) NOT NULL, column_name VARCHAR(255) NOT NULL, codec VARCHAR(32) NOT NULL, "
+                "PRIMARY KEY (table_name, column_name))"
+            )
+            if replace:
+                cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            cursor.executemany(
+                f"INSERT INTO {SCHEMA_TABLE} (table_name, column_name, codec) VALUES (%s, %s, %s) "
+                "ON CONFLICT (table_name, column_name) DO UPDATE SET codec = EXCLUDED.codec "
+                f"WHERE {SCHEMA_TABLE}.codec = '{CODEC_PLAIN}'",
+                [(table_name, column, codec) for column, codec in column_codecs.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"写入列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @staticmethod
+    def _schema_table_exists(cursor) -> bool:
+        """
+        元数据表是否存在；先检查再查询，不依赖UndefinedTable错误
+        （会话中出错的语句会使会话固定的事务进入中止状态，之后的语句都会失败）
+        """
+        cursor.execute("SELECT to_regclass(%s)", (SCHEMA_TABLE,))
+        return cursor.fetchone()[0] is not None
+
+    def load_column_codecs(self, table_name: str) -> dict:
+        """
+        从元数据表读取各列的编码方式
+        :param table_name: 表名
+        :return: {列名: 编码方式}，元数据表或记录不存在时为空字典
+        """
+        try:
+            conn, cursor = self._connect()
+            if not self._schema_table_exists(cursor):
+                return {}
+            cursor.execute(f"SELECT column_name, codec FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            return {column: codec for column, codec in cursor.fetchall()}
+        except Exception as e:
+            raise Exception(f"读取列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def delete_column_codecs(self, table_name: str) -> None:
+        """
+        删除元数据表中该表的记录
+        :param table_name: 表名
+        """
+        try:
+            conn, cursor = self._connect()
+            if not self._schema_table_exists(cursor):
+                return
+            cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = %s", (table_name,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"删除列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("delete_data")
     def delete_data(self, table_name: str, condition: str) -> None:
         """
         删除数据
@@ -193,14 +796,85 @@ class PostgreUtils(DBInterface):
         try:
             conn, cursor = self._connect()
             delete_query = f"DELETE FROM {table_name} WHERE {condition}"
+            self.instrumentation.annotate(sql=delete_query)
             cursor.execute(delete_query)
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise Exception(f"删除数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    def create_staging_table(self, table_name: str, staging_name: str, columns: List[str]) -> None:
+        """
+        创建只在当前连接可见的临时暂存表，列类型与目标表相同（不复制约束），另有带索引的行号列
+        :param table_name: 目标表名
+        :param staging_name: 暂存表名
+        :param columns: 暂存的列
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            cursor.execute(f"CREATE TEMP TABLE {staging_name} AS SELECT {columns_str} FROM {table_name} WITH NO DATA")
+            cursor.execute(f"ALTER TABLE {staging_name} ADD COLUMN {STAGING_ROW_COLUMN} BIGINT")
+            cursor.execute(f"CREATE INDEX {staging_name}_row ON {staging_name} ({STAGING_ROW_COLUMN})")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"创建暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("merge_staging")
+    def merge_staging(self, table_name: str, staging_name: str, columns: List[str], key_columns: List[str],
+                      update_columns: List[str], start: int, stop: int) -> int:
+        """
+        把暂存表中行号在[start, stop)内的行合并进目标表
+        :param table_name: 目标表名，key_columns上需要有主键或唯一索引
+        :param staging_name: 暂存表名
+        :param columns: 合并的列
+        :param key_columns: 冲突判断的键列
+        :param update_columns: 键冲突时更新的列，为空时保留已有行
+        :param start: 起始行号
+        :param stop: 结束行号（不含）
+        :return: 数据库报告的影响行数
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            if update_columns:
+                action = "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+            else:
+                action = "DO NOTHING"
+            merge_query = (
+                f"INSERT INTO {table_name} ({columns_str}) SELECT {columns_str} FROM {staging_name} "
+                f"WHERE {STAGING_ROW_COLUMN} >= {start} AND {STAGING_ROW_COLUMN} < {stop} "
+                f"ON CONFLICT ({', '.join(key_columns)}) {action}"
+            )
+            self.instrumentation.annotate(sql=merge_query)
+            cursor.execute(merge_query)
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"合并数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def drop_staging_table(self, staging_name: str) -> None:
+        """
+        删除临时暂存表
+        :param staging_name: 暂存表名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_name}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"删除暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
     def drop_table(self, table_name: str) -> None:
         """
@@ -216,5 +890,4 @@ class PostgreUtils(DBInterface):
             conn.rollback()
             raise Exception(f"删除表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
@@ -0,0 +1,232 @@
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from .ColumnCodec import (
+    ColumnCodec, BASE64_PREFIX, PICKLE_PREFIX, CODEC_BASE64, CODEC_PICKLE_BINARY
+)
+
+# 非空值少于该行数的列直接在当前进程中解码，传递输入和结果的开销比收益大
+MIN_PROCESS_ROWS = 20000
+
+# 子进程的启动方式：forkserver从单线程的服务进程派生子进程，不会继承调用方已启动的线程和它们持有的锁；不支持时使用spawn
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class ProcessCodec:
+    """
+    在子进程中并行执行base64和pickle解码，绕开GIL
+    进程池在第一次使用时创建（forkserver启动方式，不支持时为spawn），之后一直复用，由close()关闭；
+    编码后的字符串或bytes以Arrow large_binary布局写入共享内存传给子进程，不重新pickle整个DataFrame；
+    解码结果能无损表示为Arrow类型时传回Arrow数组，由Arrow直接构造Python对象，否则传回pickle字节由当前进程还原
+    编码不交给子进程：对象只能在当前进程中pickle，bytes列的base64已是批量操作，传输开销大于编码本身
+    子进程会导入调用方的主模块，脚本中的调用需要放在 if __name__ == "__main__": 之下
+    """
+
+    def __init__(self, processes: int = None, min_rows: int = MIN_PROCESS_ROWS):
+        """
+        :param processes: 子进程数，默认为CPU核数
+        :param min_rows: 使用子进程的最少非空行数
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.min_rows = min_rows
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def worthwhile(self, mask: np.ndarray) -> bool:
+        """列的非空行数是否值得交给子进程处理（只有一个子进程时没有并行收益）"""
+        return self.processes > 1 and int(mask.sum()) >= self.min_rows
+
+    def decode(self, columns: dict) -> dict:
+        """
+        解码多列
+        :param columns: {列名: (值数组, 非空掩码, 编码方式)}，编码方式为 CODEC_BASE64、CODEC_PICKLE_BASE64 或 CODEC_PICKLE_BINARY
+        :return: {列名: 非空位置按顺序解码后的值列表}，可直接交给ColumnCodec._rebuild
+        """
+        import pyarrow as pa
+
+        inputs = {}
+        for col, (values, mask, codec) in columns.items():
+            present = values[mask]
+            if codec == CODEC_PICKLE_BINARY:
+                try:
+                    array = pa.array(present, type=pa.large_binary())
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # memoryview等其他二进制类型
+                    array = pa.array([bytes(value) for value in present], type=pa.large_binary())
+            else:
+                array = pa.array(present, type=pa.large_string())
+            inputs[col] = [
+                (_share_array(array.slice(start, end - start)), codec) for start, end in self._segments(len(array))
+            ]
+        results = self._run(_decode_task, inputs)
+        decoded = {}
+        for col, refs in results.items():
+            values = []
+            for kind, ref in refs:
+                if kind == "arrow":
+                    values.extend(_take_ipc(ref).to_pylist())
+                elif kind == "pickled":
+                    loads = pickle.loads
+                    values.extend(loads(value) for value in _take_binary(ref).to_pylist())
+                else:
+                    values.extend(_take_binary(ref).to_pylist())
+            decoded[col] = values
+        return decoded
+
+    def close(self) -> None:
+        """关闭进程池，之后再使用时重新创建"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _segments(self, rows: int) -> list:
+        """把rows行切成最多processes段 [(起始, 结束)]"""
+        step = max((rows + self.processes - 1) // self.processes, 1)
+        return [(start, min(start + step, rows)) for start in range(0, rows, step)]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """第一次使用时创建进程池，之后复用"""
+        with self._pool_lock:
+            if self._pool is None:
+                # 子进程与当前进程共用同一个resource_tracker，共享内存由一方创建、另一方释放
+                resource_tracker.ensure_running()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context(START_METHOD)
+                )
+            return self._pool
+
+    def _run(self, task, inputs: dict) -> dict:
+        """
+        在进程池中执行各段，按原顺序返回各段结果
+        :param inputs: {列名: [(输入的共享内存引用, 编码方式)]}
+        """
+        pool = self._executor()
+        try:
+            futures = {col: [pool.submit(task, ref, codec) for ref, codec in refs] for col, refs in inputs.items()}
+            return {col: [future.result() for future in col_futures] for col, col_futures in futures.items()}
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，下次使用时重新创建
+            self.close()
+            raise
+
+
+def _decode_task(ref: tuple, codec: str) -> tuple:
+    """
+    子进程: 解码一段非空值
+    :return: ("binary", 引用) bytes结果；("arrow", 引用) 可无损表示为Arrow的对象；("pickled", 引用) 需在当前进程中unpickle
+    """
+    import pyarrow as pa
+
+    if codec == CODEC_PICKLE_BINARY:
+        raw = _take_binary(ref).to_pylist()
+    else:
+        strings = _take_binary(ref, pa.large_string()).to_pylist()
+        if codec == CODEC_BASE64:
+            return "binary", _share_binary(ColumnCodec.b64decode_many(strings, BASE64_PREFIX))
+        raw = ColumnCodec.b64decode_many(strings, PICKLE_PREFIX)
+    loads = pickle.loads
+    array = _exact_arrow([loads(data) for data in raw], raw)
+    if array is None:
+        return "pickled", _share_binary(raw)
+    return "arrow", _share_ipc(array)
+
+
+def _exact_arrow(objects: list, raw: list):
+    """
+    把还原的对象转为Arrow数组；只有每个值从Arrow转回Python后重新pickle与原始pickle字节完全一致时才使用，
+    保证tuple/list、int/float、dict的键等不会因为Arrow类型推断而改变
+    """
+    import pyarrow as pa
+
+    try:
+        array = pa.array(objects)
+    except Exception:
+        return None
+    dumps = pickle.dumps
+    for value, data in zip(array.to_pylist(), raw):
+        if dumps(value) != data:
+            return None
+    return array
+
+
+def _share_binary(values: list) -> tuple:
+    """
+    把bytes列表按Arrow large_binary布局写入共享内存: [int64偏移量][数据]
+    :return: (共享内存名, 行数, 数据字节数)
+    """
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in values], out=offsets[1:])
+    data = b"".join(values)
+    return _share([offsets.tobytes(), data]), len(values), len(data)
+
+
+def _share_array(array) -> tuple:
+    """把不含空值的large_binary/large_string数组（可以是切片）写入共享内存，布局与_share_binary相同"""
+    _, offsets_buffer, data_buffer = array.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int64, count=len(array) + 1, offset=8 * array.offset)
+    start, end = int(offsets[0]), int(offsets[-1])
+    data = memoryview(data_buffer).cast("B")[start:end] if data_buffer is not None else b""
+    return _share([(offsets - start).tobytes(), data]), len(array), end - start
+
+
+def _share_ipc(array) -> tuple:
+    """把Arrow数组以IPC流格式写入共享内存"""
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    batch = pa.record_batch([array], names=["values"])
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    payload = sink.getvalue().to_pybytes()
+    return _share([payload]), len(payload)
+
+
+def _share(parts: list) -> str:
+    """创建共享内存并依次写入各段字节，返回共享内存名（由读取方负责释放）"""
+    size = sum(len(part) for part in parts)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        position = 0
+        for part in parts:
+            shm.buf[position:position + len(part)] = part
+            position += len(part)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name
+
+
+def _read_shared(name: str, size: int) -> bytes:
+    """读出共享内存中的字节并释放该共享内存"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _take_binary(ref: tuple, type=None):
+    """从共享内存重建large_binary数组（type为pa.large_string()时按字符串读取，两者布局相同）"""
+    import pyarrow as pa
+
+    name, rows, data_size = ref
+    offsets_size = 8 * (rows + 1)
+    buffer = pa.py_buffer(_read_shared(name, offsets_size + data_size))
+    return pa.Array.from_buffers(type or pa.large_binary(), rows, [None, buffer[:offsets_size], buffer[offsets_size:]])
+
+
+def _take_ipc(ref: tuple):
+    """从共享内存读取IPC格式的Arrow数组"""
+    import pyarrow as pa
+
+    name, size = ref
+    reader = pa.ipc.open_stream(pa.py_buffer(_read_shared(name, size)))
+    return reader.read_all().column(0).combine_chunks()
@@ -0,0 +1,299 @@
+from typing import Any, Iterable, List, Tuple
+
+# db_instance -> (标识符引号, 参数占位符)
+_DIALECTS = {
+    "postgresql": ('"', "%s"),
+    "mysql": ("`", "%s"),
+    "sqlite": ('"', "?"),
+}
+
+
+class _Compiler:
+    """把表达式编译为某种数据库的SQL：标识符加引号，取值作为参数传递"""
+
+    def __init__(self, db_instance: str):
+        if db_instance not in _DIALECTS:
+            raise ValueError(f"Unsupported database instance: {db_instance}")
+        self.quote, self.placeholder = _DIALECTS[db_instance]
+        self.params = []
+
+    def identifier(self, name: str) -> str:
+        return self.quote + name.replace(self.quote, self.quote * 2) + self.quote
+
+    def param(self, value: Any) -> str:
+        # 驱动不能直接适配numpy标量
+        if type(value).__module__ == "numpy":
+            value = value.item()
+        self.params.append(value)
+        return self.placeholder
+
+    def raw(self, text: str) -> str:
+        """原样插入的SQL片段；使用%s占位符的驱动需要把%转义为%%"""
+        return text.replace("%", "%%") if self.placeholder == "%s" else text
+
+    def finish(self, sql: str) -> Tuple[str, list | None]:
+        """没有参数时驱动不做占位符替换，撤销%的转义"""
+        if not self.params:
+            return (sql.replace("%%", "%") if self.placeholder == "%s" else sql), None
+        return sql, self.params
+
+
+class Expr:
+    """
+    列表达式，用于TableQuery.select/filter/sort：col("age") > 30、(col("kind") == "a") | col("id").isin([1, 2])
+    比较的取值编译为参数，不拼接进SQL
+    """
+
+    def compile(self, compiler: _Compiler) -> str:
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        if other is None:
+            return self.is_null()
+        return _Binary("=", self, other)
+
+    def __ne__(self, other):
+        if other is None:
+            return self.is_not_null()
+        return _Binary("<>", self, other)
+
+    def __lt__(self, other):
+        return _Binary("<", self, other)
+
+    def __le__(self, other):
+        return _Binary("<=", self, other)
+
+    def __gt__(self, other):
+        return _Binary(">", self, other)
+
+    def __ge__(self, other):
+        return _Binary(">=", self, other)
+
+    def __and__(self, other):
+        return _Binary("AND", self, _as_predicate(other))
+
+    def __or__(self, other):
+        return _Binary("OR", self, _as_predicate(other))
+
+    def __invert__(self):
+        return _Not(self)
+
+    def __bool__(self):
+        raise TypeError("表达式不能作为bool使用，组合条件请用 & | ~ 并给每个比较加括号")
+
+    __hash__ = object.__hash__
+
+    def isin(self, values: Iterable[Any]) -> "Expr":
+        return _In(self, list(values))
+
+    def is_null(self) -> "Expr":
+        return _Postfix(self, "IS NULL")
+
+    def is_not_null(self) -> "Expr":
+        return _Postfix(self, "IS NOT NULL")
+
+    def like(self, pattern: str) -> "Expr":
+        return _Binary("LIKE", self, pattern)
+
+    def between(self, low: Any, high: Any) -> "Expr":
+        return (self >= low) & (self <= high)
+
+    def alias(self, name: str) -> "Expr":
+        return _Alias(self, name)
+
+
+def _operand(value: Any, compiler: _Compiler) -> str:
+    return value.compile(compiler) if isinstance(value, Expr) else compiler.param(value)
+
+
+class Col(Expr):
+    def __init__(self, name: str):
+        self.name = name
+
+    def compile(self, compiler: _Compiler) -> str:
+        return compiler.identifier(self.name)
+
+
+class Sql(Expr):
+    """原样插入的SQL片段（与query_df的condition相同），用于内置表达式不支持的函数和运算"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def compile(self, compiler: _Compiler) -> str:
+        return f"({compiler.raw(self.text)})"
+
+
+class _Binary(Expr):
+    def __init__(self, op: str, left: Any, right: Any):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def compile(self, compiler: _Compiler) -> str:
+        return f"({_operand(self.left, compiler)} {self.op} {_operand(self.right, compiler)})"
+
+
+class _Not(Expr):
+    def __init__(self, operand: Expr):
+        self.operand = operand
+
+    def compile(self, compiler: _Compiler) -> str:
+        return f"(NOT {self.operand.compile(compiler)})"
+
+
+class _Postfix(Expr):
+    def __init__(self, operand: Expr, op: str):
+        self.operand = operand
+        self.op = op
+
+    def compile(self, compiler: _Compiler) -> str:
+        return f"({self.operand.compile(compiler)} {self.op})"
+
+
+class _In(Expr):
+    def __init__(self, operand: Expr, values: list):
+        self.operand = operand
+        self.values = values
+
+    def compile(self, compiler: _Compiler) -> str:
+        if not self.values:
+            return "(1 = 0)"
+        placeholders = ", ".join(_operand(value, compiler) for value in self.values)
+        return f"({self.operand.compile(compiler)} IN ({placeholders}))"
+
+
+class _Alias(Expr):
+    def __init__(self, operand: Expr, name: str):
+        self.operand = operand
+        self.name = name
+
+    def compile(self, compiler: _Compiler) -> str:
+        return f"{self.operand.compile(compiler)} AS {compiler.identifier(self.name)}"
+
+
+def col(name: str) -> Col:
+    """引用列，见Expr"""
+    return Col(name)
+
+
+def _as_expr(value: str | Expr) -> Expr:
+    return value if isinstance(value, Expr) else Col(value)
+
+
+def _as_predicate(value: str | Expr) -> Expr:
+    # 字符串条件按原样作为SQL片段，与query_df的condition一致
+    return value if isinstance(value, Expr) else Sql(value)
+
+
+class TableQuery:
+    """
+    惰性的单表查询，通过 DBUtils.table() 创建；每个方法返回新的查询对象，collect()时才执行
+    投影、过滤、排序和LIMIT都编译进各数据库的参数化SQL在服务器上执行；
+    只有投影和过滤时按键范围拆分为多个并行读取的分区（见collect），排序或LIMIT时一次查询
+
+        db.table("events").select("id", "kind").filter(col("ts") >= start, kind="click").sort("ts", descending=True).limit(100).collect()
+    """
+
+    def __init__(self, db_utils, table_name: str, columns: Tuple[Expr, ...] = (), predicates: Tuple[Expr, ...] = (),
+                 order: Tuple[Tuple[Expr, bool], ...] = (), limit: int = None):
+        self.db_utils = db_utils
+        self.table_name = table_name
+        self._columns = columns
+        self._predicates = predicates
+        self._order = order
+        self._limit = limit
+
+    def _replace(self, **changes) -> "TableQuery":
+        state = {
+            "columns": self._columns, "predicates": self._predicates, "order": self._order, "limit": self._limit
+        }
+        state.update(changes)
+        return TableQuery(self.db_utils, self.table_name, **state)
+
+    def select(self, *columns: str | Expr) -> "TableQuery":
+        """
+        选择列，替换之前的选择；不调用时为全部列
+        :param columns: 列名或表达式（可用alias重命名）
+        """
+        return self._replace(columns=tuple(_as_expr(column) for column in columns))
+
+    def filter(self, *predicates: str | Expr, **equals: Any) -> "TableQuery":
+        """
+        追加过滤条件，多次调用和多个条件之间为AND
+        :param predicates: 表达式，或原样插入的SQL条件字符串
+        :param equals: 列名=取值 的相等条件，取值为None时为IS NULL
+        """
+        added = tuple(_as_predicate(predicate) for predicate in predicates)
+        added += tuple(Col(name) == value for name, value in equals.items())
+        return self._replace(predicates=self._predicates + added)
+
+    def sort(self, *by: str | Expr, descending: bool | List[bool] = False) -> "TableQuery":
+        """
+        排序，替换之前的排序
+        :param by: 列名或表达式
+        :param descending: 是否降序，可为每一列分别指定
+        """
+        if isinstance(descending, bool):
+            descending = [descending] * len(by)
+        if len(descending) != len(by):
+            raise ValueError("descending的数量与排序列的数量不一致")
+        return self._replace(order=tuple((_as_expr(column), desc) for column, desc in zip(by, descending)))
+
+    def limit(self, n: int) -> "TableQuery":
+        """限制结果行数"""
+        if not isinstance(n, int) or n < 0:
+            raise ValueError(f"limit必须是非负整数: {n}")
+        return self._replace(limit=n)
+
+    @property
+    def is_scan(self) -> bool:
+        """只有投影和过滤（没有排序和LIMIT），结果可以按键范围拆分读取"""
+        return not self._order and self._limit is None
+
+    def compile(self, extra_predicates: List[str] = ()) -> Tuple[str, list | None]:
+        """
+        编译为当前数据库的SQL
+        :param extra_predicates: 追加的原样SQL条件（并行读取时的分区范围谓词）
+        :return: (sql, 参数列表)，没有参数时为None
+        """
+        compiler = _Compiler(self.db_utils.db_instance)
+        columns = ", ".join(column.compile(compiler) for column in self._columns) or "*"
+        sql = f"SELECT {columns} FROM {compiler.raw(self.table_name)}"
+        sql += self._where(compiler, extra_predicates)
+        if self._order:
+            sql += " ORDER BY " + ", ".join(
+                f"{column.compile(compiler)}{' DESC' if desc else ''}" for column, desc in self._order
+            )
+        if self._limit is not None:
+            sql += f" LIMIT {self._limit}"
+        return compiler.finish(sql)
+
+    def _where(self, compiler: _Compiler, extra_predicates: List[str] = ()) -> str:
+        conditions = [predicate.compile(compiler) for predicate in self._predicates]
+        conditions += [Sql(predicate).compile(compiler) for predicate in extra_predicates]
+        return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def count(self) -> int:
+        """满足过滤条件的行数（忽略排序和LIMIT）"""
+        compiler = _Compiler(self.db_utils.db_instance)
+        sql, params = compiler.finish(f"SELECT COUNT(*) FROM {compiler.raw(self.table_name)}{self._where(compiler)}")
+        return int(self.db_utils.db.select_sql(sql, params).iloc[0, 0])
+
+    def collect(self, backend: str = "pandas", chunk_size: int = 100000, max_workers: int | str = 8,
+                cache: bool = True):
+        """
+        执行查询
+        :param backend: 返回类型，"pandas"、"polars"或"arrow"，见DBUtils.query_df
+        :param chunk_size: 没有排序和LIMIT时，估计行数超过该值才按键范围（主键、SQLite的rowid、PostgreSQL的ctid）
+            拆分为并行读取的分区，每个分区约chunk_size行；没有估计行数（见estimate_count）、表没有可用的键
+            或键无法按范围拆分时一次查询
+        :param max_workers: 并行读取的线程数，见DBUtils.query_df
+        :param cache: 启用了结果缓存时是否使用缓存
+        :return: 查询结果
+        """
+        return self.db_utils._collect_query(self, backend, chunk_size, max_workers, cache)
+
+    def __repr__(self) -> str:
+        sql, params = self.compile()
+        return f"TableQuery({sql!r}, params={params!r})"
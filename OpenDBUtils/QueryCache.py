@@ -0,0 +1,181 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+import pandas as pd
+import polars as pl
+
+# 缓存的对象列中不需要深拷贝的单元格类型
+_IMMUTABLE = (str, bytes, int, float, bool, type(None))
+# 只读语句不会使缓存失效
+_READ_ONLY_SQL = re.compile(r"^\s*(select|show|explain|describe|desc|pragma\s+\w+\s*$)\b", re.IGNORECASE)
+# 写入语句中被修改的表名
+_WRITTEN_TABLES = re.compile(
+    r"\b(?:insert\s+(?:ignore\s+)?into|replace\s+into|update|delete\s+from|truncate(?:\s+table)?|"
+    r"drop\s+table(?:\s+if\s+exists)?|alter\s+table|create\s+table(?:\s+if\s+not\s+exists)?|copy)\s+([`\"\w.]+)",
+    re.IGNORECASE
+)
+
+
+class QueryCache:
+    """
+    query_df的结果缓存：按字节数限制容量的LRU，每个条目有TTL，可按表失效
+    每个表有一个版本号，查询开始时记下版本号，写入缓存时版本号已变化（期间有写入）则不缓存，避免缓存过期结果
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 60.0):
+        """
+        :param max_bytes: 缓存结果的总字节数上限
+        :param ttl: 条目的有效秒数，None表示只按容量和写入失效
+        """
+        if max_bytes <= 0:
+            raise ValueError("缓存容量必须大于0")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # 键 -> (表名, 结果, 字节数, 过期时间)，按最近使用排序
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # 全部失效时增加的全局版本号，以及各表的版本号
+        self._epoch = 0
+        self._generations = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "rejected": 0,
+        }
+
+    @staticmethod
+    def table_key(table_name: str) -> str:
+        """规范化表名：去掉引号并转为小写"""
+        return table_name.strip().strip('`"').replace('"', "").replace("`", "").lower()
+
+    @staticmethod
+    def written_tables(sql: str) -> list | None:
+        """
+        分析SQL语句修改了哪些表
+        :return: 只读语句返回空列表；能识别的写入语句返回表名列表；无法识别时返回None（调用方应清空全部缓存）
+        """
+        if _READ_ONLY_SQL.match(sql):
+            return []
+        tables = [QueryCache.table_key(name) for name in _WRITTEN_TABLES.findall(sql)]
+        return tables or None
+
+    def generation(self, table_name: str) -> tuple:
+        """表的当前版本号"""
+        with self._lock:
+            return self._generation_locked(self.table_key(table_name))
+
+    def _generation_locked(self, table: str) -> tuple:
+        return self._epoch, self._generations.get(table, 0), self._generations.get(table.rsplit(".", 1)[-1], 0)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        查询缓存
+        :return: (是否命中, 结果)；pandas结果返回副本，对象列中的dict、list等可变单元格也逐个深拷贝，
+            调用方修改不会影响缓存
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[3] <= time.monotonic():
+                self._remove_locked(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            value = entry[1]
+        return True, self._copy_frame(value) if isinstance(value, pd.DataFrame) else value
+
+    def put(self, key: Hashable, table_name: str, value: Any, generation: tuple) -> None:
+        """
+        写入缓存；超过容量时淘汰最久未使用的条目
+        :param generation: 查询开始时的表版本号
+        """
+        size = self.size_of(value)
+        stored = self._copy_frame(value) if isinstance(value, pd.DataFrame) else value
+        table = self.table_key(table_name)
+        with self._lock:
+            if size > self.max_bytes or self._generation_locked(table) != generation:
+                self._stats["rejected"] += 1
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (table, stored, size, expires)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, table_name: str = None) -> int:
+        """
+        使某个表（None表示全部表）的缓存失效，并增加其版本号
+        :return: 移除的条目数
+        """
+        with self._lock:
+            if table_name is None:
+                removed = list(self._entries)
+                self._epoch += 1
+            else:
+                table = self.table_key(table_name)
+                short = table.rsplit(".", 1)[-1]
+                # "schema.table" 与 "table" 视为同一个表
+                removed = [key for key, entry in self._entries.items() if entry[0].rsplit(".", 1)[-1] == short]
+                for name in {table, short}:
+                    self._generations[name] = self._generations.get(name, 0) + 1
+            for key in removed:
+                self._remove_locked(key)
+            self._stats["invalidations"] += len(removed)
+            return len(removed)
+
+    def clear(self) -> None:
+        """清空缓存，移除的条目计入失效次数（invalidations），其余统计计数不变"""
+        self.invalidate()
+
+    def stats(self) -> dict:
+        """
+        缓存统计信息
+        :return: 命中、未命中、淘汰、过期、失效次数以及当前条目数和字节数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def _copy_frame(data: pd.DataFrame) -> pd.DataFrame:
+        """pandas结果的副本：DataFrame.copy()对对象列只复制引用，其中的可变单元格需要深拷贝"""
+        data = data.copy()
+        for i, dtype in enumerate(data.dtypes):
+            if dtype != object:
+                continue
+            column = data.iloc[:, i]
+            if any(not isinstance(value, _IMMUTABLE) for value in column):
+                data.isetitem(i, column.map(copy.deepcopy))
+        return data
+
+    def _remove_locked(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    @staticmethod
+    def size_of(value: Any) -> int:
+        """估算结果占用的字节数"""
+        if value is None:
+            return 0
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        if isinstance(value, pl.DataFrame):
+            return int(value.estimated_size())
+        return int(getattr(value, "nbytes", 0))
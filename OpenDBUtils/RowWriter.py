@@ -0,0 +1,148 @@
+import threading
+import time
+from typing import Any, Iterable, List
+
+
+class RowWriter:
+    """
+    缓冲写入器：逐行积累数据，行数达到max_rows或最早的行等待超过max_delay秒时通过insert_rows批量写入
+    适合持续少量到达的数据（例如事件流），把每行一次连接和提交变为每批一次
+    按时间刷新由后台线程完成，其写入失败时异常在下一次write/flush/close时抛出，失败的行保留在缓冲区中等待重试
+    """
+
+    def __init__(
+            self,
+            db_utils,
+            table_name: str,
+            columns: List[str],
+            max_rows: int = 10000,
+            max_delay: float = 1.0,
+            batch_size: int = 1000
+    ):
+        """
+        :param db_utils: DBUtils实例
+        :param table_name: 表名
+        :param columns: 列名列表，写入的每行按该顺序给出值
+        :param max_rows: 缓冲的行数达到该值时立即写入
+        :param max_delay: 最早缓冲的行最多等待的秒数，None表示只按行数和显式flush写入
+        :param batch_size: 每条INSERT语句的行数，见insert_rows
+        """
+        if max_rows < 1:
+            raise ValueError("max_rows必须大于0")
+        self.db_utils = db_utils
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self._cond = threading.Condition(threading.Lock())
+        # 保证各批按缓冲顺序写入
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._first_time = None
+        self._error = None
+        self._closed = False
+        self._stats = {"rows": 0, "flushes": 0, "failures": 0}
+        self._thread = None
+        if max_delay is not None:
+            self._thread = threading.Thread(target=self._run, name="opendbutils-row-writer", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, row: Iterable[Any]) -> None:
+        """
+        缓冲一行
+        :param row: 按columns顺序排列的值
+        """
+        self.write_many([row])
+
+    def write_many(self, rows: Iterable[Iterable[Any]]) -> None:
+        """
+        缓冲多行，达到max_rows时在当前线程中写入
+        :param rows: 行数据
+        """
+        self._raise_error()
+        rows = [tuple(row) for row in rows]
+        with self._cond:
+            if self._closed:
+                raise Exception("写入器已关闭")
+            if not self._buffer and rows:
+                self._first_time = time.monotonic()
+                self._cond.notify()
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.max_rows
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        立即写入缓冲区中的全部行
+        :return: 写入的行数
+        """
+        with self._flush_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+                self._first_time = None
+            if not rows:
+                return 0
+            try:
+                self.db_utils.insert_rows(self.table_name, self.columns, rows, batch_size=self.batch_size)
+            except Exception:
+                with self._cond:
+                    # 失败的行放回缓冲区开头，下次写入时重试
+                    self._buffer[:0] = rows
+                    self._first_time = time.monotonic()
+                    self._stats["failures"] += 1
+                raise
+            with self._cond:
+                self._error = None
+                self._stats["rows"] += len(rows)
+                self._stats["flushes"] += 1
+            return len(rows)
+
+    def close(self) -> None:
+        """停止后台线程并写入剩余的行"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """统计信息：已写入行数、写入批次、失败次数和当前缓冲的行数"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer)
+        return stats
+
+    def _raise_error(self) -> None:
+        with self._cond:
+            error, self._error = self._error, None
+        if error is not None:
+            raise Exception(f"后台写入失败: {str(error)}")
+
+    def _run(self) -> None:
+        """后台线程：等待最早缓冲的行到期后写入"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._first_time is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._first_time + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                with self._cond:
+                    self._error = e
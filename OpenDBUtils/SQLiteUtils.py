@@ -1,14 +1,41 @@
 import sqlite3
 import io
-from typing import List, Tuple, Any
+import os
+import threading
+import time
+from typing import List, Tuple, Any, Iterator, Iterable
 import pandas as pd
 import polars as pl
-from .DBInterface import DBInterface
-from sqlalchemy import create_engine
+from .DBInterface import DBInterface, STAGING_ROW_COLUMN
+from .Instrumentation import instrumented
+from .ConnectionPool import ConnectionPool
+from .ArrowReader import ArrowReader
+from .ColumnCodec import SCHEMA_TABLE, CODEC_PLAIN
 
+# PRAGMA配置方案: bulk_load 用于专用写连接的批量导入，read_heavy 用于以读为主的服务场景
+# WAL模式下 synchronous=NORMAL 只在检查点时同步磁盘，断电不会损坏数据库，只可能丢失最近提交的事务
+PRAGMA_PROFILES = {
+    "default": {},
+    "bulk_load": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,
+        "temp_store": "MEMORY",
+    },
+    "read_heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
 
 class SQLiteUtils(DBInterface):
-    def __init__(self, dbname: str, user: str = None, password: str = None, host: str = None, port: str = None):
+    def __init__(self, dbname: str, user: str = None, password: str = None, host: str = None, port: str = None,
+                 pool_min_size: int = 1, pool_max_size: int = 8, pool_timeout: float = 30.0,
+                 pool_idle_timeout: float = 300.0, pool_ping_interval: float = 30.0,
+                 pragma_profile: str | dict = "default", writer_profile: str | dict = "bulk_load"):
         """
         初始化SQLite数据库连接参数
         :param dbname: 数据库文件路径
@@ -16,28 +43,129 @@ class SQLiteUtils(DBInterface):
         :param password: 不适用于SQLite (保留参数以符合接口)
         :param host: 不适用于SQLite (保留参数以符合接口)
         :param port: 不适用于SQLite (保留参数以符合接口)
+        :param pool_min_size: 连接池空闲回收时至少保留的连接数
+        :param pool_max_size: 连接池最大连接数
+        :param pool_timeout: 等待可用连接的最长秒数
+        :param pool_idle_timeout: 空闲连接的回收秒数
+        :param pool_ping_interval: 空闲超过该秒数的连接在借出前做健康检查
+        :param pragma_profile: 连接池连接使用的PRAGMA配置，PRAGMA_PROFILES中的名称或 {pragma: 值} 字典
+        :param writer_profile: 专用写连接使用的PRAGMA配置
         """
         super().__init__(dbname, user, password, host, port)
+        self.pragmas = self._resolve_profile(pragma_profile)
+        self.writer_pragmas = self._resolve_profile(writer_profile)
+        # SQLite同一时间只允许一个写入者，批量写入统一经过这一个连接
+        self._writer_conn = None
+        # 可重入：会话持有写锁期间，同一线程中的写入（write_chunks）再次获取
+        self._writer_lock = threading.RLock()
         self.dbname = dbname
         # SQLite不需要用户名、密码、主机和端口，但为了保持接口一致性，保留这些参数
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.pool = ConnectionPool(
+            self._new_connection,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            idle_timeout=pool_idle_timeout,
+            ping_interval=pool_ping_interval
+        )
+        # SQLAlchemy引擎在首次使用时创建，见DBInterface.engine
+        self._engine_url = f"sqlite:///{self.dbname}"
+        # Arrow原生读取引擎："adbc"、"connectorx"，都未安装时为None
+        self.arrow_engine = ArrowReader.engine("adbc_driver_sqlite")
 
-    def _connect(self):
-        """建立数据库连接"""
-        try:
-            conn = sqlite3.connect(self.dbname)
-            # 启用外键约束
+    def _new_connection(self):
+        """建立新的物理数据库连接"""
+        # 连接由连接池保证同一时间只被一个线程使用，因此允许跨线程借用
+        conn = sqlite3.connect(self.dbname, check_same_thread=False)
+        # 启用外键约束
+        conn.execute("PRAGMA foreign_keys = ON")
+        # 设置行工厂以返回字典
+        conn.row_factory = sqlite3.Row
+        self._apply_pragmas(conn, self.pragmas)
+        return conn
+
+    @staticmethod
+    def _resolve_profile(profile: str | dict) -> dict:
+        """把PRAGMA配置名称解析为 {pragma: 值} 字典"""
+        if isinstance(profile, dict):
+            return dict(profile)
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"未知的PRAGMA配置: {profile}")
+        return PRAGMA_PROFILES[profile]
+
+    @staticmethod
+    def _apply_pragmas(conn, pragmas: dict) -> None:
+        """在连接上依次执行PRAGMA设置"""
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}").fetchall()
+
+    def _writer(self):
+        """取得专用写连接（需持有_writer_lock），第一次使用时建立"""
+        if self._writer_conn is None:
+            conn = sqlite3.connect(self.dbname, check_same_thread=False)
             conn.execute("PRAGMA foreign_keys = ON")
-            # 设置行工厂以返回字典
+            # 与连接池连接一致，会话中按列名读取结果的方法（binary_columns等）也使用该连接
             conn.row_factory = sqlite3.Row
+            self._apply_pragmas(conn, self.writer_pragmas)
+            self._writer_conn = conn
+        return self._writer_conn
+
+    def open_session(self):
+        """SQLite的会话使用专用写连接并持有写锁，会话期间其他线程的写入排队等待"""
+        if self._session_connection() is not None:
+            raise ValueError("当前线程已有进行中的会话")
+        self._writer_lock.acquire()
+        try:
+            conn = self._writer()
+            conn.execute("BEGIN IMMEDIATE")
+            return self._pin_session(conn)
+        except Exception:
+            self._writer_lock.release()
+            raise
+
+    def close_session(self, commit: bool) -> None:
+        """结束会话：提交或回滚并释放写锁"""
+        conn = self._require_session()
+        try:
+            self._end_session(conn, commit)
+        finally:
+            self._writer_lock.release()
+
+    def _connect(self):
+        """从连接池借用数据库连接；当前线程有进行中的会话时使用会话固定的连接"""
+        try:
+            conn = self._session_connection() or self._acquire()
             cursor = conn.cursor()
             return conn, cursor
         except Exception as e:
             raise Exception(f"数据库连接失败: {str(e)}")
 
+    def _release(self, conn, cursor):
+        """关闭游标并将连接归还连接池"""
+        cursor.close()
+        self._return_connection(conn)
+
+    def close(self) -> None:
+        """关闭连接池中的所有连接"""
+        self._dispose_engine()
+        self.pool.close()
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+
+    def _arrow_uri(self) -> str:
+        """ADBC/connectorx使用的连接URI（polars为ADBC去掉 "sqlite:///" 前缀，因此绝对路径需要多一个斜杠）"""
+        path = os.path.abspath(self.dbname)
+        if self.arrow_engine == "adbc":
+            return f"sqlite:///{path}"
+        return f"sqlite://{path}"
+
+    @instrumented("execute")
     def execute(self, sql: str) -> any:
         """
         执行任意SQL语句
@@ -46,6 +174,7 @@ class SQLiteUtils(DBInterface):
         """
         try:
             conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
             cursor.execute(sql)
             conn.commit()
             return cursor.fetchall()
@@ -53,8 +182,7 @@ class SQLiteUtils(DBInterface):
             conn.rollback()
             raise Exception(f"执行SQL语句失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def create_table(self, table_name: str, columns: List[str]) -> None:
         """
@@ -72,8 +200,7 @@ class SQLiteUtils(DBInterface):
             conn.rollback()
             raise Exception(f"创建表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
     def insert_data(self, table_name: str, columns: List[str], values: List[Any]) -> None:
         """
@@ -93,22 +220,126 @@ class SQLiteUtils(DBInterface):
             conn.rollback()
             raise Exception(f"插入数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    @instrumented("insert_rows")
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
+        """
+        经由专用写连接在一个事务中批量插入多行，每批执行一次executemany（sqlite3按SQL文本缓存预处理语句）
+        :param table_name: 表名
+        :param columns: 列名列表
+        :param rows: 行数据（元组列表）
+        :param batch_size: 每次executemany的行数
+        :return: 插入的行数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size必须大于0")
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return 0
+        batches = (rows[start:start + batch_size] for start in range(0, len(rows), batch_size))
+        return self.write_chunks(table_name, columns, batches)["rows"]
 
-    def insert_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str):
+    @instrumented("insert_df")
+    def insert_df(self, data: pd.DataFrame | pl.DataFrame, table_name: str) -> dict:
         """
-        插入DataFrame数据
+        插入DataFrame数据，经由专用写连接写入，多个线程同时调用时排队而不是争抢数据库锁
         :param data: 数据框
         :param table_name: 表名
+        :return: 写入统计信息，见write_chunks
         """
-        try:
-            if isinstance(data, pl.DataFrame):
-                data = data.to_pandas()
-            engine = create_engine(f"sqlite:///{self.dbname}")
-            data.to_sql(table_name, engine, if_exists='append', index=False)
-        except Exception as e:
-            raise Exception(f"插入DataFrame数据失败: {str(e)}")
+        if isinstance(data, pd.DataFrame):
+            data = pl.from_pandas(data)
+        return self.write_chunks(table_name, data.columns, [self.prepare_rows(data)], schema=data.schema)
+
+    @instrumented("write_chunks")
+    def write_chunks(self, table_name: str, columns: List[str], chunks: Iterable[List[tuple]],
+                     schema: dict = None) -> dict:
+        """
+        在专用写连接上用一个事务依次写入多批数据，每批执行一次executemany
+        :param table_name: 表名
+        :param columns: 列名列表
+        :param chunks: 每批行数据（元组列表）的可迭代对象，可以是边准备边产出的生成器
+        :param schema: 数据的polars结构 {列名: 类型}；提供时表不存在则先在同一个事务中按其建表
+        :return: 写入统计信息 {"rows", "batches", "seconds", "rows_per_sec"}
+        """
+        start = time.perf_counter()
+        columns_str = ", ".join(columns)
+        placeholders = ", ".join(["?"] * len(columns))
+        insert_query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+        self.instrumentation.annotate(sql=insert_query)
+        rows = 0
+        batches = 0
+        with self._writer_lock:
+            try:
+                # 会话中使用会话固定的写连接，在会话的事务中写入，由会话提交
+                conn = self._session_connection() or self._writer()
+                cursor = conn.cursor()
+                if not conn.in_transaction:
+                    # 一开始就取得写锁，避免事务中途升级锁失败
+                    cursor.execute("BEGIN IMMEDIATE")
+                if schema is not None:
+                    cursor.execute(self._create_table_sql(table_name, schema))
+                for chunk in chunks:
+                    cursor.executemany(insert_query, chunk)
+                    rows += len(chunk)
+                    batches += 1
+                conn.commit()
+            except Exception as e:
+                if "cursor" in locals():
+                    conn.rollback()
+                raise Exception(f"插入DataFrame数据失败: {str(e)}")
+            finally:
+                if "cursor" in locals():
+                    cursor.close()
+        seconds = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "batches": batches,
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else float("inf"),
+        }
+
+    @staticmethod
+    def _create_table_sql(table_name: str, schema: dict) -> str:
+        """按polars结构生成 CREATE TABLE IF NOT EXISTS，列类型与pandas to_sql在SQLite上建表时一致"""
+        columns = []
+        for name, dtype in schema.items():
+            if dtype == pl.Boolean or dtype.is_integer():
+                sql_type = "INTEGER"
+            elif dtype.is_float():
+                sql_type = "REAL"
+            elif dtype == pl.Binary:
+                sql_type = "BLOB"
+            elif dtype == pl.Date:
+                sql_type = "DATE"
+            elif isinstance(dtype, pl.Datetime):
+                sql_type = "TIMESTAMP"
+            elif dtype == pl.Time:
+                sql_type = "TIME"
+            else:
+                sql_type = "TEXT"
+            columns.append('"' + name.replace('"', '""') + '" ' + sql_type)
+        return f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})"
+
+    @staticmethod
+    def prepare_rows(data: pl.DataFrame) -> List[tuple]:
+        """
+        把数据框转换为executemany使用的行元组；日期时间按SQLAlchemy的SQLite存储格式转为文本
+        :param data: 数据框
+        :return: 行元组列表
+        """
+        converted = []
+        for name, dtype in data.schema.items():
+            if isinstance(dtype, pl.Datetime):
+                converted.append(pl.col(name).dt.to_string("%Y-%m-%d %H:%M:%S%.6f"))
+            elif dtype == pl.Date:
+                converted.append(pl.col(name).dt.to_string("%Y-%m-%d"))
+            elif dtype == pl.Time:
+                converted.append(pl.col(name).dt.to_string("%H:%M:%S%.6f"))
+        if converted:
+            data = data.with_columns(converted)
+        return data.rows()
 
     def select_data(self, table_name: str, columns: List[str] = ["*"], condition: str = None, 
                    limit: int = None, offset: int = None) -> List[Tuple]:
@@ -137,9 +368,9 @@ class SQLiteUtils(DBInterface):
         except Exception as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
+    @instrumented("select_df")
     def select_df(self, table_name: str, columns: List[str] = ["*"], condition: str = None, 
                  limit: int = None, offset: int = None) -> pd.DataFrame:
         """
@@ -163,13 +394,121 @@ class SQLiteUtils(DBInterface):
                 select_query += f" OFFSET {offset}"
             
             # 使用pandas的read_sql_query直接读取为DataFrame
+            self.instrumentation.annotate(sql=select_query)
             return pd.read_sql_query(select_query, conn)
         except Exception as e:
             raise Exception(f"查询数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    @instrumented("select_sql")
+    def select_sql(self, sql: str, params: list = None) -> pd.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并转换为DataFrame
+        :param sql: SQL查询语句
+        :param params: 占位符（?）对应的参数
+        :return: 查询结果DataFrame
+        """
+        try:
+            conn, cursor = self._connect()
+            self.instrumentation.annotate(sql=sql)
+            return pd.read_sql_query(sql, conn, params=params)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
+    @instrumented("select_sql")
+    def select_sql_pl(self, sql: str, params: list = None) -> pl.DataFrame:
+        """
+        在服务器上执行完整的SELECT语句并直接读为polars DataFrame，不经过pandas
+        没有参数时与select_pl相同，优先使用Arrow原生读取引擎；有参数时从连接池连接的游标按列构建
+        :param sql: SQL查询语句
+        :param params: 占位符（?）对应的参数
+        :return: 查询结果polars DataFrame
+        """
+        self.instrumentation.annotate(sql=sql)
+        try:
+            if self.arrow_engine and not params:
+                return ArrowReader.read_uri(sql, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(sql, params or ())
+            return ArrowReader.from_cursor(cursor)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
+
+    @instrumented("select_df")
+    def select_pl(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                  offset: int = None) -> pl.DataFrame:
+        """
+        查询数据并直接读为polars DataFrame（Arrow内存），不经过pandas
+        安装了ADBC驱动(adbc-driver-sqlite)或connectorx时由其直接生成Arrow数据（使用独立连接），否则从连接池连接的游标按列构建
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param offset: 偏移量
+        :return: 查询结果polars DataFrame
+        """
+        columns_str = ", ".join(columns)
+        select_query = f"SELECT {columns_str} FROM {table_name}"
+        if condition:
+            select_query += f" WHERE {condition}"
+        if limit:
+            select_query += f" LIMIT {limit}"
+        if offset:
+            select_query += f" OFFSET {offset}"
+        self.instrumentation.annotate(sql=select_query)
+        try:
+            if self.arrow_engine:
+                return ArrowReader.read_uri(select_query, self._arrow_uri(), self.arrow_engine)
+            conn, cursor = self._connect()
+            cursor.execute(select_query)
+            return ArrowReader.from_cursor(cursor)
+        except Exception as e:
+            raise Exception(f"查询数据失败: {str(e)}")
+        finally:
+            if "cursor" in locals():
+                self._release(conn, cursor)
+
+    def select_iter(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                    batch_rows: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        使用fetchmany流式查询数据，每次只在内存中保留一批
+        :param table_name: 表名
+        :param columns: 要查询的列名列表
+        :param condition: WHERE条件语句
+        :param limit: 限制查询结果数量
+        :param batch_rows: 每批的行数
+        :return: DataFrame迭代器
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            select_query = f"SELECT {columns_str} FROM {table_name}"
+            if condition:
+                select_query += f" WHERE {condition}"
+            if limit:
+                select_query += f" LIMIT {limit}"
+            cursor.execute(select_query)
+        except Exception as e:
+            if "conn" in locals():
+                self._release(conn, cursor)
+            raise Exception(f"查询数据失败: {str(e)}")
+        try:
+            column_names = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records([tuple(row) for row in rows], columns=column_names)
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("count_data")
     def count_data(self, table_name: str, condition: str = None) -> int:
         """
         查询数据数量
@@ -182,14 +521,187 @@ class SQLiteUtils(DBInterface):
             count_query = f"SELECT COUNT(*) FROM {table_name}"
             if condition:
                 count_query += f" WHERE {condition}"
+            self.instrumentation.annotate(sql=count_query)
             cursor.execute(count_query)
             return cursor.fetchone()[0]
         except Exception as e:
             raise Exception(f"查询数据数量失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
 
+    def estimate_count(self, table_name: str) -> int | None:
+        """
+        从sqlite_stat1读取表的行数（由ANALYZE生成，stat字段的第一个数为行数），不扫描表
+        :param table_name: 表名
+        :return: 行数，没有执行过ANALYZE时返回None
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? ORDER BY idx IS NOT NULL LIMIT 1", (table_name,))
+            row = cursor.fetchone()
+        except sqlite3.OperationalError:
+            # 没有执行过ANALYZE时不存在sqlite_stat1
+            return None
+        finally:
+            self._release(conn, cursor)
+        if not row or not row[0]:
+            return None
+        return int(row[0].split()[0])
+
+    def primary_key(self, table_name: str) -> List[str]:
+        """
+        查询表的主键列
+        :param table_name: 表名
+        :return: 主键列名列表（按主键顺序），没有主键时为空列表
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            columns = [row for row in cursor.fetchall() if row["pk"] > 0]
+            return [row["name"] for row in sorted(columns, key=lambda row: row["pk"])]
+        except Exception as e:
+            raise Exception(f"查询主键失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def key_bounds(self, table_name: str, column: str, condition: str = None) -> Tuple[Any, Any]:
+        """
+        查询列的最小值和最大值
+        :param table_name: 表名
+        :param column: 列名，可以是rowid
+        :param condition: WHERE条件语句
+        :return: (最小值, 最大值)
+        """
+        try:
+            conn, cursor = self._connect()
+            bounds_query = f"SELECT MIN({column}), MAX({column}) FROM {table_name}"
+            if condition:
+                bounds_query += f" WHERE {condition}"
+            cursor.execute(bounds_query)
+            return tuple(cursor.fetchone())
+        except Exception as e:
+            raise Exception(f"查询列范围失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def key_histogram(self, table_name: str, column: str) -> List[Tuple[Any, float]]:
+        """
+        SQLite没有可直接使用的列直方图（sqlite_stat4只对索引采样），始终返回空列表
+        :param table_name: 表名
+        :param column: 列名
+        :return: 空列表
+        """
+        return []
+
+    def has_rowid(self, table_name: str) -> bool:
+        """
+        判断表是否为rowid表（WITHOUT ROWID表不能按rowid分区）
+        :param table_name: 表名
+        :return: 是否有rowid
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"SELECT rowid FROM {table_name} LIMIT 0")
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            self._release(conn, cursor)
+
+    def binary_column_type(self, pickled: bool = False) -> str:
+        """
+        原生二进制列的DDL类型，pickle列使用PICKLE_BLOB声明类型（仍为BLOB亲和性）
+        :param pickled: 是否为pickle列
+        :return: 类型名
+        """
+        return "PICKLE_BLOB" if pickled else "BLOB"
+
+    def mark_pickle_column(self, table_name: str, column: str) -> None:
+        """SQLite的pickle列已由声明类型标记，无需额外操作"""
+        pass
+
+    def binary_columns(self, table_name: str) -> dict:
+        """
+        从表结构中读取声明类型为BLOB的列
+        :param table_name: 表名
+        :return: {列名: "bytes" | "pickle"}
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            return {
+                row["name"]: "pickle" if row["type"].upper() == "PICKLE_BLOB" else "bytes"
+                for row in cursor.fetchall() if "BLOB" in row["type"].upper()
+            }
+        except Exception as e:
+            raise Exception(f"查询二进制列失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def save_column_codecs(self, table_name: str, column_codecs: dict, replace: bool = False) -> None:
+        """
+        把各列的编码方式写入元数据表
+        :param table_name: 表名
+        :param column_codecs: {列名: 编码方式}
+        :param replace: 为True时先清除该表原有的记录（表被重建时）；否则只把plain升级为具体编码，已有的编码保持不变
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+                "table_name VARCHAR(255) NOT NULL, column_name VARCHAR(255) NOT NULL, codec VARCHAR(32) NOT NULL, "
+                "PRIMARY KEY (table_name, column_name))"
+            )
+            if replace:
+                cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = ?", (table_name,))
+            cursor.executemany(
+                f"INSERT INTO {SCHEMA_TABLE} (table_name, column_name, codec) VALUES (?, ?, ?) "
+                "ON CONFLICT (table_name, column_name) DO UPDATE SET codec = excluded.codec "
+                f"WHERE {SCHEMA_TABLE}.codec = '{CODEC_PLAIN}'",
+                [(table_name, column, codec) for column, codec in column_codecs.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"写入列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def load_column_codecs(self, table_name: str) -> dict:
+        """
+        从元数据表读取各列的编码方式
+        :param table_name: 表名
+        :return: {列名: 编码方式}，元数据表或记录不存在时为空字典
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"SELECT column_name, codec FROM {SCHEMA_TABLE} WHERE table_name = ?", (table_name,))
+            return {column: codec for column, codec in cursor.fetchall()}
+        except sqlite3.OperationalError:
+            return {}
+        except Exception as e:
+            raise Exception(f"读取列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def delete_column_codecs(self, table_name: str) -> None:
+        """
+        删除元数据表中该表的记录
+        :param table_name: 表名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"DELETE FROM {SCHEMA_TABLE} WHERE table_name = ?", (table_name,))
+            conn.commit()
+        except sqlite3.OperationalError:
+            return
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"删除列编码元数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("delete_data")
     def delete_data(self, table_name: str, condition: str) -> None:
         """
         删除数据
@@ -199,14 +711,85 @@ class SQLiteUtils(DBInterface):
         try:
             conn, cursor = self._connect()
             delete_query = f"DELETE FROM {table_name} WHERE {condition}"
+            self.instrumentation.annotate(sql=delete_query)
             cursor.execute(delete_query)
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise Exception(f"删除数据失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close()
+            self._release(conn, cursor)
+
+    def create_staging_table(self, table_name: str, staging_name: str, columns: List[str]) -> None:
+        """
+        创建只在当前连接可见的临时暂存表，列类型与目标表相同（不复制约束），另有带索引的行号列
+        :param table_name: 目标表名
+        :param staging_name: 暂存表名
+        :param columns: 暂存的列
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            cursor.execute(f"CREATE TEMP TABLE {staging_name} AS SELECT {columns_str} FROM {table_name} LIMIT 0")
+            cursor.execute(f"ALTER TABLE {staging_name} ADD COLUMN {STAGING_ROW_COLUMN} BIGINT")
+            cursor.execute(f"CREATE INDEX {staging_name}_row ON {staging_name} ({STAGING_ROW_COLUMN})")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"创建暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    @instrumented("merge_staging")
+    def merge_staging(self, table_name: str, staging_name: str, columns: List[str], key_columns: List[str],
+                      update_columns: List[str], start: int, stop: int) -> int:
+        """
+        把暂存表中行号在[start, stop)内的行合并进目标表
+        :param table_name: 目标表名，key_columns上需要有主键或唯一索引
+        :param staging_name: 暂存表名
+        :param columns: 合并的列
+        :param key_columns: 冲突判断的键列
+        :param update_columns: 键冲突时更新的列，为空时保留已有行
+        :param start: 起始行号
+        :param stop: 结束行号（不含）
+        :return: 数据库报告的影响行数
+        """
+        try:
+            conn, cursor = self._connect()
+            columns_str = ", ".join(columns)
+            if update_columns:
+                action = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+            else:
+                action = "DO NOTHING"
+            merge_query = (
+                f"INSERT INTO {table_name} ({columns_str}) SELECT {columns_str} FROM {staging_name} "
+                f"WHERE {STAGING_ROW_COLUMN} >= {start} AND {STAGING_ROW_COLUMN} < {stop} "
+                f"ON CONFLICT ({', '.join(key_columns)}) {action}"
+            )
+            self.instrumentation.annotate(sql=merge_query)
+            cursor.execute(merge_query)
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"合并数据失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
+
+    def drop_staging_table(self, staging_name: str) -> None:
+        """
+        删除临时暂存表
+        :param staging_name: 暂存表名
+        """
+        try:
+            conn, cursor = self._connect()
+            cursor.execute(f"DROP TABLE IF EXISTS temp.{staging_name}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"删除暂存表失败: {str(e)}")
+        finally:
+            self._release(conn, cursor)
 
     def drop_table(self, table_name: str) -> None:
         """
@@ -222,5 +805,4 @@ class SQLiteUtils(DBInterface):
             conn.rollback()
             raise Exception(f"删除表失败: {str(e)}")
         finally:
-            cursor.close()
-            conn.close() 
\ No newline at end of file
+            self._release(conn, cursor) 
\ No newline at end of file
@@ -0,0 +1,144 @@
+from typing import List
+import pandas as pd
+import polars as pl
+from .QueryCache import QueryCache
+
+
+class SessionConnection:
+    """
+    会话固定的连接：后端方法照常调用commit/rollback，但commit不生效，由会话统一提交；
+    后端方法出错时的rollback会回滚整个会话的事务并把会话标记为失败，之后的操作在会话结束时一并回滚，
+    会话不能再提交，直到显式回滚（Session.rollback）
+    """
+
+    def __init__(self, conn):
+        object.__setattr__(self, "raw", conn)
+        object.__setattr__(self, "failed", False)
+
+    @property
+    def __class__(self):
+        # isinstance判断（例如pandas识别sqlite3连接）按被包装的连接类型进行
+        return type(self.raw)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        object.__setattr__(self, "failed", True)
+        self.raw.rollback()
+
+    def restart(self) -> None:
+        """会话显式回滚后可以继续使用"""
+        object.__setattr__(self, "failed", False)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.raw, name, value)
+
+
+def physical_connection(conn):
+    """取得会话连接包装的物理连接，普通连接原样返回"""
+    return conn.raw if type(conn) is SessionConnection else conn
+
+
+class Session:
+    """
+    固定一个连接的会话，会话中的操作在同一个事务中执行，通过 DBUtils.session() / DBUtils.transaction() 创建
+    会话期间当前线程调用的后端方法（execute、insert_df、delete_data、select_df等）都使用该连接且不单独提交；
+    SQLite使用专用写连接并在会话期间独占写入。会话只能在创建它的线程中使用
+    """
+
+    def __init__(self, db_utils):
+        self.db_utils = db_utils
+        self.db = db_utils.db
+        self._touched = set()
+        self._touched_all = False
+
+    def execute(self, sql: str) -> any:
+        """
+        执行任意SQL语句
+        :param sql: SQL语句
+        :return: 结果行列表
+        """
+        tables = QueryCache.written_tables(sql)
+        if tables is None:
+            self._touched_all = True
+        self._touched.update(tables or [])
+        return self.db.execute(sql)
+
+    def store_df(
+            self,
+            data: pl.DataFrame | pd.DataFrame,
+            table_name: str,
+            encode: bool = True,
+            include_index: bool = False,
+            binary: bool = False,
+            backend: str = "pandas"
+    ) -> None:
+        """
+        在会话的连接上编码并写入DataFrame（不分块并行，不重建表），参数同DBUtils.store_df
+        编码元数据在同一个事务中写入
+        """
+        if data is None or len(data) == 0:
+            return
+        data, frame_utils = self.db_utils._encode_frame(data, encode, include_index, binary, backend)
+        self._touched.add(table_name)
+        if frame_utils.column_codecs:
+            self.db.save_column_codecs(table_name, frame_utils.column_codecs)
+        self.db.insert_df(data, table_name)
+        self.db_utils._forget_codecs(table_name)
+
+    def insert_rows(self, table_name: str, columns: List[str], rows: List[tuple], batch_size: int = 1000) -> int:
+        """批量插入多行，参数同DBUtils.insert_rows"""
+        self._touched.add(table_name)
+        return self.db.insert_rows(table_name, columns, rows, batch_size=batch_size)
+
+    def delete_data(self, table_name: str, condition: str) -> None:
+        """
+        删除数据
+        :param table_name: 表名
+        :param condition: WHERE条件语句
+        """
+        self._touched.add(table_name)
+        self.db.delete_data(table_name, condition)
+
+    def query_df(self, table_name: str, columns: List[str] = ["*"], condition: str = None, limit: int = None,
+                 include_index: bool = False) -> pd.DataFrame:
+        """
+        在会话的连接上查询并解码（能读到会话中尚未提交的写入），不分块、不使用结果缓存
+        :return: 查询结果DataFrame
+        """
+        data = self.db.select_df(table_name, columns=columns, condition=condition, limit=limit)
+        column_codecs = self.db_utils._column_codecs(table_name)
+        binary_columns = self.db.binary_columns(table_name) if not column_codecs else None
+        return self.db_utils._decode_batch(data, binary_columns, column_codecs, include_index, "pandas")
+
+    def count(self, table_name: str, condition: str = None) -> int:
+        """
+        查询数据数量
+        :param table_name: 表名
+        :param condition: WHERE条件语句
+        """
+        return self.db.count_data(table_name, condition)
+
+    def commit(self) -> None:
+        """提交目前为止的操作，会话继续使用同一个连接"""
+        self.db.commit_session()
+        self._invalidate()
+
+    def rollback(self) -> None:
+        """回滚目前为止的操作"""
+        self.db.rollback_session()
+        self._touched.clear()
+        self._touched_all = False
+
+    def _invalidate(self) -> None:
+        """提交后使写入过的表的结果缓存失效"""
+        if self._touched_all:
+            self.db_utils._invalidate()
+        for table_name in self._touched:
+            self.db_utils._invalidate(table_name)
+        self._touched.clear()
+        self._touched_all = False
@@ -0,0 +1,212 @@
+import re
+from typing import List, NamedTuple
+
+_TOKEN_PATTERNS = [
+    ("space", r"\s+"),
+    ("comment", r"--[^\n]*|/\*.*?\*/"),
+    # PostgreSQL的E'...'字符串总是支持反斜杠转义
+    ("string", r"[eE]'(?:[^'\\]|\\.|'')*'"),
+    ("quoted", r'"(?:[^"]|"")*"|`(?:[^`]|``)*`'),
+    ("number", r"\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?"),
+    ("word", r"[A-Za-z_][A-Za-z_0-9$]*"),
+    ("param", r"\$\d+|%s|\?|:[A-Za-z_]\w*"),
+    ("op", r"::|<=|>=|<>|!=|\|\||->>|->|[-+*/%=<>(),.;\[\]~!@^&|#]"),
+]
+
+
+def _tokenizer(mysql: bool) -> re.Pattern:
+    """MySQL把字符串中的反斜杠作为转义符，并支持#注释；标准SQL只用''转义单引号"""
+    patterns = [
+        ("string", r"'(?:[^'\\]|\\.|'')*'" if mysql else r"'(?:[^']|'')*'"),
+        ("comment", r"#[^\n]*" if mysql else r"(?!)"),
+    ] + _TOKEN_PATTERNS
+    return re.compile("|".join(f"(?P<{kind}{i}>{pattern})" for i, (kind, pattern) in enumerate(patterns)), re.S)
+
+
+_TOKENIZERS = {mysql: _tokenizer(mysql) for mysql in (True, False)}
+
+# 出现在选择列表中时结果不能分块计算的聚合函数
+AGGREGATES = {
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "STRING_AGG", "ARRAY_AGG", "JSON_AGG", "JSONB_AGG",
+    "JSON_OBJECT_AGG", "JSONB_OBJECT_AGG", "JSON_ARRAYAGG", "JSON_OBJECTAGG", "JSON_GROUP_ARRAY",
+    "JSON_GROUP_OBJECT", "BOOL_AND", "BOOL_OR", "EVERY", "BIT_AND", "BIT_OR", "BIT_XOR", "STDDEV", "STDDEV_POP",
+    "STDDEV_SAMP", "STD", "VARIANCE", "VAR_POP", "VAR_SAMP", "TOTAL", "PERCENTILE_CONT", "PERCENTILE_DISC", "MODE",
+    "CORR", "COVAR_POP", "COVAR_SAMP", "XMLAGG",
+}
+# FROM之后的顶层子句
+CLAUSES = {
+    "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT", "EXCEPT", "WINDOW",
+    "FOR", "INTO", "QUALIFY", "LOCK", "PROCEDURE",
+}
+JOINS = {"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "OUTER", "STRAIGHT_JOIN", "LATERAL", "USING", "ON"}
+# 出现在语句任何位置（字符串和引号标识符之外）时拒绝执行的关键字
+WRITES = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "ALTER", "CREATE", "TRUNCATE", "GRANT", "REVOKE",
+    "COPY", "CALL", "EXEC", "EXECUTE", "ATTACH", "DETACH", "VACUUM", "PRAGMA", "REINDEX", "ANALYZE",
+}
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def keyword(self) -> str | None:
+        return self.text.upper() if self.kind == "word" else None
+
+
+class QueryPlan(NamedTuple):
+    """
+    query_df_sql的执行计划
+    mode: "scan" 按表并行分块读取（table、columns、condition、limit来自原语句）；"server" 在服务器上一次执行完整的sql
+    table: 单表查询的表名（server模式下为连接或子查询时为None），用于读取列编码方式
+    reason: 不能分块的原因
+    """
+    mode: str
+    sql: str
+    table: str = None
+    columns: List[str] = None
+    condition: str = None
+    limit: int = None
+    reason: str = None
+
+
+class SqlPlanner:
+    """
+    SELECT语句的词法分析和执行计划：识别字符串、引号标识符、注释和括号层级，只在顶层识别子句，
+    列表达式、条件等按原文截取，大小写和字符串字面量保持不变
+    """
+
+    @staticmethod
+    def tokenize(sql: str, backslash_escapes: bool = False) -> List[Token]:
+        """
+        切分SQL语句，去掉空白和注释
+        :param backslash_escapes: 按MySQL的规则切分（字符串中的反斜杠为转义符，#开始注释）
+        """
+        tokenizer = _TOKENIZERS[backslash_escapes]
+        tokens = []
+        position = 0
+        while position < len(sql):
+            match = tokenizer.match(sql, position)
+            if match is None:
+                raise ValueError(f"SQL语句无法解析: 第{position + 1}个字符附近 {sql[position:position + 20]!r}")
+            kind = match.lastgroup.rstrip("0123456789")
+            if kind not in ("space", "comment"):
+                tokens.append(Token(kind, match.group(), match.start(), match.end()))
+            position = match.end()
+        return tokens
+
+    @staticmethod
+    def plan(sql: str, backslash_escapes: bool = False) -> QueryPlan:
+        """
+        分析SELECT语句
+        :return: QueryPlan；简单扫描（单表，无聚合、窗口函数、DISTINCT、分组、排序，可带WHERE和整数LIMIT）为"scan"，其余为"server"
+        """
+        tokens = SqlPlanner.tokenize(sql, backslash_escapes)
+        while tokens and tokens[-1].text == ";":
+            tokens.pop()
+        if not tokens:
+            raise ValueError("SQL语句为空")
+        if any(token.text == ";" for token in tokens):
+            raise ValueError("只支持单条SELECT查询语句")
+        if tokens[0].keyword not in ("SELECT", "WITH"):
+            raise ValueError("只支持SELECT查询语句")
+        if any(token.keyword in WRITES for token in tokens):
+            raise ValueError("只支持只读的SELECT查询语句")
+        statement = sql[tokens[0].start:tokens[-1].end]
+        if tokens[0].keyword == "WITH":
+            return QueryPlan("server", statement, reason="WITH")
+
+        depth = 0
+        top = []  # 顶层的 (token序号, 关键字)
+        for i, token in enumerate(tokens):
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            elif depth == 0 and token.keyword:
+                top.append((i, token.keyword))
+        from_index = next((i for i, keyword in top if keyword == "FROM"), None)
+        if from_index is None:
+            return QueryPlan("server", statement, reason="no FROM")
+        clauses = [(i, keyword) for i, keyword in top if i > from_index and keyword in CLAUSES]
+        from_tokens = tokens[from_index + 1:clauses[0][0] if clauses else len(tokens)]
+        table = SqlPlanner._table_name(sql, from_tokens)
+
+        def server(reason: str) -> QueryPlan:
+            return QueryPlan("server", statement, table=table, reason=reason)
+
+        select_tokens = tokens[1:from_index]
+        if select_tokens and select_tokens[0].keyword in ("DISTINCT", "DISTINCTROW"):
+            return server("DISTINCT")
+        if select_tokens and select_tokens[0].keyword == "ALL":
+            select_tokens = select_tokens[1:]
+        if not select_tokens:
+            raise ValueError("选择列表缺失")
+        for i, token in enumerate(select_tokens):
+            following = select_tokens[i + 1].text if i + 1 < len(select_tokens) else None
+            if token.keyword in AGGREGATES and following == "(":
+                return server("aggregate")
+            if token.keyword == "OVER":
+                return server("window function")
+        if table is None:
+            if any(token.keyword in JOINS or token.text == "," for token in from_tokens):
+                return server("join")
+            return server("complex FROM")
+
+        condition = None
+        limit = None
+        for position, (i, keyword) in enumerate(clauses):
+            if keyword not in ("WHERE", "LIMIT"):
+                return server(keyword)
+            body = tokens[i + 1:clauses[position + 1][0] if position + 1 < len(clauses) else len(tokens)]
+            if keyword == "WHERE":
+                if not body:
+                    raise ValueError("WHERE条件缺失")
+                condition = sql[body[0].start:body[-1].end]
+            elif len(body) == 1 and body[0].kind == "number" and body[0].text.isdigit():
+                limit = int(body[0].text)
+            else:
+                # LIMIT ALL、LIMIT n, m、参数或表达式
+                return server("LIMIT")
+        return QueryPlan(
+            "scan", statement, table=table, columns=SqlPlanner._split_columns(sql, select_tokens),
+            condition=condition, limit=limit
+        )
+
+    @staticmethod
+    def _table_name(sql: str, from_tokens: List[Token]) -> str | None:
+        """FROM部分只是一个（可带schema的）表名时返回原文，带别名、连接或子查询时返回None"""
+        if not from_tokens or len(from_tokens) % 2 == 0:
+            return None
+        for i, token in enumerate(from_tokens):
+            expected = ("word", "quoted") if i % 2 == 0 else ("op",)
+            if token.kind not in expected or (i % 2 == 1 and token.text != "."):
+                return None
+            if token.keyword in JOINS or token.keyword in ("ONLY", "SELECT"):
+                return None
+        return sql[from_tokens[0].start:from_tokens[-1].end]
+
+    @staticmethod
+    def _split_columns(sql: str, select_tokens: List[Token]) -> List[str]:
+        """按顶层逗号切分选择列表，每一项保留原文"""
+        columns = []
+        depth = 0
+        start = None
+        previous = None
+        for token in select_tokens:
+            if token.text in ("(", "["):
+                depth += 1
+            elif token.text in (")", "]"):
+                depth -= 1
+            elif token.text == "," and depth == 0:
+                columns.append(sql[start.start:previous.end])
+                start = None
+                continue
+            if start is None:
+                start = token
+            previous = token
+        columns.append(sql[start.start:previous.end])
+        return columns
@@ -1 +1,23 @@
-from .DBUtils import DBUtils
\ No newline at end of file
+"""
+DBUtils和AsyncDBUtils在首次访问时才导入：import OpenDBUtils 本身不加载pandas、polars和数据库驱动，
+各数据库后端及其驱动在DBUtils第一次使用对应的db_instance时导入
+"""
+__all__ = ["DBUtils", "AsyncDBUtils", "col"]
+
+
+def __getattr__(name: str):
+    if name == "DBUtils":
+        from .DBUtils import DBUtils as value
+    elif name == "AsyncDBUtils":
+        from .AsyncDBUtils import AsyncDBUtils as value
+    elif name == "col":
+        from .QueryBuilder import col as value
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # 导入子模块会把同名的模块对象设为包属性，这里用类覆盖，与直接导入类时的行为一致
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
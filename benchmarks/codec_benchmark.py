@@ -0,0 +1,142 @@
+"""
+比较原先的逐单元格编码(Series.apply)与ColumnCodec按列批量编码的速度，并校验两者输出逐字节一致
+
+    python benchmarks/codec_benchmark.py --rows 1000000
+    python benchmarks/codec_benchmark.py --rows 1000000 --processes 8   # 同时测试ProcessCodec子进程编解码
+"""
+import argparse
+import base64
+import os
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OpenDBUtils.ColumnCodec import ColumnCodec, CODEC_BASE64, CODEC_PICKLE_BASE64
+from OpenDBUtils.ProcessCodec import ProcessCodec
+
+
+# 原先DataFrameUtils逐单元格的编解码，作为格式和速度的基准
+def to_pickle_base64(entry):
+    if entry is None:
+        return None
+    return "base64_pickle_encode::" + base64.b64encode(pickle.dumps(entry)).decode("utf-8")
+
+
+def from_pickle_base64(entry: str):
+    if entry is None:
+        return None
+    return pickle.loads(base64.b64decode(entry.split("base64_pickle_encode::")[1]))
+
+
+def to_base64(entry):
+    if entry is None:
+        return None
+    return "base64_encode::" + base64.b64encode(entry).decode("utf-8")
+
+
+def from_base64(entry: str):
+    if entry is None:
+        return None
+    return base64.b64decode(entry.split("base64_encode::")[1])
+
+
+def to_int(entry):
+    return None if entry is None else int(entry)
+
+
+def to_float(entry):
+    return None if entry is None else float(entry)
+
+
+def make_columns(rows: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(0, 64, rows)
+    blobs = [rng.bytes(int(size)) for size in sizes]
+    blobs[::17] = [None] * len(blobs[::17])
+    objects = [[int(i), {"k": int(i) % 7}] for i in range(rows)]
+    objects[::13] = [None] * len(objects[::13])
+    return {
+        "bytes": pd.Series(blobs, dtype=object),
+        "pickle": pd.Series(objects, dtype=object),
+        "int": pd.Series(rng.integers(0, 1 << 40, rows), dtype=np.int64),
+        "float": pd.Series(rng.random(rows), dtype=np.float64),
+    }
+
+
+def timed(func, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _normalize(value):
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def assert_same(expected: pd.Series, actual: pd.Series, name: str):
+    expected = [_normalize(value) for value in expected.tolist()]
+    actual = [_normalize(value) for value in actual.tolist()]
+    if expected != actual:
+        raise AssertionError(f"{name}: 批量编码结果与逐单元格结果不一致")
+
+
+def run_processes(columns: dict, processes: int, repeat: int):
+    codec = ProcessCodec(processes, min_rows=0)
+    cases = [
+        ("bytes decode", ColumnCodec.encode_bytes(columns["bytes"]), CODEC_BASE64, ColumnCodec.decode_bytes),
+        ("pickle decode", ColumnCodec.encode_pickle(columns["pickle"]), CODEC_PICKLE_BASE64, ColumnCodec.decode_pickle),
+    ]
+    print(f"processes={processes}")
+    print(f"{'case':<16}{'columnar (s)':>14}{'process (s)':>14}{'speedup':>10}")
+    # 进程池在第一次使用时启动，之后复用；预热后计时的只是解码本身
+    codec.decode({"column": (ColumnCodec.encode_bytes(pd.Series([b""])).to_numpy(), np.array([True]), CODEC_BASE64)})
+    for name, series, codec_name, columnar in cases:
+        values = series.to_numpy(dtype=object)
+        mask = ~pd.isna(values)
+        columnar_time, expected = timed(lambda: columnar(series), repeat)
+        process_time, result = timed(lambda: codec.decode({"column": (values, mask, codec_name)})["column"], repeat)
+        assert_same(expected, ColumnCodec._rebuild(series, mask, result), name)
+        print(f"{name:<16}{columnar_time:>14.4f}{process_time:>14.4f}{columnar_time / process_time:>9.1f}x")
+    codec.close()
+
+
+def run(rows: int, repeat: int, processes: int = 0):
+    columns = make_columns(rows)
+    cases = [
+        ("bytes encode", columns["bytes"], lambda s: s.apply(to_base64), ColumnCodec.encode_bytes),
+        ("pickle encode", columns["pickle"], lambda s: s.apply(to_pickle_base64), ColumnCodec.encode_pickle),
+        ("int encode", columns["int"], lambda s: s.apply(to_int), ColumnCodec.to_int),
+        ("float encode", columns["float"], lambda s: s.apply(to_float), ColumnCodec.to_float),
+    ]
+    encoded_bytes = ColumnCodec.encode_bytes(columns["bytes"])
+    encoded_pickle = ColumnCodec.encode_pickle(columns["pickle"])
+    cases += [
+        ("bytes decode", encoded_bytes, lambda s: s.map(from_base64, na_action="ignore"), ColumnCodec.decode_bytes),
+        ("pickle decode", encoded_pickle, lambda s: s.map(from_pickle_base64, na_action="ignore"), ColumnCodec.decode_pickle),
+    ]
+    print(f"rows={rows} repeat={repeat}")
+    print(f"{'case':<16}{'per-cell (s)':>14}{'columnar (s)':>14}{'speedup':>10}")
+    for name, series, per_cell, columnar in cases:
+        per_cell_time, expected = timed(lambda: per_cell(series), repeat)
+        columnar_time, actual = timed(lambda: columnar(series), repeat)
+        assert_same(expected, actual, name)
+        print(f"{name:<16}{per_cell_time:>14.4f}{columnar_time:>14.4f}{per_cell_time / columnar_time:>9.1f}x")
+    if processes:
+        run_processes(columns, processes, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DataFrameUtils编码/解码基准测试")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=0, help="大于0时同时测试ProcessCodec子进程编解码")
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.processes)
@@ -0,0 +1,247 @@
+"""
+DBUtils.store_df / query_df 端到端基准测试：按数据集 × 行数 × chunk_size × max_workers 网格测量
+吞吐量（行/秒）、延迟分位数和峰值RSS，结果写入JSON以便比较不同版本
+
+    python benchmarks/dbutils_benchmark.py                                    # SQLite，默认网格
+    python benchmarks/dbutils_benchmark.py --datasets narrow,bytes --rows 100000,1000000 \
+        --chunk-sizes 2048,16384 --workers 1,4,8 --repeat 5 --output results.json
+    python benchmarks/dbutils_benchmark.py --postgres user:password@localhost:5432/bench \
+        --mysql user:password@localhost:3306/bench                             # 同时测试本地容器中的数据库
+    python benchmarks/dbutils_benchmark.py --compare baseline.json --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OpenDBUtils import DBUtils
+
+TABLE_NAME = "opendbutils_benchmark"
+
+
+def make_frame(dataset: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    生成合成数据
+    narrow: 4个数值列；wide_text: 20个短文本列；bytes: 变长bytes列；pickled: 嵌套list/dict对象列
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows, dtype=np.int64)
+    if dataset == "narrow":
+        return pd.DataFrame({
+            "id": ids,
+            "a": rng.integers(0, 1 << 31, rows),
+            "b": rng.random(rows),
+            "c": rng.random(rows),
+        })
+    if dataset == "wide_text":
+        words = np.array([f"word{i:04d}" for i in range(1000)], dtype=object)
+        frame = {"id": ids}
+        for i in range(20):
+            frame[f"t{i}"] = words[rng.integers(0, len(words), rows)]
+        return pd.DataFrame(frame)
+    if dataset == "bytes":
+        sizes = rng.integers(0, 256, rows)
+        return pd.DataFrame({"id": ids, "payload": [rng.bytes(int(size)) for size in sizes]})
+    if dataset == "pickled":
+        return pd.DataFrame({
+            "id": ids,
+            "items": [[int(i), int(i) * 2, int(i) % 7] for i in ids],
+            "attrs": [{"k": int(i) % 11, "tags": ["x", "y"]} for i in ids],
+        })
+    raise ValueError(f"Unknown dataset: {dataset}")
+
+
+class RssSampler:
+    """后台线程定时读取当前进程的RSS，记录测量期间的峰值（Linux读取/proc，其他平台退回ru_maxrss）"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            import resource
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+
+def connect(backend: str, target: str) -> DBUtils:
+    """建立DBUtils；PostgreSQL/MySQL的target格式为 user:password@host:port/db"""
+    if backend == "sqlite":
+        return DBUtils(target, db_instance="sqlite")
+    parts = urlsplit("//" + target)
+    return DBUtils(
+        parts.path.lstrip("/"), unquote(parts.username or ""), unquote(parts.password or ""),
+        parts.hostname, str(parts.port), db_instance=backend
+    )
+
+
+def summarize(seconds: list, rows: int) -> dict:
+    seconds_array = np.array(seconds)
+    return {
+        "seconds": seconds,
+        "p50": float(np.percentile(seconds_array, 50)),
+        "p90": float(np.percentile(seconds_array, 90)),
+        "p99": float(np.percentile(seconds_array, 99)),
+        "rows_per_sec": rows / float(np.median(seconds_array)),
+    }
+
+
+def measure(func, repeat: int, warmup: int) -> tuple:
+    """先不计时执行warmup次，再执行repeat次，返回每次的耗时和期间的峰值RSS（MB）"""
+    for _ in range(warmup):
+        func()
+    seconds = []
+    with RssSampler() as sampler:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            seconds.append(time.perf_counter() - start)
+    return seconds, sampler.peak / 2 ** 20
+
+
+def run_backend(backend: str, target: str, args) -> list:
+    results = []
+    db = connect(backend, target)
+    try:
+        for dataset in args.datasets:
+            for rows in args.rows:
+                frame = make_frame(dataset, rows)
+                for chunk_size in args.chunk_sizes:
+                    for max_workers in args.workers:
+                        grid = {"backend": backend, "dataset": dataset, "rows": rows,
+                                "chunk_size": chunk_size, "max_workers": max_workers}
+                        store = lambda: db.store_df(frame, TABLE_NAME, chunk_size=chunk_size,
+                                                    max_workers=max_workers, table_replace=True)
+                        seconds, peak = measure(store, args.repeat, args.warmup)
+                        results.append({**grid, "op": "store_df", **summarize(seconds, rows), "peak_rss_mb": peak})
+                        query = lambda: db.query_df(TABLE_NAME, chunk_size=chunk_size, max_workers=max_workers)
+                        seconds, peak = measure(query, args.repeat, args.warmup)
+                        results.append({**grid, "op": "query_df", **summarize(seconds, rows), "peak_rss_mb": peak})
+                        print_row(results[-2])
+                        print_row(results[-1])
+        db.drop_table(TABLE_NAME)
+    finally:
+        db.close()
+    return results
+
+
+def print_row(result: dict, baseline: dict = None):
+    line = (f"{result['backend']:<11}{result['op']:<10}{result['dataset']:<11}{result['rows']:>9}"
+            f"{result['chunk_size']:>8}{result['max_workers']:>4}{result['rows_per_sec']:>13.0f}"
+            f"{result['p50']:>9.3f}{result['p90']:>9.3f}{result['peak_rss_mb']:>9.0f}")
+    if baseline:
+        line += f"{result['rows_per_sec'] / baseline['rows_per_sec']:>8.2f}x"
+    print(line)
+
+
+def print_header(compare: bool = False):
+    print(f"{'backend':<11}{'op':<10}{'dataset':<11}{'rows':>9}{'chunk':>8}{'w':>4}{'rows/s':>13}"
+          f"{'p50 s':>9}{'p90 s':>9}{'rss MB':>9}" + (f"{'vs base':>9}" if compare else ""))
+
+
+def result_key(result: dict) -> tuple:
+    return tuple(result[name] for name in ("backend", "op", "dataset", "rows", "chunk_size", "max_workers"))
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import polars as pl
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "polars": pl.__version__,
+    }
+
+
+def parse_list(value: str, cast=str) -> list:
+    return [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DBUtils.store_df/query_df基准测试")
+    parser.add_argument("--datasets", type=parse_list, default=["narrow", "wide_text", "bytes", "pickled"],
+                        help="逗号分隔: narrow, wide_text, bytes, pickled")
+    parser.add_argument("--rows", type=lambda v: parse_list(v, int), default=[10000, 100000])
+    parser.add_argument("--chunk-sizes", type=lambda v: parse_list(v, int), default=[2048, 16384])
+    parser.add_argument("--workers", type=lambda v: parse_list(v, int), default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="每个组合先不计时执行的次数")
+    parser.add_argument("--sqlite", default=None, help="SQLite数据库文件，默认使用临时文件")
+    parser.add_argument("--no-sqlite", action="store_true", help="不测试SQLite")
+    parser.add_argument("--postgres", default=None, help="user:password@host:port/db")
+    parser.add_argument("--mysql", default=None, help="user:password@host:port/db")
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    parser.add_argument("--compare", default=None, help="与之前的结果JSON比较吞吐量")
+    args = parser.parse_args()
+
+    targets = []
+    temp_dir = None
+    if not args.no_sqlite:
+        if args.sqlite is None:
+            temp_dir = tempfile.TemporaryDirectory()
+            args.sqlite = os.path.join(temp_dir.name, "benchmark.db")
+        targets.append(("sqlite", args.sqlite))
+    if args.postgres:
+        targets.append(("postgresql", args.postgres))
+    if args.mysql:
+        targets.append(("mysql", args.mysql))
+
+    print_header()
+    results = []
+    for backend, target in targets:
+        results += run_backend(backend, target, args)
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {result_key(result): result for result in json.load(f)["results"]}
+        print(f"\ncompared with {args.compare}")
+        print_header(compare=True)
+        for result in results:
+            print_row(result, baseline.get(result_key(result)))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(), "args": {k: v for k, v in vars(args).items() if k not in ("postgres", "mysql")},
+                       "results": results}, f, indent=2)
+        print(f"\nresults written to {args.output}")
@@ -0,0 +1,120 @@
+"""
+导入时间预算检查：在新的解释器中用 -X importtime 测量各场景的导入耗时，并检查不应加载的模块
+超出预算或加载了禁止的模块时以状态码1退出，可以直接放进CI
+
+    python benchmarks/import_time.py                              # 全部场景，默认预算
+    python benchmarks/import_time.py --budget package=30 --budget sqlite=900 --repeat 5
+    python benchmarks/import_time.py --scenarios sqlite --top 15 --output import_time.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_DRIVERS = ["sqlalchemy", "psycopg2", "mysql"]
+
+# 场景名 -> (代码, 不应加载的顶层模块, 默认预算毫秒)
+SCENARIOS = {
+    "package": (
+        "import OpenDBUtils",
+        ["pandas", "polars", "numpy"] + HEAVY_DRIVERS,
+        50,
+    ),
+    "dbutils": (
+        "from OpenDBUtils import DBUtils",
+        HEAVY_DRIVERS,
+        1500,
+    ),
+    "sqlite": (
+        "import os, sys\n"
+        "from OpenDBUtils import DBUtils\n"
+        "db = DBUtils(os.path.join(sys.argv[1], 'import_time.db'), db_instance='sqlite')\n"
+        "db.execute_sql('CREATE TABLE IF NOT EXISTS t (a INTEGER)')\n"
+        "db.query_df('t')\n"
+        "db.close()",
+        HEAVY_DRIVERS,
+        1500,
+    ),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure(code: str, work_dir: str) -> dict:
+    """
+    在新的解释器中执行代码
+    :return: {"total_ms", "modules": {顶层导入的模块: 累计毫秒}, "loaded": 已加载的顶层包名集合}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, work_dir],
+        capture_output=True, text=True, cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"场景执行失败:\n{result.stderr[-2000:]}")
+    modules = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        loaded.add(match.group(4).split(".")[0])
+        # 缩进为空的是顶层导入，其累计时间包含全部子导入
+        if match.group(3) == "":
+            modules[match.group(4)] = modules.get(match.group(4), 0) + int(match.group(2)) / 1000
+    return {"total_ms": sum(modules.values()), "modules": modules, "loaded": loaded}
+
+
+def run(names: list, budgets: dict, repeat: int, top: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in names:
+            code, forbidden, default_budget = SCENARIOS[name]
+            # 取最快的一次，减少磁盘缓存和调度的影响
+            best = min((measure(code, work_dir) for _ in range(repeat)), key=lambda item: item["total_ms"])
+            budget = budgets.get(name, default_budget)
+            unexpected = sorted(set(forbidden) & best["loaded"])
+            passed = best["total_ms"] <= budget and not unexpected
+            results.append({
+                "scenario": name,
+                "total_ms": round(best["total_ms"], 1),
+                "budget_ms": budget,
+                "unexpected_modules": unexpected,
+                "passed": passed,
+                "top": sorted(best["modules"].items(), key=lambda item: -item[1])[:top],
+            })
+            print(f"{name:<10}{best['total_ms']:>9.1f} ms  budget {budget:>6} ms  {'ok' if passed else 'FAIL'}"
+                  + (f"  unexpected: {', '.join(unexpected)}" if unexpected else ""))
+            for module, ms in results[-1]["top"]:
+                print(f"    {module:<40}{ms:>9.1f} ms")
+    return results
+
+
+def parse_budget(value: str) -> tuple:
+    name, _, ms = value.partition("=")
+    if name not in SCENARIOS or not ms:
+        raise argparse.ArgumentTypeError(f"格式为 场景=毫秒，场景为 {', '.join(SCENARIOS)}")
+    return name, float(ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenDBUtils导入时间预算检查")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗号分隔: {', '.join(SCENARIOS)}")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[], help="场景=毫秒，覆盖默认预算")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景执行的次数，取最快的一次")
+    parser.add_argument("--top", type=int, default=5, help="显示耗时最多的顶层导入")
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    args = parser.parse_args()
+
+    names = [name for name in args.scenarios.split(",") if name]
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"Unknown scenario: {name}")
+    results = run(names, dict(args.budget), args.repeat, args.top)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    sys.exit(0 if all(result["passed"] for result in results) else 1)
@@ -0,0 +1,18 @@
+import pytest
+from OpenDBUtils import DBUtils
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """临时文件上的SQLite DBUtils，测试结束时关闭"""
+    db = DBUtils(str(tmp_path / "test.db"), db_instance="sqlite")
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def cached_db(tmp_path):
+    """启用结果缓存的SQLite DBUtils"""
+    db = DBUtils(str(tmp_path / "cached.db"), db_instance="sqlite", cache_max_bytes=16 * 2 ** 20)
+    yield db
+    db.close()
@@ -0,0 +1,107 @@
+import asyncio
+import concurrent.futures
+import threading
+from contextlib import aclosing
+import pandas as pd
+import pytest
+from OpenDBUtils.AsyncDBUtils import AsyncDBUtils
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    """SQLite上的AsyncDBUtils，全部操作走线程池"""
+    db = AsyncDBUtils(str(tmp_path / "async.db"), db_instance="sqlite", max_concurrency=2)
+    yield db
+    asyncio.run(db.close())
+
+
+def test_sqlite_uses_thread_offload(async_db):
+    assert async_db.driver is None
+
+
+def test_store_query_count(async_db):
+    async def run():
+        await async_db.store_df(pd.DataFrame({"id": range(100), "name": [f"n{i}" for i in range(100)]}), "items")
+        df = await async_db.query_df("items", chunk_size=16, cache=False)
+        count = await async_db.count("items", "id < 10")
+        rows = await async_db.execute_sql("SELECT MAX(id) FROM items")
+        return df, count, rows
+
+    df, count, rows = asyncio.run(run())
+    assert sorted(df["id"]) == list(range(100))
+    assert count == 10
+    assert rows[0][0] == 99
+
+
+def test_query_iter_batches(async_db):
+    async def run():
+        await async_db.store_df(pd.DataFrame({"id": range(25)}), "items")
+        return [len(df) async for df in async_db.query_iter("items", batch_rows=10)]
+
+    assert asyncio.run(run()) == [10, 10, 5]
+
+
+def test_query_iter_early_exit_returns_connection(async_db):
+    async def run():
+        await async_db.store_df(pd.DataFrame({"id": range(25)}), "items")
+        async with aclosing(async_db.query_iter("items", batch_rows=10)) as batches:
+            async for df in batches:
+                break
+        # 提前退出后连接已归还，后续操作不会等待
+        return await asyncio.wait_for(async_db.count("items"), timeout=5)
+
+    assert asyncio.run(run()) == 25
+
+
+def test_concurrency_is_bounded(async_db, monkeypatch):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    count_data = async_db.sync.db.count_data
+
+    def tracked(*args, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        try:
+            threading.Event().wait(0.02)
+            return count_data(*args, **kwargs)
+        finally:
+            with lock:
+                active -= 1
+
+    async def run():
+        await async_db.store_df(pd.DataFrame({"id": range(10)}), "items")
+        monkeypatch.setattr(async_db.sync.db, "count_data", tracked)
+        return await asyncio.gather(*(async_db.count("items") for _ in range(8)))
+
+    assert asyncio.run(run()) == [10] * 8
+    assert peak <= async_db.max_concurrency
+
+
+def test_replaced_executor_is_shut_down(tmp_path, monkeypatch):
+    from OpenDBUtils import DBUtils
+    previous = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    init = DBUtils.__init__
+
+    def init_with_executor(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self.executor = previous
+
+    monkeypatch.setattr(DBUtils, "__init__", init_with_executor)
+    db = AsyncDBUtils(str(tmp_path / "async.db"), db_instance="sqlite")
+    try:
+        assert db.sync.executor is not previous
+        with pytest.raises(RuntimeError):
+            previous.submit(int)
+    finally:
+        asyncio.run(db.close())
+
+
+def test_close_shuts_down_executors(tmp_path):
+    db = AsyncDBUtils(str(tmp_path / "async.db"), db_instance="sqlite")
+    asyncio.run(db.close())
+    for executor in (db._executor, db.sync.executor):
+        with pytest.raises(RuntimeError):
+            executor.submit(int)
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from OpenDBUtils import DBUtils
+from OpenDBUtils.AutoTune import ConcurrencyTuner, MAX_CHUNK_ROWS, MIN_CHUNK_ROWS, auto_chunk_size
+
+
+def test_auto_chunk_size_bounds():
+    assert auto_chunk_size(100, target_bytes=100000) == 1000
+    assert auto_chunk_size(1e9) == MIN_CHUNK_ROWS
+    assert auto_chunk_size(1) == MAX_CHUNK_ROWS
+    assert auto_chunk_size(0) == MAX_CHUNK_ROWS
+
+
+def test_tuner_grows_while_throughput_rises():
+    tuner = ConcurrencyTuner(8, initial=2)
+    tuner._adjust(1000.0, 0.01)
+    tuner._adjust(1200.0, 0.01)
+    assert tuner.limit == 4
+    # 吞吐量持平时保持
+    tuner._adjust(1210.0, 0.01)
+    assert tuner.limit == 4
+    assert [window["workers"] for window in tuner.summary()["windows"]] == [2, 3, 4]
+
+
+def test_tuner_backs_off_when_saturated():
+    tuner = ConcurrencyTuner(16, initial=8)
+    tuner._adjust(1000.0, 0.01)
+    tuner._adjust(1100.0, 0.05)
+    assert tuner.limit == 7
+    tuner._adjust(500.0, 0.01)
+    assert tuner.limit == 6
+
+
+def test_tuner_respects_bounds():
+    tuner = ConcurrencyTuner(2)
+    assert tuner.limit == 2
+    tuner._adjust(1000.0, 0.01)
+    assert tuner.limit == 2
+    tuner = ConcurrencyTuner(4, initial=1)
+    tuner._adjust(1000.0, 0.01)
+    tuner._adjust(10.0, 0.01)
+    assert tuner.limit == 1
+    with pytest.raises(ValueError):
+        ConcurrencyTuner(0)
+
+
+def test_timed_records_rows():
+    tuner = ConcurrencyTuner(4, initial=1)
+    results = [tuner.timed(lambda: pd.DataFrame({"a": range(10)}))() for _ in range(3)]
+    results.append(tuner.timed(lambda: {"rows": 5})())
+    assert len(results[0]) == 10
+    # 第四块完成时结束第一个窗口
+    assert tuner.history and tuner._window_chunks == 0
+
+
+def test_auto_store_and_query(tmp_path):
+    db = DBUtils(str(tmp_path / "auto.db"), db_instance="sqlite", auto_chunk_bytes=1024)
+    try:
+        db.store_df(pd.DataFrame({"id": range(2000), "name": ["x" * 20] * 2000}), "items",
+                    chunk_size="auto", max_workers="auto")
+        assert db.autotune_stats()["chunk_size"] == MIN_CHUNK_ROWS
+        df = db.query_df("items", chunk_size="auto", max_workers="auto", cache=False)
+        assert sorted(df["id"]) == list(range(2000))
+        stats = db.autotune_stats()
+        assert stats["chunk_size"] == MIN_CHUNK_ROWS
+        assert 1 <= stats["workers"] <= db.db.pool.max_size
+    finally:
+        db.close()
+
+
+def test_invalid_max_workers(sqlite_db):
+    sqlite_db.store_df(pd.DataFrame({"id": range(10)}), "items")
+    with pytest.raises(ValueError):
+        sqlite_db.query_df("items", max_workers=0, cache=False)
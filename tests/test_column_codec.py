@@ -0,0 +1,56 @@
+import base64
+import pickle
+import numpy as np
+import pandas as pd
+from OpenDBUtils.ColumnCodec import ColumnCodec
+from OpenDBUtils.DBUtils import DataFrameUtils
+
+
+# 批量编码之前逐单元格的格式，已存储的表都是这种格式
+def _legacy_base64(entry):
+    return None if entry is None else "base64_encode::" + base64.b64encode(entry).decode("utf-8")
+
+
+def _legacy_pickle_base64(entry):
+    if entry is None:
+        return None
+    return "base64_pickle_encode::" + base64.b64encode(pickle.dumps(entry)).decode("utf-8")
+
+
+BLOBS = pd.Series([b"", b"\x00\xff", None, bytes(range(256)), b"a" * 1000, b"\n"], dtype=object)
+OBJECTS = pd.Series([[1, 2], {"k": (1, "x")}, None, 3.5, {"nested": [{"a": None}]}, "text"], dtype=object)
+
+
+def test_bytes_encoding_matches_legacy_format():
+    assert ColumnCodec.encode_bytes(BLOBS).tolist() == [_legacy_base64(value) for value in BLOBS]
+
+
+def test_pickle_encoding_matches_legacy_format():
+    assert ColumnCodec.encode_pickle(OBJECTS).tolist() == [_legacy_pickle_base64(value) for value in OBJECTS]
+
+
+def test_numeric_encoding_matches_legacy_format():
+    ints = pd.Series(np.array([1, -2, 1 << 40], dtype=np.int64))
+    floats = pd.Series(np.array([0.5, 1e-3, -2.25], dtype=np.float32))
+    assert ColumnCodec.to_int(ints).tolist() == [int(value) for value in ints]
+    assert ColumnCodec.to_float(floats).tolist() == [float(value) for value in floats]
+
+
+def test_legacy_tables_still_decode():
+    # 没有编码元数据的旧表按前缀识别
+    stored = pd.DataFrame({
+        "raw": [_legacy_base64(value) for value in BLOBS],
+        "payload": [_legacy_pickle_base64(value) for value in OBJECTS],
+    })
+    decoded = DataFrameUtils(stored).decode()
+    assert decoded["raw"].tolist() == BLOBS.tolist()
+    assert decoded["payload"].tolist() == OBJECTS.tolist()
+
+
+def test_legacy_rows_stored_through_sqlite(sqlite_db):
+    sqlite_db.execute_sql("CREATE TABLE legacy (id INTEGER, raw TEXT, payload TEXT)")
+    rows = [(i, _legacy_base64(BLOBS[i]), _legacy_pickle_base64(OBJECTS[i])) for i in range(len(BLOBS))]
+    sqlite_db.insert_rows("legacy", ["id", "raw", "payload"], rows)
+    result = sqlite_db.query_df("legacy").sort_values("id")
+    assert result["raw"].tolist() == BLOBS.tolist()
+    assert result["payload"].tolist() == OBJECTS.tolist()
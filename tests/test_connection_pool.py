@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import pandas as pd
+import pytest
+from OpenDBUtils.ConnectionPool import ConnectionPool
+
+
+def _pool(**kwargs) -> ConnectionPool:
+    return ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), **kwargs)
+
+
+def test_released_connection_is_reused():
+    pool = _pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["acquired"] == 2
+    assert stats["in_use"] == 1
+
+
+def test_max_size_times_out():
+    pool = _pool(max_size=1)
+    pool.acquire()
+    with pytest.raises(Exception, match="获取数据库连接超时"):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool = _pool(max_size=1)
+    conn = pool.acquire()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(pool.acquire(timeout=5)))
+    waiter.start()
+    threading.Event().wait(0.05)
+    pool.release(conn)
+    waiter.join()
+    assert result == [conn]
+    assert pool.stats()["waits"] == 1
+
+
+def test_discard_closes_connection():
+    pool = _pool()
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert pool.acquire() is not conn
+    assert pool.stats()["size"] == 1
+
+
+def test_failed_ping_replaces_connection():
+    def ping(conn):
+        raise RuntimeError("gone")
+
+    pool = _pool(ping_interval=0, ping=ping)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is not conn
+    assert pool.stats()["ping_failures"] == 1
+
+
+def test_idle_connections_are_pruned_down_to_min_size():
+    pool = _pool(min_size=1, idle_timeout=0)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    assert pool.prune() == 2
+    assert pool.stats()["idle"] == 1
+
+
+def test_closed_pool_rejects_acquire():
+    pool = _pool()
+    conn = pool.acquire()
+    pool.close()
+    with pytest.raises(Exception, match="连接池已关闭"):
+        pool.acquire()
+    # 借出的连接在归还时关闭
+    pool.release(conn)
+    assert pool.stats()["size"] == 0
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        _pool(max_size=0)
+    with pytest.raises(ValueError):
+        _pool(min_size=3, max_size=2)
+
+
+def test_backend_returns_connections(sqlite_db):
+    sqlite_db.store_df(pd.DataFrame({"id": range(100)}), "items")
+    sqlite_db.query_df("items", chunk_size=10, cache=False)
+    assert sqlite_db.db.pool.stats()["in_use"] == 0
@@ -0,0 +1,83 @@
+import datetime
+import io
+from collections import namedtuple
+import polars as pl
+import pytest
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+DESCRIPTION = [
+    Column("id", 20), Column("flag", 16), Column("data", 17), Column("day", 1082),
+    Column("ts", 1114), Column("name", 25), Column("score", 701),
+]
+CSV = (
+    b"id,flag,data,day,ts,name,score\n"
+    b"1,t,\\x0102,2024-01-02,2024-01-02 03:04:05,\"\",1.5\n"
+    b"2,f,,,,,\n"
+    b"3,,,,,,\n"
+)
+
+
+class _CopyConnection:
+    """返回固定COPY输出的PostgreSQL连接替身，记录执行的语句"""
+
+    def __init__(self):
+        self.statements = []
+        self.description = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        self.description = DESCRIPTION
+
+    def copy_expert(self, sql, output):
+        self.statements.append(sql)
+        output.write(CSV)
+
+    def close(self):
+        pass
+
+
+def test_parse_copy_csv_types():
+    from OpenDBUtils.PostgreUtils import PostgreUtils
+
+    data = PostgreUtils._parse_copy_csv(io.BytesIO(CSV), DESCRIPTION)
+    assert data.schema["id"] == pl.Int64
+    assert data.schema["score"] == pl.Float64
+    assert data.to_dicts() == [
+        {"id": 1, "flag": True, "data": b"\x01\x02", "day": datetime.date(2024, 1, 2),
+         "ts": datetime.datetime(2024, 1, 2, 3, 4, 5), "name": "", "score": 1.5},
+        {"id": 2, "flag": False, "data": None, "day": None, "ts": None, "name": None, "score": None},
+        {"id": 3, "flag": None, "data": None, "day": None, "ts": None, "name": None, "score": None},
+    ]
+
+
+def test_parse_copy_csv_empty_result():
+    from OpenDBUtils.PostgreUtils import PostgreUtils
+
+    data = PostgreUtils._parse_copy_csv(io.BytesIO(), DESCRIPTION)
+    assert data.is_empty()
+    assert data.columns == [column.name for column in DESCRIPTION]
+
+
+def test_select_df_copy_statements(monkeypatch):
+    from OpenDBUtils.PostgreUtils import PostgreUtils
+
+    db = PostgreUtils("test", "user", "password")
+    conn = _CopyConnection()
+    monkeypatch.setattr(db, "_acquire", lambda: conn)
+    monkeypatch.setattr(db, "_return_connection", lambda conn, discard=False: None)
+    df = db.select_df_copy("items", columns=["id", "name"], condition="id > 0", limit=10, offset=20)
+    select = "SELECT id, name FROM items WHERE id > 0 LIMIT 10 OFFSET 20"
+    assert conn.statements == [
+        f"SELECT * FROM ({select}) AS copy_query LIMIT 0",
+        f"COPY ({select}) TO STDOUT (FORMAT csv, HEADER true)",
+    ]
+    assert df["id"].tolist() == [1, 2, 3]
+
+
+def test_copy_read_mode_requires_postgresql(sqlite_db):
+    with pytest.raises(ValueError, match="copy"):
+        sqlite_db.query_df("items", read_mode="copy")
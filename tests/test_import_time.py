@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "import_time.py")
+
+
+def test_import_time_budget(tmp_path):
+    """各场景的导入时间在预算内，且没有加载不应加载的模块（见benchmarks/import_time.py）"""
+    result = subprocess.run(
+        [sys.executable, SCRIPT, "--repeat", "3", "--output", str(tmp_path / "import_time.json")],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,120 @@
+import threading
+import pytest
+
+
+def _create_events(db):
+    db.execute_sql("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT)")
+
+
+def _ids(db):
+    return [row[0] for row in db.execute_sql("SELECT id FROM events ORDER BY id")]
+
+
+def test_insert_rows_in_batches(sqlite_db):
+    _create_events(sqlite_db)
+    assert sqlite_db.insert_rows("events", ["id", "kind"], [(i, "k") for i in range(25)], batch_size=10) == 25
+    assert sqlite_db.insert_rows("events", ["id", "kind"], ((i, "g") for i in range(25, 30))) == 5
+    assert sqlite_db.insert_rows("events", ["id", "kind"], []) == 0
+    assert _ids(sqlite_db) == list(range(30))
+
+
+def test_insert_rows_is_one_transaction(sqlite_db):
+    _create_events(sqlite_db)
+    rows = [(i, "k") for i in range(10)] + [(0, "duplicate")]
+    with pytest.raises(Exception, match="插入"):
+        sqlite_db.insert_rows("events", ["id", "kind"], rows, batch_size=5)
+    assert _ids(sqlite_db) == []
+
+
+def test_insert_rows_invalid_batch_size(sqlite_db):
+    _create_events(sqlite_db)
+    with pytest.raises(ValueError):
+        sqlite_db.insert_rows("events", ["id", "kind"], [(1, "k")], batch_size=0)
+
+
+def test_insert_rows_invalidates_cache(cached_db):
+    _create_events(cached_db)
+    cached_db.insert_rows("events", ["id", "kind"], [(1, "k")])
+    assert len(cached_db.query_df("events")) == 1
+    cached_db.insert_rows("events", ["id", "kind"], [(2, "k")])
+    assert len(cached_db.query_df("events")) == 2
+
+
+def test_row_writer_flushes_on_max_rows_and_close(sqlite_db):
+    _create_events(sqlite_db)
+    with sqlite_db.row_writer("events", ["id", "kind"], max_rows=10, max_delay=None) as writer:
+        writer.write_many((i, "k") for i in range(12))
+        assert _ids(sqlite_db) == list(range(12))
+        writer.write((12, "k"))
+        assert writer.stats()["buffered"] == 1
+    assert _ids(sqlite_db) == list(range(13))
+    assert writer.stats() == {"rows": 13, "flushes": 2, "failures": 0, "buffered": 0}
+    with pytest.raises(Exception, match="写入器已关闭"):
+        writer.write((13, "k"))
+
+
+def test_row_writer_flushes_after_max_delay(sqlite_db, monkeypatch):
+    _create_events(sqlite_db)
+    flushed = threading.Event()
+    insert_rows = sqlite_db.insert_rows
+
+    def tracked(*args, **kwargs):
+        result = insert_rows(*args, **kwargs)
+        flushed.set()
+        return result
+
+    monkeypatch.setattr(sqlite_db, "insert_rows", tracked)
+    with sqlite_db.row_writer("events", ["id", "kind"], max_delay=0.05) as writer:
+        writer.write((1, "k"))
+        assert flushed.wait(5)
+        assert _ids(sqlite_db) == [1]
+
+
+def test_row_writer_keeps_failed_rows(sqlite_db):
+    writer = sqlite_db.row_writer("events", ["id", "kind"], max_delay=None)
+    writer.write((1, "k"))
+    with pytest.raises(Exception):
+        writer.flush()
+    assert writer.stats()["failures"] == 1
+    assert writer.stats()["buffered"] == 1
+    _create_events(sqlite_db)
+    writer.close()
+    assert _ids(sqlite_db) == [1]
+
+
+class _PreparedConnection:
+    """记录执行语句的PostgreSQL连接替身"""
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_postgres_prepares_insert_once_per_connection(monkeypatch):
+    from OpenDBUtils.PostgreUtils import PostgreUtils
+
+    db = PostgreUtils("test", "user", "password")
+    conn = _PreparedConnection()
+    monkeypatch.setattr(db, "_acquire", lambda: conn)
+    monkeypatch.setattr(db, "_return_connection", lambda conn, discard=False: None)
+    rows = [(i, "k") for i in range(4)]
+    db.insert_rows("events", ["id", "kind"], rows, batch_size=2)
+    db.insert_rows("events", ["id", "kind"], rows, batch_size=2)
+    prepares = [sql for sql in conn.statements if sql.startswith("PREPARE")]
+    assert len(prepares) == 1
+    assert prepares[0].endswith("INSERT INTO events (id, kind) VALUES ($1, $2), ($3, $4)")
+    assert sum(sql.startswith("EXECUTE") for sql in conn.statements) == 4
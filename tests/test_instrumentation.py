@@ -0,0 +1,90 @@
+import json
+import pandas as pd
+import pytest
+from OpenDBUtils import DBUtils
+from OpenDBUtils.Instrumentation import Instrumentation, StatsCollector
+
+
+def test_span_without_observers_is_inert():
+    instrumentation = Instrumentation("sqlite")
+    assert not instrumentation.enabled
+    with instrumentation.span("select_df", rows=1) as attrs:
+        instrumentation.annotate(sql="SELECT 1")
+    assert attrs == {"rows": 1}
+
+
+def test_span_hashes_sql_and_records_errors():
+    instrumentation = Instrumentation("sqlite")
+    spans = []
+    observer = instrumentation.add_observer(lambda name, seconds, attrs: spans.append((name, attrs)))
+    with instrumentation.span("execute"):
+        instrumentation.annotate(sql="SELECT 1")
+    with pytest.raises(KeyError):
+        with instrumentation.span("execute"):
+            raise KeyError("x")
+    instrumentation.remove_observer(observer)
+    with instrumentation.span("execute"):
+        pass
+    assert len(spans) == 2
+    name, attrs = spans[0]
+    assert name == "execute" and attrs["backend"] == "sqlite"
+    assert "sql" not in attrs and len(attrs["sql_hash"]) == 16
+    assert spans[1][1]["error"] == "KeyError"
+
+
+def test_observer_errors_are_ignored():
+    instrumentation = Instrumentation()
+
+    def broken(name, seconds, attrs):
+        raise RuntimeError("observer")
+
+    instrumentation.add_observer(broken)
+    with instrumentation.span("execute"):
+        pass
+
+
+def test_stats_collector_summary_and_prometheus():
+    collector = StatsCollector()
+    collector.on_span("select_df", 0.002, {"backend": "sqlite", "rows": 10, "bytes": 80})
+    collector.on_span("select_df", 0.2, {"backend": "sqlite", "rows": 5, "error": "ValueError"})
+    entry = collector.summary()["select_df"]["sqlite"]
+    assert entry["count"] == 2 and entry["errors"] == 1
+    assert entry["rows"] == 15 and entry["bytes"] == 80
+    assert entry["seconds_max"] == pytest.approx(0.2)
+    assert json.loads(collector.to_json())["select_df"]["sqlite"]["count"] == 2
+    text = collector.to_prometheus()
+    labels = 'span="select_df",backend="sqlite"'
+    assert f'opendbutils_span_seconds_bucket{{{labels},le="0.005"}} 1' in text
+    assert f'opendbutils_span_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"opendbutils_span_rows_total{{{labels}}} 15" in text
+    collector.reset()
+    assert collector.summary() == {}
+
+
+def test_db_utils_collects_spans(tmp_path):
+    db = DBUtils(str(tmp_path / "stats.db"), db_instance="sqlite", collect_stats=True)
+    try:
+        db.store_df(pd.DataFrame({"id": range(100)}), "items")
+        db.query_df("items", chunk_size=10, max_workers=2, cache=False)
+        spans = db.stats()["spans"]
+        assert spans["select_df"]["sqlite"]["rows"] == 100
+        assert spans["connect"]["sqlite"]["count"] > 0
+        assert "queue_wait" in spans
+        assert db.stats()["pool"]["in_use"] == 0
+        assert 'opendbutils_pool_size{backend="sqlite"}' in db.stats(format="prometheus")
+        assert json.loads(db.stats(format="json"))["spans"]["select_df"]["sqlite"]["count"] > 0
+        with pytest.raises(ValueError):
+            db.stats(format="xml")
+        db.reset_stats()
+        assert db.stats()["spans"] == {}
+    finally:
+        db.close()
+
+
+def test_stats_disabled_by_default(sqlite_db):
+    spans = []
+    observer = sqlite_db.add_observer(lambda name, seconds, attrs: spans.append(name))
+    sqlite_db.store_df(pd.DataFrame({"id": range(10)}), "items")
+    sqlite_db.remove_observer(observer)
+    assert sqlite_db.stats()["spans"] is None
+    assert {"encode", "write_chunks"} <= set(spans)
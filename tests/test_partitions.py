@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+from OpenDBUtils import DBUtils
+
+
+def _store_events(db, rows: int = 100):
+    db.store_df(pd.DataFrame({
+        "id": range(rows),
+        "score": [None if i % 10 == 0 else i * 0.5 for i in range(rows)],
+    }), "events", table_replace=True)
+
+
+def _create_text_keyed(db, rows: int = 20):
+    db.execute_sql("CREATE TABLE wr (k TEXT PRIMARY KEY, v INTEGER) WITHOUT ROWID")
+    db.insert_rows("wr", ["k", "v"], [(f"key{i:02d}", i) for i in range(rows)])
+
+
+@pytest.mark.parametrize("partition_by", ["rowid", "auto", "score"])
+def test_range_partitions_cover_table(sqlite_db, partition_by):
+    _store_events(sqlite_db)
+    result = sqlite_db.query_df("events", partition_by=partition_by, chunk_size=10, count="exact")
+    assert sorted(result["id"]) == list(range(100))
+
+
+def test_range_predicates_do_not_overlap(sqlite_db):
+    _store_events(sqlite_db)
+    predicates = sqlite_db._plan_partitions("events", "rowid", None, 4)
+    counts = [sqlite_db.db.count_data("events", predicate) for predicate in predicates]
+    assert len(predicates) == 4
+    assert sum(counts) == 100
+
+
+def test_partition_with_condition(sqlite_db):
+    _store_events(sqlite_db)
+    result = sqlite_db.query_df("events", condition="id >= 50", partition_by="rowid", chunk_size=10, count="exact")
+    assert sorted(result["id"]) == list(range(50, 100))
+
+
+def test_histogram_bounds():
+    histogram = [("a", 0.0), ("f", 0.25), ("m", 0.5), ("t", 0.75), ("z", 1.0)]
+    assert DBUtils._histogram_bounds(histogram, 4) == ["f", "m", "t"]
+    assert DBUtils._histogram_bounds(histogram[:1], 4) == []
+
+
+def test_histogram_partitions_text_column(sqlite_db, monkeypatch):
+    _create_text_keyed(sqlite_db)
+    monkeypatch.setattr(sqlite_db.db, "key_histogram", lambda table, column: [("key00", 0.0), ("key10", 0.5), ("key19", 1.0)])
+    predicates = sqlite_db._plan_partitions("wr", "k", None, 2)
+    assert predicates == ["k < 'key10'", "k >= 'key10'", "k IS NULL"]
+    result = sqlite_db.query_df("wr", partition_by="k", chunk_size=5, count="exact")
+    assert sorted(result["v"]) == list(range(20))
+
+
+def test_ctid_partitions(sqlite_db, monkeypatch):
+    monkeypatch.setattr(sqlite_db.db, "relation_blocks", lambda table: 10, raising=False)
+    assert sqlite_db._ctid_partitions("events", 2) == ["ctid < '(5,0)'::tid", "ctid >= '(5,0)'::tid"]
+    assert sqlite_db._ctid_partitions("events", 1) == ["TRUE"]
+    with pytest.raises(ValueError):
+        sqlite_db._plan_partitions("events", "ctid", None, 2)
+
+
+def test_text_key_falls_back_to_offset_chunks(sqlite_db):
+    _create_text_keyed(sqlite_db)
+    for partition_by in ("auto", "primary_key"):
+        assert sqlite_db._plan_partitions("wr", partition_by, None, 4) is None
+        result = sqlite_db.query_df("wr", partition_by=partition_by, chunk_size=5)
+        assert sorted(result["v"]) == list(range(20))
+
+
+def test_named_text_column_still_raises(sqlite_db):
+    _create_text_keyed(sqlite_db)
+    with pytest.raises(ValueError):
+        sqlite_db.query_df("wr", partition_by="k", chunk_size=5, count="exact")
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from OpenDBUtils.ColumnCodec import ColumnCodec, CODEC_BASE64, CODEC_PICKLE_BASE64, CODEC_PICKLE_BINARY
+from OpenDBUtils.DBUtils import DataFrameUtils
+from OpenDBUtils.ProcessCodec import ProcessCodec
+
+
+@pytest.fixture(scope="module")
+def codec():
+    codec = ProcessCodec(2, min_rows=0)
+    yield codec
+    codec.close()
+
+
+def _objects(rows: int = 200) -> pd.Series:
+    # 列表/元组/字典/None混合，覆盖能和不能无损转为Arrow的值
+    return pd.Series([
+        None if i % 7 == 0 else ({"i": i, "t": (i, "x")} if i % 3 else [i, i * 0.5]) for i in range(rows)
+    ], dtype=object)
+
+
+@pytest.mark.parametrize("encoded, codec_name, in_process", [
+    (ColumnCodec.encode_bytes(pd.Series([None if i % 5 == 0 else bytes([i % 256]) * i for i in range(200)])),
+     CODEC_BASE64, ColumnCodec.decode_bytes),
+    (ColumnCodec.encode_pickle(_objects()), CODEC_PICKLE_BASE64, ColumnCodec.decode_pickle),
+    (ColumnCodec.encode_pickle_binary(_objects()), CODEC_PICKLE_BINARY, ColumnCodec.decode_pickle_binary),
+    (ColumnCodec.encode_pickle(pd.Series([{"a": 1}, None, {"a": 2}] * 50)), CODEC_PICKLE_BASE64, ColumnCodec.decode_pickle),
+])
+def test_decode_matches_in_process(codec, encoded, codec_name, in_process):
+    values = encoded.to_numpy(dtype=object)
+    mask = ~pd.isna(values)
+    decoded = codec.decode({"column": (values, mask, codec_name)})["column"]
+    assert ColumnCodec._rebuild(encoded, mask, decoded).tolist() == in_process(encoded).tolist()
+
+
+def test_pool_is_reused(codec):
+    values = ColumnCodec.encode_bytes(pd.Series([b"x"] * 10)).to_numpy(dtype=object)
+    codec.decode({"column": (values, np.ones(10, dtype=bool), CODEC_BASE64)})
+    pool = codec._pool
+    codec.decode({"column": (values, np.ones(10, dtype=bool), CODEC_BASE64)})
+    assert codec._pool is pool
+
+
+def test_frame_decode_matches(codec):
+    frame = pd.DataFrame({"id": range(200), "payload": _objects(), "raw": [bytes([i % 256]) for i in range(200)]})
+    utils = DataFrameUtils(frame.copy())
+    utils.encode()
+    expected = DataFrameUtils(utils.data.copy()).decode(column_codecs=utils.column_codecs)
+    actual = DataFrameUtils(utils.data.copy()).decode(column_codecs=utils.column_codecs, process_codec=codec)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual["payload"].tolist() == frame["payload"].tolist()
+
+
+def test_query_df_process_codec(sqlite_db):
+    sqlite_db._process_codec.processes = 2
+    sqlite_db._process_codec.min_rows = 0
+    frame = pd.DataFrame({"id": range(100), "payload": _objects(100)})
+    sqlite_db.store_df(frame.copy(), "objects", table_replace=True)
+    result = sqlite_db.query_df("objects", process_codec=True, cache=False).sort_values("id")
+    assert result["payload"].tolist() == frame["payload"].tolist()
@@ -0,0 +1,69 @@
+import pandas as pd
+import polars as pl
+import pytest
+from OpenDBUtils import col
+from OpenDBUtils.QueryBuilder import TableQuery
+
+
+class _Dialect:
+    def __init__(self, db_instance):
+        self.db_instance = db_instance
+
+
+def _store_events(db, rows: int = 40):
+    db.store_df(pd.DataFrame({
+        "id": range(rows),
+        "kind": ["a" if i % 2 else "b" for i in range(rows)],
+        "payload": [{"i": i} for i in range(rows)],
+    }), "events", table_replace=True)
+
+
+@pytest.mark.parametrize("db_instance, sql", [
+    ("sqlite", 'SELECT "id" FROM events WHERE ("kind" = ?) AND (("id" > ?) OR ("id" IS NULL)) ORDER BY "id" DESC LIMIT 5'),
+    ("mysql", "SELECT `id` FROM events WHERE (`kind` = %s) AND ((`id` > %s) OR (`id` IS NULL)) ORDER BY `id` DESC LIMIT 5"),
+])
+def test_compile_parameterizes_values(db_instance, sql):
+    query = (TableQuery(_Dialect(db_instance), "events").select("id").filter(kind="a")
+             .filter((col("id") > 3) | (col("id") == None)).sort("id", descending=True).limit(5))
+    assert query.compile() == (sql, ["a", 3])
+
+
+def test_compile_without_params_unescapes_percent():
+    query = TableQuery(_Dialect("postgresql"), "events").filter("kind LIKE 'a%'")
+    assert query.compile() == ("SELECT * FROM events WHERE (kind LIKE 'a%')", None)
+
+
+def test_expression_as_bool_raises():
+    with pytest.raises(TypeError):
+        bool(col("id") > 1)
+
+
+def test_collect_filter_sort_limit(sqlite_db):
+    _store_events(sqlite_db)
+    query = sqlite_db.table("events").select("id", "payload").filter(col("id").isin([3, 5, 7]), kind="a")
+    result = query.sort("id", descending=True).limit(2).collect()
+    assert result["id"].tolist() == [7, 5]
+    assert result["payload"].tolist() == [{"i": 7}, {"i": 5}]
+    assert query.count() == 3
+
+
+def test_collect_partitions_with_estimate(sqlite_db):
+    _store_events(sqlite_db)
+    sqlite_db.execute_sql("ANALYZE")
+    result = sqlite_db.table("events").filter(col("id") >= 10).collect(chunk_size=5)
+    assert sorted(result["id"]) == list(range(10, 40))
+
+
+def test_collect_polars_backend(sqlite_db):
+    _store_events(sqlite_db)
+    sqlite_db.execute_sql("ANALYZE")
+    result = sqlite_db.table("events").filter(kind="b").collect(backend="polars", chunk_size=5)
+    assert isinstance(result, pl.DataFrame)
+    assert result.sort("id")["payload"].to_list() == [{"i": i} for i in range(0, 40, 2)]
+
+
+def test_collect_text_primary_key(sqlite_db):
+    sqlite_db.execute_sql("CREATE TABLE wr (k TEXT PRIMARY KEY, v INTEGER) WITHOUT ROWID")
+    sqlite_db.insert_rows("wr", ["k", "v"], [(f"key{i:02d}", i) for i in range(20)])
+    sqlite_db.execute_sql("ANALYZE")
+    assert sorted(sqlite_db.table("wr").collect(chunk_size=5)["v"]) == list(range(20))
@@ -0,0 +1,25 @@
+import pandas as pd
+
+
+def _store_names(db):
+    db.store_df(pd.DataFrame({"id": [1, 2], "name": ["a  b", "a b"]}), "names", table_replace=True)
+
+
+def test_cache_key_keeps_whitespace_in_literals(cached_db):
+    _store_names(cached_db)
+    assert cached_db.query_df("names", condition="name = 'a  b'")["id"].tolist() == [1]
+    assert cached_db.query_df("names", condition="name = 'a b'")["id"].tolist() == [2]
+
+
+def test_cache_key_ignores_whitespace_outside_literals(cached_db):
+    _store_names(cached_db)
+    cached_db.query_df("names", condition="id = 1")
+    hits = cached_db.cache_stats()["hits"]
+    assert cached_db.query_df("names", condition="id   =  1")["id"].tolist() == [1]
+    assert cached_db.cache_stats()["hits"] == hits + 1
+
+
+def test_cached_objects_are_copied(cached_db):
+    cached_db.store_df(pd.DataFrame({"id": [1], "payload": [{"k": 1}]}), "objects", table_replace=True)
+    cached_db.query_df("objects")["payload"][0]["k"] = 2
+    assert cached_db.query_df("objects")["payload"][0] == {"k": 1}
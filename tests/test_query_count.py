@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+
+def _store(db, start: int, stop: int, replace: bool = False):
+    db.store_df(pd.DataFrame({"id": range(start, stop)}), "events", table_replace=replace)
+
+
+def _ids(db, **kwargs):
+    return sorted(db.query_df("events", chunk_size=16, cache=False, **kwargs)["id"])
+
+
+def test_default_does_not_count(sqlite_db, monkeypatch):
+    _store(sqlite_db, 0, 100, replace=True)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query_df默认不应执行COUNT(*)")
+
+    monkeypatch.setattr(sqlite_db.db, "count_data", fail)
+    assert _ids(sqlite_db) == list(range(100))
+
+
+def test_stale_low_estimate_reads_all_rows(sqlite_db):
+    _store(sqlite_db, 0, 100, replace=True)
+    sqlite_db.execute_sql("ANALYZE")
+    _store(sqlite_db, 100, 500)
+    assert sqlite_db.db.estimate_count("events") == 100
+    assert _ids(sqlite_db) == list(range(500))
+    assert _ids(sqlite_db, partition_by="rowid") == list(range(500))
+
+
+def test_stale_high_estimate_reads_all_rows(sqlite_db):
+    _store(sqlite_db, 0, 500, replace=True)
+    sqlite_db.execute_sql("ANALYZE")
+    sqlite_db.delete_data("events", "id >= 50")
+    assert sqlite_db.db.estimate_count("events") == 500
+    assert _ids(sqlite_db) == list(range(50))
+    assert _ids(sqlite_db, condition="id >= 10", limit=20) == list(range(10, 30))
+
+
+@pytest.mark.parametrize("estimate", [None, 0, 1, 10 ** 6])
+def test_any_estimate_reads_all_rows(sqlite_db, monkeypatch, estimate):
+    _store(sqlite_db, 0, 100, replace=True)
+    monkeypatch.setattr(sqlite_db.db, "estimate_count", lambda table: estimate)
+    assert _ids(sqlite_db) == list(range(100))
+    assert _ids(sqlite_db, limit=33) == list(range(33))
+
+
+@pytest.mark.parametrize("count", ["exact", "none"])
+def test_other_count_modes(sqlite_db, count):
+    _store(sqlite_db, 0, 100, replace=True)
+    assert _ids(sqlite_db, count=count) == list(range(100))
+    assert _ids(sqlite_db, count=count, condition="id < 40", limit=17) == list(range(17))
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from OpenDBUtils.SqlPlanner import SqlPlanner
+
+
+def _store_events(db, rows: int = 50):
+    db.store_df(pd.DataFrame({"id": range(rows), "kind": ["a" if i % 2 else "b" for i in range(rows)]}),
+                "events", table_replace=True)
+
+
+@pytest.mark.parametrize("sql, mode, reason", [
+    ("SELECT id, kind FROM events WHERE kind = 'a' LIMIT 5", "scan", None),
+    ("SELECT COUNT(*) FROM events", "server", "aggregate"),
+    ("SELECT DISTINCT kind FROM events", "server", "DISTINCT"),
+    ("SELECT id FROM events ORDER BY id", "server", "ORDER"),
+    ("SELECT e.id FROM events e JOIN kinds k ON e.kind = k.kind", "server", "join"),
+    ("WITH t AS (SELECT 1) SELECT * FROM t", "server", "WITH"),
+])
+def test_plan_modes(sql, mode, reason):
+    plan = SqlPlanner.plan(sql)
+    assert plan.mode == mode
+    assert plan.reason == reason
+
+
+def test_plan_keeps_literals_and_columns():
+    plan = SqlPlanner.plan("select id, upper(kind) as k from events where kind = 'a -- b' limit 3;")
+    assert plan.table == "events"
+    assert plan.columns == ["id", "upper(kind) as k"]
+    assert plan.condition == "kind = 'a -- b'"
+    assert plan.limit == 3
+
+
+@pytest.mark.parametrize("sql", ["DELETE FROM events", "SELECT 1; SELECT 2", "SELECT * FROM t WHERE x IN (SELECT 1) FOR UPDATE; DROP TABLE t"])
+def test_plan_rejects_writes_and_multiple_statements(sql):
+    with pytest.raises(ValueError):
+        SqlPlanner.plan(sql)
+
+
+def test_scan_and_server_queries(sqlite_db):
+    _store_events(sqlite_db)
+    scan = sqlite_db.query_df_sql("SELECT id FROM events WHERE kind = 'a'", chunk_size=5)
+    assert sorted(scan["id"]) == list(range(1, 50, 2))
+    assert len(sqlite_db.query_df_sql("SELECT id FROM events LIMIT 7", chunk_size=3)) == 7
+    grouped = sqlite_db.query_df_sql("SELECT kind, COUNT(*) AS n FROM events GROUP BY kind ORDER BY kind")
+    assert grouped.to_dict("records") == [{"kind": "a", "n": 25}, {"kind": "b", "n": 25}]
+
+
+def test_text_primary_key_without_rowid(sqlite_db):
+    sqlite_db.execute_sql("CREATE TABLE wr (k TEXT PRIMARY KEY, v INTEGER) WITHOUT ROWID")
+    sqlite_db.insert_rows("wr", ["k", "v"], [(f"key{i:02d}", i) for i in range(20)])
+    assert sorted(sqlite_db.query_df_sql("SELECT * FROM wr", chunk_size=5)["v"]) == list(range(20))
+    assert sorted(sqlite_db.query_df_sql("SELECT k FROM wr WHERE v < 3")["k"]) == ["key00", "key01", "key02"]
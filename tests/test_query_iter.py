@@ -0,0 +1,50 @@
+import pandas as pd
+import polars as pl
+import pytest
+
+
+@pytest.fixture
+def items(sqlite_db):
+    sqlite_db.store_df(pd.DataFrame({
+        "id": range(25),
+        "blob": [bytes([i]) * 3 for i in range(25)],
+        "obj": [{"k": i} for i in range(25)],
+    }), "items")
+    return sqlite_db
+
+
+def test_batches_cover_table(items):
+    batches = list(items.query_iter("items", batch_rows=10))
+    assert [len(df) for df in batches] == [10, 10, 5]
+    df = pd.concat(batches, ignore_index=True)
+    assert df["id"].tolist() == list(range(25))
+    assert df["blob"].tolist() == [bytes([i]) * 3 for i in range(25)]
+    assert df["obj"].tolist() == [{"k": i} for i in range(25)]
+
+
+def test_condition_limit_and_columns(items):
+    batches = list(items.query_iter("items", columns=["id"], condition="id >= 5", limit=7, batch_rows=4))
+    assert [len(df) for df in batches] == [4, 3]
+    assert pd.concat(batches)["id"].tolist() == list(range(5, 12))
+    assert list(batches[0].columns) == ["id"]
+
+
+def test_polars_backend_and_index(items):
+    batches = list(items.query_iter("items", columns=["id", "blob"], batch_rows=10, backend="polars"))
+    assert all(isinstance(df, pl.DataFrame) for df in batches)
+    assert pl.concat(batches)["blob"].to_list() == [bytes([i]) * 3 for i in range(25)]
+    indexed = next(items.query_iter("items", columns=["id", "blob"], batch_rows=10, include_index=True))
+    assert indexed.index.tolist() == list(range(10))
+
+
+def test_early_close_returns_connection(items):
+    iterator = items.query_iter("items", batch_rows=10)
+    next(iterator)
+    assert items.db.pool.stats()["in_use"] == 1
+    iterator.close()
+    assert items.db.pool.stats()["in_use"] == 0
+
+
+def test_invalid_backend(items):
+    with pytest.raises(ValueError):
+        next(items.query_iter("items", backend="arrow"))
@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import pandas as pd
+import pytest
+
+
+def _create_events(db):
+    db.execute_sql("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT)")
+
+
+def _ids(db):
+    return [row[0] for row in db.execute_sql("SELECT id FROM events ORDER BY id")]
+
+
+def test_commit_and_uncommitted_rollback(sqlite_db):
+    _create_events(sqlite_db)
+    with sqlite_db.session() as s:
+        s.insert_rows("events", ["id", "kind"], [(1, "a")])
+        s.commit()
+        s.insert_rows("events", ["id", "kind"], [(2, "b")])
+        # 会话中能读到尚未提交的写入
+        assert s.count("events") == 2
+        assert s.query_df("events")["id"].tolist() == [1, 2]
+    assert _ids(sqlite_db) == [1]
+
+
+def test_transaction_commits_and_rolls_back_on_error(sqlite_db):
+    _create_events(sqlite_db)
+    with sqlite_db.transaction() as s:
+        s.execute("INSERT INTO events VALUES (1, 'a')")
+        s.delete_data("events", "id = 1")
+        s.insert_rows("events", ["id", "kind"], [(2, "b")])
+    with pytest.raises(RuntimeError):
+        with sqlite_db.transaction() as s:
+            s.insert_rows("events", ["id", "kind"], [(3, "c")])
+            raise RuntimeError("abort")
+    assert _ids(sqlite_db) == [2]
+
+
+def test_session_store_df_round_trip(sqlite_db):
+    with sqlite_db.transaction() as s:
+        s.store_df(pd.DataFrame({"id": [1, 2], "obj": [{"k": 1}, [2]]}), "docs")
+        assert s.query_df("docs")["obj"].tolist() == [{"k": 1}, [2]]
+    assert sqlite_db.query_df("docs")["obj"].tolist() == [{"k": 1}, [2]]
+
+
+def test_failed_operation_blocks_commit_until_rollback(sqlite_db):
+    _create_events(sqlite_db)
+    with sqlite_db.session() as s:
+        s.insert_rows("events", ["id", "kind"], [(1, "a")])
+        with pytest.raises(Exception):
+            s.insert_rows("events", ["id", "kind"], [(1, "duplicate")])
+        with pytest.raises(Exception, match="不能提交"):
+            s.commit()
+        s.rollback()
+        s.insert_rows("events", ["id", "kind"], [(2, "b")])
+        s.commit()
+    assert _ids(sqlite_db) == [2]
+
+
+def test_failed_transaction_does_not_commit_on_exit(sqlite_db):
+    _create_events(sqlite_db)
+    with pytest.raises(Exception, match="不能提交"):
+        with sqlite_db.transaction() as s:
+            s.insert_rows("events", ["id", "kind"], [(1, "a")])
+            try:
+                s.execute("INSERT INTO missing VALUES (1)")
+            except Exception:
+                pass
+    assert _ids(sqlite_db) == []
+
+
+def test_nested_session_is_rejected(sqlite_db):
+    with sqlite_db.session():
+        with pytest.raises(ValueError):
+            with sqlite_db.session():
+                pass
+    # 外层会话结束后可以再开启会话
+    with sqlite_db.session():
+        pass
+
+
+def test_other_threads_wait_for_session_writes(sqlite_db):
+    _create_events(sqlite_db)
+    done = threading.Event()
+
+    def write():
+        sqlite_db.insert_rows("events", ["id", "kind"], [(2, "b")])
+        done.set()
+
+    with sqlite_db.session() as s:
+        s.insert_rows("events", ["id", "kind"], [(1, "a")])
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not done.wait(0.1)
+        s.commit()
+    writer.join()
+    assert _ids(sqlite_db) == [1, 2]
+
+
+def test_commit_invalidates_cache(cached_db):
+    _create_events(cached_db)
+    cached_db.insert_rows("events", ["id", "kind"], [(1, "a")])
+    assert len(cached_db.query_df("events")) == 1
+    with cached_db.transaction() as s:
+        s.insert_rows("events", ["id", "kind"], [(2, "b")])
+    assert len(cached_db.query_df("events")) == 2
+
+
+def test_nested_pool_session_does_not_hold_connection(monkeypatch):
+    from OpenDBUtils.PostgreUtils import PostgreUtils
+
+    db = PostgreUtils("test", "user", "password")
+    monkeypatch.setattr(db.pool, "creator", lambda: sqlite3.connect(":memory:", check_same_thread=False))
+    db.open_session()
+    with pytest.raises(ValueError):
+        db.open_session()
+    assert db.pool.stats()["in_use"] == 1
+    db.close_session(commit=False)
+    assert db.pool.stats()["in_use"] == 0
+    db.close()
@@ -0,0 +1,41 @@
+import pandas as pd
+import polars as pl
+
+
+def _frame(rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": range(rows),
+        "name": [f"name {i}" for i in range(rows)],
+        "score": [i * 0.5 for i in range(rows)],
+        "payload": [{"i": i, "tags": ["a", "b"]} for i in range(rows)],
+        "raw": [bytes([i % 256]) * 3 for i in range(rows)],
+    })
+
+
+def test_store_and_query_roundtrip(sqlite_db):
+    df = _frame()
+    sqlite_db.store_df(df.copy(), "events", table_replace=True, chunk_size=16)
+    result = sqlite_db.query_df("events", chunk_size=16).sort_values("id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, df, check_dtype=False)
+
+
+def test_binary_roundtrip(sqlite_db):
+    df = _frame(10)
+    sqlite_db.store_df(df.copy(), "events_bin", table_replace=True, binary=True)
+    result = sqlite_db.query_df("events_bin").sort_values("id").reset_index(drop=True)
+    assert result["payload"].tolist() == df["payload"].tolist()
+    assert result["raw"].tolist() == df["raw"].tolist()
+
+
+def test_polars_backend_roundtrip(sqlite_db):
+    df = pl.DataFrame({"id": [1, 2, 3], "name": ["a", "b", None]})
+    sqlite_db.store_df(df, "events_pl", table_replace=True, backend="polars")
+    result = sqlite_db.query_df("events_pl", backend="polars").sort("id")
+    assert result.to_dicts() == df.to_dicts()
+
+
+def test_condition_and_limit(sqlite_db):
+    sqlite_db.store_df(_frame(), "events", table_replace=True)
+    result = sqlite_db.query_df("events", columns=["id", "name"], condition="id >= 90", chunk_size=4)
+    assert sorted(result["id"]) == list(range(90, 100))
+    assert len(sqlite_db.query_df("events", limit=7, chunk_size=3)) == 7
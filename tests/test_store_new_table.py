@@ -0,0 +1,20 @@
+import pandas as pd
+import polars as pl
+
+
+def test_store_df_creates_table(sqlite_db):
+    sqlite_db.store_df(pd.DataFrame({"id": [1, 2], "name": ["a", "b"]}), "fresh_df")
+    assert sorted(sqlite_db.query_df("fresh_df")["id"]) == [1, 2]
+
+
+def test_store_stream_creates_table(sqlite_db):
+    df = pl.DataFrame({"id": list(range(50)), "name": [f"n{i}" for i in range(50)]})
+    stats = sqlite_db.store_stream(df, "fresh_stream", chunk_size=8, max_workers=4)
+    assert stats["rows"] == 50
+    assert sorted(sqlite_db.query_df("fresh_stream")["id"]) == list(range(50))
+
+
+def test_session_store_df_creates_table(sqlite_db):
+    with sqlite_db.session(commit=True) as s:
+        s.store_df(pd.DataFrame({"id": [1, 2, 3]}), "fresh_session")
+    assert sorted(sqlite_db.query_df("fresh_session")["id"]) == [1, 2, 3]
@@ -0,0 +1,80 @@
+import pandas as pd
+
+
+def _create_users(db):
+    db.execute_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, score REAL)")
+    db.insert_rows("users", ["id", "name", "score"], [(1, "a", 1.0), (2, "b", 2.0)])
+
+
+def _rows(db, table, order):
+    return [tuple(row) for row in db.query_df(table).sort_values(order).itertuples(index=False)]
+
+
+def test_upsert_inserts_and_updates(sqlite_db):
+    _create_users(sqlite_db)
+    stats = sqlite_db.upsert_df(pd.DataFrame({"id": [2, 3], "name": ["B", "c"], "score": [20.0, 3.0]}), "users",
+                                key_columns=["id"], chunk_size=1)
+    assert stats["rows"] == 2 and stats["chunks"] == 2
+    assert _rows(sqlite_db, "users", "id") == [(1, "a", 1.0), (2, "B", 20.0), (3, "c", 3.0)]
+
+
+def test_upsert_update_columns(sqlite_db):
+    _create_users(sqlite_db)
+    data = pd.DataFrame({"id": [1, 2], "name": ["A", "B"], "score": [10.0, 20.0]})
+    sqlite_db.upsert_df(data, "users", key_columns=["id"], update_columns=["score"])
+    assert _rows(sqlite_db, "users", "id") == [(1, "a", 10.0), (2, "b", 20.0)]
+    sqlite_db.upsert_df(data.assign(score=[0.0, 0.0]), "users", key_columns=["id"], update_columns=[])
+    assert _rows(sqlite_db, "users", "id") == [(1, "a", 10.0), (2, "b", 20.0)]
+
+
+def test_upsert_composite_key_keeps_last_duplicate(sqlite_db):
+    sqlite_db.execute_sql("CREATE TABLE scores (day TEXT, user_id INTEGER, score REAL, PRIMARY KEY (day, user_id))")
+    sqlite_db.insert_rows("scores", ["day", "user_id", "score"], [("d1", 1, 1.0), ("d1", 2, 2.0)])
+    data = pd.DataFrame({
+        "day": ["d1", "d2", "d1", "d1"],
+        "user_id": [1, 1, 2, 2],
+        "score": [5.0, 6.0, 7.0, 8.0],
+    })
+    sqlite_db.upsert_df(data, "scores", key_columns=["day", "user_id"])
+    assert _rows(sqlite_db, "scores", ["day", "user_id"]) == [("d1", 1, 5.0), ("d1", 2, 8.0), ("d2", 1, 6.0)]
+
+
+def test_upsert_encodes_objects(sqlite_db):
+    sqlite_db.execute_sql("CREATE TABLE docs (id INTEGER PRIMARY KEY, payload TEXT)")
+    sqlite_db.upsert_df(pd.DataFrame({"id": [1], "payload": [{"k": 1}]}), "docs", key_columns=["id"])
+    sqlite_db.upsert_df(pd.DataFrame({"id": [1], "payload": [{"k": 2}]}), "docs", key_columns=["id"])
+    assert sqlite_db.query_df("docs")["payload"].tolist() == [{"k": 2}]
+
+
+class _RecordingConnection:
+    """记录执行的语句，代替MySQL连接"""
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+
+def test_mysql_staging_table_is_one_statement(monkeypatch):
+    from OpenDBUtils.MysqlUtils import MysqlUtils
+
+    db = MysqlUtils("test", "user", "password")
+    conn = _RecordingConnection()
+    monkeypatch.setattr(db, "_acquire", lambda: conn)
+    monkeypatch.setattr(db, "_return_connection", lambda conn, discard=False: None)
+    db.create_staging_table("users", "stage", ["id", "name"])
+    # 临时表上的ALTER TABLE/CREATE INDEX会隐式提交会话的事务，行号列和索引必须在CREATE中声明
+    assert conn.statements == [
+        "CREATE TEMPORARY TABLE stage (_opendbutils_row BIGINT, INDEX stage_row (_opendbutils_row)) "
+        "SELECT id, name FROM users LIMIT 0"
+    ]